@@ -0,0 +1,484 @@
+"""Local stand-in for the Shopee pages the scraper reads, for offline benchmarks and tests.
+
+Serves search result pages, product pages and the ratings endpoint with a DOM that
+matches src/xpaths.py and the parsers. The catalog is generated deterministically from
+a seed, and reviews are generated on demand, so products with 10k reviews cost no memory.
+
+    python -m benchmarks.mock_shopee --port 8000 --products 200 --reviews 10000 --latency-ms 50
+    python main.py -k mouse --site-url http://127.0.0.1:8000 --render-profile light
+"""
+import argparse
+import html
+import json
+import logging
+import random
+import re
+import threading
+import time
+import unicodedata
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+_FIRST_ITEMID = 1000000
+_BASE_TIME = 1735689600  # 2025-01-01; reviews get older with their index
+_REVIEWS_PER_PAGE = 6  # Page size of the product page's review list
+_MEDIA_FILTER = 3  # Value of the ratings endpoint's 'filter' parameter for "with media"
+_STAR_WEIGHTS = (2, 1, 2, 5, 15)  # 1 to 5 stars
+
+_PRODUCT_NAMES = ["Mouse Gamer", "Fone Bluetooth", "Teclado Mecânico", "Capa de Celular", "Carregador Turbo",
+                  "Garrafa Térmica", "Luminária LED", "Suporte Notebook", "Cabo USB-C", "Caixa de Som"]
+_PRODUCT_TRAITS = ["RGB", "Sem Fio", "Premium", "Original", "Compacto", "Kit 2 Unidades", "Preto", "Azul"]
+_LOCATIONS = ["São Paulo", "Rio de Janeiro", "Curitiba", "Belo Horizonte", "Exterior"]
+_VARIATIONS = ["Preto", "Branco", "Azul", "Rosa", "Verde"]
+_REVIEW_PHRASES = {
+    5: ["Produto ótimo, chegou rápido", "Amei, recomendo demais", "Perfeito, igual ao anúncio", "Excelente qualidade"],
+    4: ["Muito bom, só demorou um pouco", "Gostei, vale o preço", "Bom produto"],
+    3: ["Razoável", "Cumpre o que promete, nada demais", "Poderia ser melhor"],
+    2: ["Veio com defeito pequeno", "Qualidade abaixo do esperado"],
+    1: ["Não funcionou", "Péssimo, não recomendo", "Chegou quebrado"],
+}
+_PIXEL_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360f8cfc0f01f0005000201e2a18d"
+    "0c0000000049454e44ae426082")
+
+
+class MockCatalog:
+    """Deterministic products and reviews; only per-product review flags and filter indexes are cached."""
+
+    def __init__(self, products=200, reviews_per_product=10000, seed=0):
+        self.products = products
+        self.reviews_per_product = reviews_per_product
+        self.seed = seed
+
+    def product(self, idx):
+        rng = random.Random(f"{self.seed}:product:{idx}")
+        name = f"{rng.choice(_PRODUCT_NAMES)} {rng.choice(_PRODUCT_TRAITS)} {idx}"
+        shopid, itemid = 500000 + idx % 37, _FIRST_ITEMID + idx
+        return {
+            "idx": idx,
+            "shopid": shopid,
+            "itemid": itemid,
+            "name": name,
+            "path": f"/{_slug(name)}-i.{shopid}.{itemid}",
+            "price": f"{rng.uniform(9, 400):.2f}".replace(".", ","),
+            "rating": f"{rng.uniform(4.0, 5.0):.1f}",
+            "sold": rng.randint(self.reviews_per_product, self.reviews_per_product * 3),
+            "location": rng.choice(_LOCATIONS),
+            "shop_name": f"Loja {shopid}",
+        }
+
+    def find(self, shopid, itemid):
+        """Index of the product behind shop/item IDs, or None."""
+        idx = int(itemid) - _FIRST_ITEMID
+        if 0 <= idx < self.products and 500000 + idx % 37 == int(shopid):
+            return idx
+        return None
+
+    def review(self, idx, i):
+        """The i-th review of a product (newest first), in the ratings endpoint's JSON shape."""
+        stars, media, commented = self._profile(idx)
+        rng = random.Random(f"{self.seed}:review:{idx}:{i}")
+        star = stars[i]
+        author_shopid = 9000000 + rng.randint(0, 999999)
+        return {
+            "author_username": f"comprador{author_shopid}",
+            "author_shopid": author_shopid,
+            "rating_star": star,
+            "ctime": _BASE_TIME - i * 3600 - rng.randint(0, 3599),
+            "product_items": [{"model_name": rng.choice(_VARIATIONS)}],
+            "comment": rng.choice(_REVIEW_PHRASES[star]) if commented[i] else "",
+            "ItemRatingReply": {"comment": "Obrigado pela compra!"} if rng.random() < 0.2 else None,
+            "like_count": rng.randint(0, 30),
+            "images": [f"br-{idx}-{i}-{n}" for n in range(rng.randint(1, 3))] if media[i] else [],
+            "videos": [{"url": f"/video/{idx}-{i}.mp4"}] if media[i] and rng.random() < 0.3 else [],
+        }
+
+    def reviews(self, idx, offset, limit, star=0, media=False):
+        if not star and not media:
+            return [self.review(idx, i) for i in range(offset, min(offset + limit, self.reviews_per_product))]
+        return [self.review(idx, i) for i in self._filtered(idx, star, media)[offset:offset + limit]]
+
+    def summary(self, idx):
+        """Review counts shown in the rating overview."""
+        stars, media, commented = self._profile(idx)
+        return {"stars": [stars.count(star) for star in range(1, 6)], "media": sum(media), "commented": sum(commented)}
+
+    @lru_cache(maxsize=64)
+    def _profile(self, idx):
+        """Star, has-media and has-comment of every review, drawn in one pass so filters and counts stay cheap."""
+        rng = random.Random(f"{self.seed}:reviews:{idx}")
+        n = self.reviews_per_product
+        stars = bytes(rng.choices(range(1, 6), weights=_STAR_WEIGHTS, k=n))
+        media = bytes(rng.random() < 0.25 for _ in range(n))
+        commented = bytes(rng.random() < 0.85 for _ in range(n))
+        return stars, media, commented
+
+    @lru_cache(maxsize=256)
+    def _filtered(self, idx, star, media):
+        stars, has_media, _ = self._profile(idx)
+        return [i for i in range(self.reviews_per_product)
+                if (not star or stars[i] == star) and (not media or has_media[i])]
+
+
+class MockShopeeServer:
+    """Threaded HTTP server for a MockCatalog.
+
+    latency delays every response, results_per_page is the search page size, and lazy
+    renders search cards and the review section only when they are scrolled into view
+    (otherwise both are in the HTML as served, which also makes it parseable offline).
+    """
+
+    def __init__(self, products=200, reviews_per_product=10000, results_per_page=60, latency=0.0, lazy=True,
+                 seed=0, host="127.0.0.1", port=0):
+        self.catalog = MockCatalog(products, reviews_per_product, seed)
+        self.results_per_page = results_per_page
+        self.latency = latency
+        self.lazy = lazy
+        self.requests = 0
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.mock = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-shopee", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        mock = self.server.mock
+        mock.requests += 1
+        if mock.latency:
+            time.sleep(mock.latency)
+        parsed = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        path = parsed.path
+        try:
+            if path == "/":
+                self._send(200, "text/html", _page("Shopee Brasil", "<div role=\"main\"><h1>Shopee</h1></div>"))
+            elif path == "/search":
+                self._send(200, "text/html", _search_page(mock, query))
+            elif path == "/api/v2/item/get_ratings":
+                self._send(200, "application/json", _ratings_response(mock.catalog, query))
+            elif path.startswith("/img/"):
+                self._send(200, "image/png", _PIXEL_PNG)
+            else:
+                match = re.search(r'-i\.(\d+)\.(\d+)$', path)
+                idx = mock.catalog.find(*match.groups()) if match else None
+                if idx is None:
+                    self._send(404, "text/html", _page("Not found", "<p>Página não encontrada</p>"))
+                else:
+                    self._send(200, "text/html", _product_page(mock, idx))
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _send(self, status, content_type, body):
+        data = body if isinstance(body, bytes) else body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8" if content_type != "image/png" else content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logging.debug(f"mock_shopee: {format % args}")
+
+
+def _ratings_response(catalog, query):
+    idx = catalog.find(query.get("shopid", -1), query.get("itemid", -1))
+    if idx is None:
+        return json.dumps({"error": 4, "error_msg": "item not found", "data": None})
+    offset, limit = int(query.get("offset", 0)), int(query.get("limit", 6))
+    star, media = int(query.get("type", 0)), query.get("filter") == str(_MEDIA_FILTER)
+    ratings = catalog.reviews(idx, offset, limit, star=star, media=media)
+    return json.dumps({"error": 0, "error_msg": None, "data": {"ratings": ratings}}, ensure_ascii=False)
+
+
+def _search_page(mock, query):
+    page = int(query.get("page", 0))
+    per_page = mock.results_per_page
+    indexes = range(page * per_page, min((page + 1) * per_page, mock.catalog.products))
+    if not indexes:
+        return _page("Shopee Brasil", '<div role="main"><div class="shopee-search-empty-result-section">Nenhum resultado encontrado</div></div>')
+    cards = {idx: _search_card(mock.catalog.product(idx)) for idx in indexes}
+    # With lazy loading only the first row is rendered; the rest is filled in when scrolled into view.
+    eager = 5 if mock.lazy else per_page
+    items = "".join(
+        f'<li class="col-xs-2-4 shopee-search-item-result__item" style="min-height:320px">{cards[idx]}</li>' if n < eager else
+        f'<li class="col-xs-2-4 shopee-search-item-result__item" style="min-height:320px" data-card="{idx}"></li>'
+        for n, idx in enumerate(indexes))
+    script = ""
+    if mock.lazy:
+        script = _LAZY_CARDS_SCRIPT.replace("__CARDS__", json.dumps({str(k): v for k, v in cards.items()}, ensure_ascii=False))
+    keyword = html.escape(query.get("keyword", ""))
+    body = (f'<div role="main"><h1 class="shopee-search-result-header">Resultados para "{keyword}"</h1>'
+            f'<ul class="row shopee-search-item-result__items">{items}</ul></div>{script}')
+    return _page(f"{keyword} | Shopee Brasil", body)
+
+
+def _search_card(product):
+    return (
+        f'<a class="contents" href="{product["path"]}"><div class="flex flex-col h-full">'
+        f'<div class="relative z-0 w-full pt-full">'
+        f'<img class="inset-y-0 w-full h-full pointer-events-none object-contain absolute" src="/img/p{product["idx"]}.png" alt="" width="188" height="188"></div>'
+        f'<div class="p-2 flex-1 flex flex-col justify-between">'
+        f'<div class="line-clamp-2 break-words min-w-0 min-h-[2.5rem] text-sm">{html.escape(product["name"])}</div>'
+        f'<div class="truncate flex items-baseline"><span class="text-xs/sp14 font-medium mr-px">R$</span>'
+        f'<span class="font-medium text-base/5 truncate">{product["price"]}</span></div>'
+        f'<div class="flex items-center"><div class="text-shopee-black87 text-xs/sp14 flex-none">{product["rating"]}</div>'
+        f'<div class="truncate text-shopee-black87 text-xs min-h-4">{_shortened(product["sold"])} vendidos</div></div>'
+        f'<div class="flex-shrink min-w-0 truncate text-shopee-black54 font-extralight text-sp10">{product["location"]}</div>'
+        f'</div></div></a>')
+
+
+def _product_page(mock, idx):
+    product = mock.catalog.product(idx)
+    summary = mock.catalog.summary(idx)
+    total = sum(summary["stars"])
+    name = html.escape(product["name"])
+    ratings = _ratings_section(mock, product, summary) if not mock.lazy else ""
+    config = json.dumps({"shopid": product["shopid"], "itemid": product["itemid"], "perPage": _REVIEWS_PER_PAGE,
+                         "total": total, "overview": _overview_html(summary), "lazy": mock.lazy})
+    body = f"""
+<div id="sll2-normal-pdp-main" class="page-product"><div><div><div>
+  <div><div role="main" class="flex flex-auto">
+    <section class="flex-auto">
+      <h1 class="vR6K3w">{name}</h1>
+      <div class="flex">
+        <button class="flex"><div class="F9RHbS dQEiAI jMXp4d">{product["rating"]}</div></button>
+        <button class="flex"><div class="F9RHbS">{_shortened(total)}</div><div class="x1i_He">Avaliações</div></button>
+        <div class="flex"><span class="AcmPRb">{_shortened(product["sold"])}</span><span class="ZbNgTt">Vendidos</span></div>
+      </div>
+      <section aria-live="polite"><div class="flex"><div class="IZPeQz B67UQ0">R${product["price"]}</div></div></section>
+    </section>
+  </div></div>
+  <div>
+    <div><section class="page-product__shop"><div class="flex">
+      <a class="lG5Xxv" href="/shop/{product["shopid"]}"><div class="fV3TIn">{product["shop_name"]}</div></a>
+    </div></section></div>
+    <div></div>
+    <div><div>
+      <div>
+        <div style="min-height:1400px">
+          <section class="I_DV_3"><h2 class="WjNdTR">Detalhes do Produto</h2><div><div class="ybxj32"><h3 class="VJOnTD">Categoria</h3><div class="idLK2l">Shopee &gt; Eletrônicos &gt; {name}</div></div></div></section>
+          <section class="I_DV_3"><h2 class="WjNdTR">Descrição do produto</h2><div><div class="e8lZp3"><p>{name}. Produto a pronta entrega, envio em até 24 horas.</p><p>Garantia de 90 dias.</p></div></div></section>
+        </div>
+        <div class="product-ratings" data-nosnippet="true" id="ratings-slot">{ratings}</div>
+      </div>
+    </div></div>
+  </div>
+</div></div></div></div>
+<script>window.__mock = {config};</script>
+<script>{_PRODUCT_PAGE_SCRIPT}</script>"""
+    return _page(f"{name} | Shopee Brasil", body)
+
+
+def _ratings_section(mock, product, summary):
+    """Markup of the review section: overview with filters, first review page and page controller."""
+    first_page = mock.catalog.reviews(product["idx"], 0, _REVIEWS_PER_PAGE)
+    total = sum(summary["stars"])
+    pages = -(-total // _REVIEWS_PER_PAGE)
+    return (f'<div><div><div class="product-ratings__header">AVALIAÇÕES DO PRODUTO</div>{_overview_html(summary)}'
+            f'<div class="product-ratings__list">{"".join(_review_html(r) for r in first_page)}</div>'
+            f'<div class="shopee-page-controller product-ratings__page-controller">{_page_buttons(1, pages)}</div></div></div>')
+
+
+def _overview_html(summary):
+    filters = ['<div class="product-rating-overview__filter product-rating-overview__filter--active" data-type="0" data-filter="0">Tudo</div>']
+    for star in range(5, 0, -1):
+        filters.append(f'<div class="product-rating-overview__filter" data-type="{star}" data-filter="0">'
+                       f'{star} Estrela{"s" if star > 1 else ""} ({summary["stars"][star - 1]})</div>')
+    filters.append(f'<div class="product-rating-overview__filter" data-type="0" data-filter="1">Com Comentários ({summary["commented"]})</div>')
+    filters.append(f'<div class="product-rating-overview__filter" data-type="0" data-filter="{_MEDIA_FILTER}">Com Mídia ({summary["media"]})</div>')
+    return (f'<div class="product-rating-overview"><div class="product-rating-overview__briefing">'
+            f'<div class="product-rating-overview__score-wrapper">avaliação</div></div>'
+            f'<div class="product-rating-overview__filters">{"".join(filters)}</div></div>')
+
+
+def _review_html(review):
+    """Server-side twin of renderReview in _PRODUCT_PAGE_SCRIPT."""
+    when = time.strftime("%Y-%m-%d %H:%M", time.localtime(review["ctime"]))
+    variation = review["product_items"][0]["model_name"]
+    stars = "".join(f'<svg class="shopee-svg-icon {"icon-rating-solid--active " if n < review["rating_star"] else ""}icon-rating-solid" viewBox="0 0 15 15"></svg>'
+                    for n in range(5))
+    media = "".join(f'<img src="/img/{image}.png" width="72" height="72" alt="">' for image in review["images"])
+    media += "".join(f'<video src="{video["url"]}" width="72" height="72"></video>' for video in review["videos"])
+    reply = review["ItemRatingReply"]
+    reply_html = f'<div class="TQTPT9"><div class="qiTixQ">{html.escape(reply["comment"])}</div></div>' if reply else ""
+    return (f'<div class="shopee-product-rating"><a class="shopee-product-rating__avatar" href="/shop/{review["author_shopid"]}"></a>'
+            f'<div class="shopee-product-rating__main">'
+            f'<a class="shopee-product-rating__author-name" href="/shop/{review["author_shopid"]}">{review["author_username"]}</a>'
+            f'<div class="shopee-product-rating__rating">{stars}</div>'
+            f'<div class="shopee-product-rating__time">{when} | Variação: {variation}</div>'
+            f'<div style="position: relative; box-sizing: border-box; margin: 15px 0px; font-size: 14px; line-height: 20px;">{html.escape(review["comment"])}</div>'
+            f'<div class="shopee-product-rating__image-list-wrapper">{media}</div>{reply_html}'
+            f'<div class="shopee-product-rating__actions"><div class="shopee-product-rating__like-count">{review["like_count"] or ""}</div></div>'
+            f'</div></div>')
+
+
+def _page_buttons(current, pages):
+    """Page controller buttons: a window around the current page plus the last page."""
+    window = range(max(1, current - 2), min(pages, max(current + 2, 5)) + 1)
+    buttons = ['<button class="shopee-icon-button shopee-icon-button--left" data-page="prev">‹</button>']
+    for page in window:
+        active = "shopee-button-solid shopee-button-solid--primary" if page == current else "shopee-button-no-outline"
+        buttons.append(f'<button class="{active}" data-page="{page}">{page}</button>')
+    if window and window[-1] < pages:
+        buttons.append(f'<button class="shopee-button-no-outline" data-page="{pages}">{pages}</button>')
+    buttons.append('<button class="shopee-icon-button shopee-icon-button--right" data-page="next">›</button>')
+    return "".join(buttons)
+
+
+_LAZY_CARDS_SCRIPT = """<script>
+(() => {
+    const cards = __CARDS__;
+    const observer = new IntersectionObserver(entries => entries.forEach(entry => {
+        if (!entry.isIntersecting) return;
+        const li = entry.target;
+        li.innerHTML = cards[li.dataset.card];
+        li.removeAttribute('data-card');
+        observer.unobserve(li);
+    }), {rootMargin: '100px'});
+    document.querySelectorAll('li[data-card]').forEach(li => observer.observe(li));
+})();
+</script>"""
+
+# Renders the review section (lazily when scrolled near it) and pages/filters it through the ratings endpoint.
+_PRODUCT_PAGE_SCRIPT = """
+(() => {
+    const cfg = window.__mock;
+    const slot = document.getElementById('ratings-slot');
+    const state = {page: 1, type: 0, filter: 0, pages: Math.ceil(cfg.total / cfg.perPage)};
+    const esc = s => String(s).replace(/[&<>"]/g, c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'}[c]));
+    const pad = n => String(n).padStart(2, '0');
+    const renderReview = r => {
+        const d = new Date(r.ctime * 1000);
+        const when = `${d.getFullYear()}-${pad(d.getMonth() + 1)}-${pad(d.getDate())} ${pad(d.getHours())}:${pad(d.getMinutes())}`;
+        let stars = '';
+        for (let n = 0; n < 5; n++) {
+            stars += `<svg class="shopee-svg-icon ${n < r.rating_star ? 'icon-rating-solid--active ' : ''}icon-rating-solid" viewBox="0 0 15 15"></svg>`;
+        }
+        const media = r.images.map(i => `<img src="/img/${i}.png" width="72" height="72" alt="">`).join('') +
+            r.videos.map(v => `<video src="${v.url}" width="72" height="72"></video>`).join('');
+        const reply = r.ItemRatingReply ? `<div class="TQTPT9"><div class="qiTixQ">${esc(r.ItemRatingReply.comment)}</div></div>` : '';
+        return `<div class="shopee-product-rating"><a class="shopee-product-rating__avatar" href="/shop/${r.author_shopid}"></a>` +
+            `<div class="shopee-product-rating__main">` +
+            `<a class="shopee-product-rating__author-name" href="/shop/${r.author_shopid}">${r.author_username}</a>` +
+            `<div class="shopee-product-rating__rating">${stars}</div>` +
+            `<div class="shopee-product-rating__time">${when} | Variação: ${r.product_items[0].model_name}</div>` +
+            `<div style="position: relative; box-sizing: border-box; margin: 15px 0px; font-size: 14px; line-height: 20px;">${esc(r.comment)}</div>` +
+            `<div class="shopee-product-rating__image-list-wrapper">${media}</div>${reply}` +
+            `<div class="shopee-product-rating__actions"><div class="shopee-product-rating__like-count">${r.like_count || ''}</div></div>` +
+            `</div></div>`;
+    };
+    const renderButtons = () => {
+        const last = Math.min(state.pages, Math.max(state.page + 2, 5));
+        let out = '<button class="shopee-icon-button shopee-icon-button--left" data-page="prev">‹</button>';
+        for (let p = Math.max(1, state.page - 2); p <= last; p++) {
+            const cls = p === state.page ? 'shopee-button-solid shopee-button-solid--primary' : 'shopee-button-no-outline';
+            out += `<button class="${cls}" data-page="${p}">${p}</button>`;
+        }
+        if (last < state.pages) out += `<button class="shopee-button-no-outline" data-page="${state.pages}">${state.pages}</button>`;
+        return out + '<button class="shopee-icon-button shopee-icon-button--right" data-page="next">›</button>';
+    };
+    const load = () => {
+        const params = new URLSearchParams({itemid: cfg.itemid, shopid: cfg.shopid, limit: cfg.perPage,
+            offset: (state.page - 1) * cfg.perPage, type: state.type, filter: state.filter, flag: 1});
+        return fetch(`/api/v2/item/get_ratings?${params}`).then(r => r.json()).then(data => {
+            const ratings = data.data.ratings;
+            slot.querySelector('.product-ratings__list').innerHTML = ratings.map(renderReview).join('');
+            slot.querySelector('.product-ratings__page-controller').innerHTML = renderButtons();
+        });
+    };
+    const build = () => {
+        slot.innerHTML = `<div><div><div class="product-ratings__header">AVALIAÇÕES DO PRODUTO</div>${cfg.overview}` +
+            '<div class="product-ratings__list"></div>' +
+            '<div class="shopee-page-controller product-ratings__page-controller"></div></div></div>';
+        return load();
+    };
+    slot.addEventListener('click', event => {
+        const button = event.target.closest('button[data-page]');
+        const filter = event.target.closest('.product-rating-overview__filter[data-type]');
+        if (button) {
+            const page = button.dataset.page;
+            state.page = page === 'prev' ? Math.max(1, state.page - 1) : page === 'next' ? Math.min(state.pages, state.page + 1) : parseInt(page, 10);
+            load();
+        } else if (filter) {
+            slot.querySelectorAll('.product-rating-overview__filter--active').forEach(el => el.classList.remove('product-rating-overview__filter--active'));
+            filter.classList.add('product-rating-overview__filter--active');
+            state.type = parseInt(filter.dataset.type, 10);
+            state.filter = parseInt(filter.dataset.filter, 10);
+            const count = filter.textContent.match(/\\((\\d+)\\)/);
+            state.pages = Math.max(1, Math.ceil((count ? parseInt(count[1], 10) : cfg.total) / cfg.perPage));
+            state.page = 1;
+            load();
+        }
+    });
+    if (!cfg.lazy) return;
+    const observer = new IntersectionObserver(entries => {
+        if (entries.some(entry => entry.isIntersecting)) {
+            observer.disconnect();
+            build();
+        }
+    }, {rootMargin: '200px'});
+    observer.observe(slot);
+})();
+"""
+
+
+def _page(title, body):
+    return (f'<!DOCTYPE html><html lang="pt-BR"><head><meta charset="utf-8"><title>{title}</title>'
+            f'<style>body{{margin:0;font-family:sans-serif}} ul{{list-style:none;padding:0}}'
+            f' .shopee-search-item-result__items{{display:grid;grid-template-columns:repeat(5,1fr)}}</style></head>'
+            f'<body><div id="main">{body}</div></body></html>')
+
+
+def _slug(name):
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r'[^A-Za-z0-9]+', '-', ascii_name).strip('-')
+
+
+def _shortened(number):
+    """Counts as the product page shows them, e.g. '1,2mil'."""
+    if number < 1000:
+        return str(number)
+    return f"{number / 1000:.1f}".replace(".", ",").replace(",0", "") + "mil"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a local mock of the Shopee pages the scraper reads.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--products", type=int, default=200, help="Products in the search results (default: 200).")
+    parser.add_argument("--reviews", type=int, default=10000, help="Reviews per product (default: 10000).")
+    parser.add_argument("--results-per-page", type=int, default=60, help="Search results per page (default: 60).")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Delay added to every response.")
+    parser.add_argument("--no-lazy", action="store_true", help="Render search cards and reviews in the served HTML.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    server = MockShopeeServer(args.products, args.reviews, args.results_per_page, args.latency_ms / 1000,
+                              not args.no_lazy, args.seed, args.host, args.port)
+    print(f"Mock Shopee at {server.url}/ (search: {server.url}/search?keyword=mouse). Ctrl+C to stop.")
+    try:
+        server.start()._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
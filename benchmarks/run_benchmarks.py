@@ -0,0 +1,262 @@
+"""Throughput benchmarks of the scraper against the local mock site.
+
+Every scenario starts a MockShopeeServer, runs a ShopeeScraper at it with the light render
+profile (headless Chrome, no network access besides the mock) and reports products/min,
+reviews/s, time to the first product and peak RSS of the scraper process and its browser.
+Results are compared against benchmarks/baseline.json when it was recorded with the same options.
+
+    python -m benchmarks.run_benchmarks                      # all scenarios, compare with the baseline
+    python -m benchmarks.run_benchmarks --scenario search_api --latency-ms 80
+    python -m benchmarks.run_benchmarks --update-baseline    # store this machine's numbers
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from benchmarks.mock_shopee import MockShopeeServer
+from src.scraper import ShopeeScraper
+from src.session_store import SessionStore
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# name -> (mock site options, scraper options). "link" scenarios scrape the first product directly.
+SCENARIOS = {
+    "search_dom": ({"products": 120, "reviews_per_product": 60},
+                   {"max_products": 20, "review_limit": 30, "review_source": "dom"}),
+    "search_api": ({"products": 120, "reviews_per_product": 600},
+                   {"max_products": 20, "review_limit": 300, "review_source": "api"}),
+    "product_10k_api": ({"products": 1, "reviews_per_product": 10000},
+                        {"link": True, "review_limit": 10000, "review_source": "api", "api_page_size": 50}),
+    "product_dom": ({"products": 1, "reviews_per_product": 600},
+                    {"link": True, "review_limit": 120, "review_source": "dom"}),
+}
+# Metrics where a higher value is better; for the others lower is better.
+_HIGHER_IS_BETTER = {"products_per_min", "reviews_per_s"}
+
+
+def run_scenario(name, latency=0.0, lazy=True, workers=1, tabs=1):
+    """Runs one scenario and returns its metrics."""
+    site_options, scraper_options = SCENARIOS[name]
+    scraper_options = dict(scraper_options)
+    link = scraper_options.pop("link", False)
+    work_dir = tempfile.mkdtemp(prefix=f"shopee_bench_{name}_")
+    with MockShopeeServer(latency=latency, lazy=lazy, **site_options) as mock:
+        product_link = f"{mock.url}{mock.catalog.product(0)['path']}" if link else None
+        scraper = ShopeeScraper(None if link else "mouse",
+                                scraper_options.pop("max_products", 1),
+                                False,
+                                scraper_options.pop("review_limit"),
+                                chrome_user_data_dir=os.path.join(work_dir, "profile"),
+                                product_link=product_link,
+                                output_file=os.path.join(work_dir, "output.json"),
+                                workers=workers,
+                                tabs=tabs,
+                                render_profile="light",
+                                site_url=mock.url,
+                                **scraper_options)
+        # Keep the real cookie jar out of it, and the browser away from anything but the mock.
+        scraper.session_store = SessionStore(os.path.join(work_dir, "cookies.json"), os.path.join(work_dir, "cookies.dat"))
+        scraper.options.add_argument("--host-resolver-rules=MAP * ~NOTFOUND, EXCLUDE 127.0.0.1")
+
+        sampler = _RssSampler()
+        sampler.start()
+        started = time.perf_counter()
+        first_result = None
+        products = reviews = 0
+        try:
+            for product in scraper.iter_products():
+                if first_result is None:
+                    first_result = time.perf_counter() - started
+                products += 1
+                reviews += len(product.get("comments") or [])
+        finally:
+            elapsed = time.perf_counter() - started
+            sampler.stop()
+            requests = mock.requests
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "products": products,
+        "reviews": reviews,
+        "seconds": round(elapsed, 2),
+        "products_per_min": round(products / elapsed * 60, 2) if elapsed else 0.0,
+        "reviews_per_s": round(reviews / elapsed, 2) if elapsed else 0.0,
+        "first_result_s": round(first_result, 3) if first_result is not None else None,
+        "peak_rss_mb": round(sampler.peak / 2**20, 1),
+        "requests": requests,
+    }
+
+
+class _RssSampler:
+    """Samples the combined RSS of this process and its children (Chrome, chromedriver) in a thread."""
+
+    def __init__(self, interval=0.25):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _tree_rss())
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, _tree_rss())
+            self._stop.wait(self.interval)
+
+
+def _tree_rss():
+    """RSS in bytes of this process and all its descendants."""
+    if psutil:
+        proc = psutil.Process()
+        total = proc.memory_info().rss
+        for child in proc.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+    if os.path.isdir("/proc"):
+        return _proc_tree_rss(os.getpid())
+    import resource
+    # ru_maxrss is a peak already, in KiB on Linux and bytes on macOS; children only count once they exit.
+    unit = 1 if sys.platform == "darwin" else 1024
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * unit
+
+
+def _proc_tree_rss(root):
+    children = {}
+    rss = {}
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        pid = int(entry)
+        children.setdefault(int(fields[1]), []).append(pid)  # fields[1] is the parent PID
+        rss[pid] = int(fields[21]) * page_size  # resident pages
+    total, stack = 0, [root]
+    while stack:
+        pid = stack.pop()
+        total += rss.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return total
+
+
+def compare(results, baseline, tolerance, options):
+    """Returns (lines, regressions) comparing results with the baseline's metrics per scenario.
+
+    Raises ValueError if the baseline was recorded with other options than this run's.
+    """
+    if baseline.get("options") not in (None, options):
+        raise ValueError(f"The baseline was recorded with {baseline['options']}, this run used {options}. "
+                         f"Rerun with the same options, or record a new baseline with --update-baseline.")
+    lines, regressions = [], []
+    for name, metrics in results.items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            lines.append(f"{name}: no baseline")
+            continue
+        for metric in ("products_per_min", "reviews_per_s", "first_result_s", "peak_rss_mb"):
+            now, before = metrics.get(metric), base.get(metric)
+            if not now or not before:
+                continue
+            change = (now - before) / before
+            worse = -change if metric in _HIGHER_IS_BETTER else change
+            flag = ""
+            if worse > tolerance:
+                flag = "  REGRESSION"
+                regressions.append((name, metric))
+            lines.append(f"{name}.{metric}: {before} -> {now} ({change:+.1%}){flag}")
+    return lines, regressions
+
+
+def run_options(args):
+    """Options that change the numbers; results are only comparable when they match."""
+    return {"latency_ms": args.latency_ms, "lazy": not args.no_lazy, "workers": args.workers, "tabs": args.tabs}
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(path, results, options):
+    """Stores results; scenarios not run are kept only if they were recorded with the same options."""
+    baseline = load_baseline(path)
+    kept = baseline.get("scenarios", {}) if baseline.get("options") == options else {}
+    data = {
+        "recorded_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs, Python {platform.python_version()}",
+        "options": options,
+        "scenarios": {**kept, **results},
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the scraper against the local mock Shopee site.")
+    parser.add_argument("--scenario", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS), help="Scenarios to run (default: all).")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Delay the mock site adds to every response.")
+    parser.add_argument("--no-lazy", action="store_true", help="Serve search cards and reviews without lazy loading.")
+    parser.add_argument("--workers", type=int, default=1, help="--workers of the scraper.")
+    parser.add_argument("--tabs", type=int, default=1, help="--tabs of the scraper.")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Baseline file (default: benchmarks/baseline.json).")
+    parser.add_argument("--update-baseline", action="store_true", help="Store the results as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Relative change counted as a regression (default: 0.15).")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 if a metric regressed.")
+    parser.add_argument("--json", default=None, help="Also write the results to this file.")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in args.scenario:
+        logging.info(f"Running benchmark scenario {name}...")
+        results[name] = run_scenario(name, args.latency_ms / 1000, not args.no_lazy, args.workers, args.tabs)
+        print(f"{name}: {json.dumps(results[name])}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.update_baseline:
+        save_baseline(args.baseline, results, run_options(args))
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    try:
+        lines, regressions = compare(results, load_baseline(args.baseline), args.tolerance, run_options(args))
+    except ValueError as e:
+        print(f"Not compared with the baseline: {e}")
+        return 2 if args.fail_on_regression else 0
+    print("\n".join(lines))
+    if regressions and args.fail_on_regression:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
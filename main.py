@@ -1,11 +1,57 @@
 from src.scraper import ShopeeScraper
+from src.browser_daemon import run_browser_daemon, DAEMON_STATE_FILE
+from src.frontier import Frontier, FRONTIER_FILE
+from src.review_index import REVIEW_INDEX_FILE
+from src.refresh_planner import RefreshPlanner, REFRESH_FILE
+from src.export import export_output, FORMATS
+from src.browser import SITE_URL
+from datetime import datetime
 import argparse
+import sys
+
+def read_lines(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+def run_daemon(argv):
+    parser = argparse.ArgumentParser(prog="main.py daemon", description="Keep a logged-in Chrome running for scraper runs started with --attach.")
+    parser.add_argument("--chrome-user-data-dir", default=None, help="User data directory for Chrome")
+    parser.add_argument("--render-profile", choices=["full", "light"], default="full", help="Render profile of the daemon's browser (see --render-profile of a normal run).")
+    parser.add_argument("--state-file", default=DAEMON_STATE_FILE, help="File the daemon writes its debugger address to.")
+    args = parser.parse_args(argv)
+    scraper = ShopeeScraper(None, 0, True, 0,
+                            chrome_user_data_dir=args.chrome_user_data_dir,
+                            render_profile=args.render_profile)
+    run_browser_daemon(scraper, state_file=args.state_file)
+
+def run_export(argv):
+    parser = argparse.ArgumentParser(prog="main.py export", description="Export an output file into products and reviews tables.")
+    parser.add_argument("-o", "--output", required=True, help="Output file written by a scraping run.")
+    parser.add_argument("--export-dir", default=None, help="Directory for the exported tables (default: <output>_export).")
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=list(FORMATS), help="Formats to write (default: all).")
+    args = parser.parse_args(argv)
+    export_dir = args.export_dir or f"{args.output.rsplit('.', 1)[0]}_export"
+    products, reviews = export_output(args.output, export_dir, args.format)
+    print(f"Exported {products} products and {reviews} new reviews to {export_dir}")
 
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["daemon"]:
+        run_daemon(sys.argv[2:])
+        sys.exit(0)
+    if sys.argv[1:2] == ["export"]:
+        run_export(sys.argv[2:])
+        sys.exit(0)
+
     parser = argparse.ArgumentParser()
-    group = parser.add_mutually_exclusive_group(required=True) 
+    group = parser.add_mutually_exclusive_group()
     group.add_argument("-k", "--keyword", help="Search term (ignored if --product-link is used)")
     group.add_argument("-l","--product-link", help="Direct URL of the Shopee product to scrape reviews from")
+    parser.add_argument("--keywords-file", default=None, help="File with one search term per line to scrape in batch mode.")
+    parser.add_argument("--links-file", default=None, help="File with one product link per line to scrape in batch mode.")
+    parser.add_argument("--frontier", default=FRONTIER_FILE, help=f"SQLite file that queues batch keywords and products across runs (default: {FRONTIER_FILE}).")
+    parser.add_argument("--refresh", action="store_true", default=False, help="Refresh the watched products that are due, collecting new reviews only for products whose counters changed. --links-file adds products to watch.")
+    parser.add_argument("--refresh-db", default=REFRESH_FILE, help=f"SQLite file with the watched products and their refresh schedule (default: {REFRESH_FILE}).")
+    parser.add_argument("--refresh-budget", type=int, default=100, help="Maximum page loads of one --refresh run (default: 100).")
     parser.add_argument("-n", "--num", type=int, default=10, help="Number of products")
     parser.add_argument("-r", "--review-limit", type=int, default=10, help="Max reviews per product")
     parser.add_argument("--index-only", action="store_true", default=False, help="If set, only retrieve index data")
@@ -15,9 +61,48 @@ if __name__ == "__main__":
     parser.add_argument("--media-only", action="store_true", default=False, help="Only retrieve reviews with media (images or videos).")
     parser.add_argument("-c", "--continue-scrape", action="store_true", default=False, help="Continue scraping reviews from the last saved page (only for single product link).")
     parser.add_argument("-o", "--output", type=str, default=None, help="Output file.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of browsers scraping product pages in parallel (keyword search only).")
+    parser.add_argument("--tabs", type=int, default=1, help="Number of tabs in one browser that load product pages concurrently (keyword search only, ignored with --workers).")
+    parser.add_argument("--review-source", choices=["dom", "api"], default="dom", help="Collect reviews by clicking through the review list (dom) or by paging the ratings endpoint from inside the browser (api).")
+    parser.add_argument("--api-page-size", type=int, default=50, help="Reviews requested per ratings API call (with --review-source api).")
+    parser.add_argument("--api-base-url", type=str, default=None, help="Base URL of the ratings API (default: the product link's origin).")
+    parser.add_argument("--site-url", type=str, default=SITE_URL, help=f"Origin of the search and home pages (default: {SITE_URL}).")
+    parser.add_argument("--capture-network", action="store_true", default=False, help="Read search, item and ratings JSON responses from CDP network events and scrape the DOM only for missing fields.")
+    parser.add_argument("--render-profile", choices=["full", "light"], default="full", help="full opens a normal Chrome window; light runs headless with a small viewport and blocks images, media, fonts and analytics.")
+    parser.add_argument("--attach", nargs="?", const=DAEMON_STATE_FILE, default=None, metavar="STATE_FILE", help=f"Attach to a browser started with 'main.py daemon' instead of starting Chrome (default state file: {DAEMON_STATE_FILE}).")
+    parser.add_argument("--incremental", action="store_true", default=False, help="Only collect reviews that were not scraped before, stopping at the first known one.")
+    parser.add_argument("--since", type=lambda value: datetime.strptime(value, "%Y-%m-%d"), default=None, metavar="YYYY-MM-DD", help="Stop collecting reviews older than this date.")
+    parser.add_argument("--review-index", default=REVIEW_INDEX_FILE, help=f"SQLite file with the fingerprints of scraped reviews used by --incremental (default: {REVIEW_INDEX_FILE}).")
+    parser.add_argument("--bounded-memory", action="store_true", default=False, help="Drop finished products from memory once they are written to the output journal, and write reviews to the journal as they are collected.")
+    parser.add_argument("--offline-parse", action="store_true", default=False, help="Capture review page HTML and parse it with lxml in a process pool while the browser moves to the next review page.")
+    parser.add_argument("--parse-workers", type=int, default=None, help="Number of offline parsing processes (default: CPU count).")
+    parser.add_argument("--legacy-extract", action="store_true", default=False, help="Extract product and review data element by element instead of with a single in-page script per page.")
 
     args = parser.parse_args()
 
+    frontier = None
+    refresh_planner = None
+    if args.refresh:
+        if args.keyword or args.product_link or args.keywords_file:
+            parser.error("--refresh works on watched product links; add them with --links-file.")
+        refresh_planner = RefreshPlanner(args.refresh_db)
+        if args.links_file:
+            print(f"Refresh list {args.refresh_db}: watching {refresh_planner.add(read_lines(args.links_file))} new products.")
+        args.incremental = True # Refreshes only ever need the reviews added since the last visit
+    elif args.keywords_file or args.links_file:
+        if args.product_link:
+            parser.error("--product-link cannot be used with --keywords-file or --links-file; add the link to --links-file instead.")
+        frontier = Frontier(args.frontier)
+        keywords = read_lines(args.keywords_file) if args.keywords_file else []
+        if args.keyword:
+            keywords.append(args.keyword)
+        added_keywords = frontier.add_keywords(keywords)
+        # Explicitly listed products are scraped before those found through searches.
+        added_links = frontier.add_products(read_lines(args.links_file), priority=1) if args.links_file else 0
+        print(f"Frontier {args.frontier}: queued {added_keywords} new keywords and {added_links} new product links.")
+    elif not (args.keyword or args.product_link):
+        parser.error("one of -k/--keyword, -l/--product-link, --keywords-file or --links-file is required.")
+
     if args.product_link:
         if args.index_only:
             print("Warning: --index-only is ignored when --product-link is used.")
@@ -36,7 +121,23 @@ if __name__ == "__main__":
                                 media_only=args.media_only,
                                 product_link=args.product_link,
                                 continue_scrape=args.continue_scrape,
-                                output_file=args.output)
+                                output_file=args.output,
+                                fast_extract=not args.legacy_extract,
+                                offline_parse=args.offline_parse,
+                                parse_workers=args.parse_workers,
+                                workers=args.workers,
+                                tabs=args.tabs,
+                                review_source=args.review_source,
+                                api_page_size=args.api_page_size,
+                                api_base_url=args.api_base_url,
+                                capture_network=args.capture_network,
+                                render_profile=args.render_profile,
+                                attach_state_file=args.attach,
+                                bounded_memory=args.bounded_memory,
+                                incremental=args.incremental,
+                                since=args.since,
+                                review_index_file=args.review_index,
+                                site_url=args.site_url)
         scraper.execute()
     else:
         scraper = ShopeeScraper(args.keyword,
@@ -49,5 +150,24 @@ if __name__ == "__main__":
                                 media_only=args.media_only,
                                 product_link=args.product_link,
                                 continue_scrape=False,
-                                output_file=args.output)
+                                output_file=args.output,
+                                fast_extract=not args.legacy_extract,
+                                offline_parse=args.offline_parse,
+                                parse_workers=args.parse_workers,
+                                workers=args.workers,
+                                tabs=args.tabs,
+                                review_source=args.review_source,
+                                api_page_size=args.api_page_size,
+                                api_base_url=args.api_base_url,
+                                capture_network=args.capture_network,
+                                render_profile=args.render_profile,
+                                attach_state_file=args.attach,
+                                frontier=frontier,
+                                bounded_memory=args.bounded_memory,
+                                incremental=args.incremental,
+                                since=args.since,
+                                review_index_file=args.review_index,
+                                refresh_planner=refresh_planner,
+                                refresh_budget=args.refresh_budget,
+                                site_url=args.site_url)
         scraper.execute()
\ No newline at end of file
@@ -1,21 +1,58 @@
 import logging
 import os
-import pickle
 import sys
 import time
 import undetected_chromedriver as uc
+from .network_capture import NetworkCapture
+from .readiness import wait_for_document_ready
+from .session_store import to_selenium_cookie
+
+# Resources the light render profile never downloads; their URLs are still read from the DOM attributes.
+_LIGHT_BLOCKED_URLS = [
+    # Images and media, including Shopee's extension-less CDN paths
+    "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.avif", "*.ico",
+    "*.mp4", "*.webm", "*.m3u8", "*.ts", "*.mp3",
+    "*img.susercontent.com/*", "*vod.susercontent.com/*",
+    # Fonts
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    # Analytics and ad trackers
+    "*google-analytics.com/*", "*googletagmanager.com/*", "*doubleclick.net/*",
+    "*connect.facebook.net/*", "*analytics.tiktok.com/*", "*clarity.ms/*", "*hotjar.com/*",
+]
+_LIGHT_WINDOW_SIZE = "1280,900"
+SITE_URL = "https://shopee.com.br"
 
 
 def _initialize_driver(self):
     """Initializes the Chrome WebDriver."""
     logging.info("Initializing WebDriver...")
+    headless = self.render_profile == "light"
     if sys.platform.startswith('linux'):
-        self.driver = uc.Chrome(options=self.options, enable_cdp_events=False, headless=False)
+        self.driver = uc.Chrome(options=self.options, enable_cdp_events=self.capture_network, headless=headless)
     else:
-        self.driver = uc.Chrome(options=self.options, enable_cdp_events=False, headless=False)
-    self.driver.maximize_window()
+        self.driver = uc.Chrome(options=self.options, enable_cdp_events=self.capture_network, headless=headless)
+    if not headless:
+        self.driver.maximize_window()
+    _apply_render_profile(self)
+    _load_cookies(self)
+    if self.capture_network:
+        self.network_capture = NetworkCapture()
+        self.network_capture.attach(self.driver)
     logging.info("WebDriver initialized successfully.")
 
+def _apply_render_profile(self):
+    """Blocks images, media, fonts and trackers in the current tab when using the light render profile.
+
+    Blocking is set per tab through CDP, so it has to be applied again to every new tab.
+    """
+    if self.render_profile != "light":
+        return
+    try:
+        self.driver.execute_cdp_cmd("Network.enable", {})
+        self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": _LIGHT_BLOCKED_URLS})
+    except Exception as e:
+        logging.warning(f"Could not block resources for the light render profile: {e}")
+
 def find_correct_chrome_user_data_dir(self):
     #loop through all users in C:\Users if windows, and check if the Profile 1 folder exists
     if sys.platform.startswith('win'):
@@ -34,30 +71,61 @@ def _configure_options(self):
             self.options.add_argument("--no-sandbox")
             self.options.add_argument("--disable-dev-shm-usage")
             self.options.add_argument("--disable-blink-features=AutomationControlled")
-            self.options.add_argument("--start-maximized")
-        else: 
+            if self.render_profile != "light":
+                self.options.add_argument("--start-maximized")
+        elif self.render_profile != "light":
             self.options.add_argument("--start-fullscreen")
+        if self.render_profile == "light":
+            # Headless has no screen to maximize to; a fixed viewport keeps layout-dependent lookups stable.
+            self.options.add_argument(f"--window-size={_LIGHT_WINDOW_SIZE}")
+        if self.tabs > 1:
+            # Keep background tabs loading and rendering at full speed while another tab is in front.
+            self.options.add_argument("--disable-background-timer-throttling")
+            self.options.add_argument("--disable-renderer-backgrounding")
+            self.options.add_argument("--disable-backgrounding-occluded-windows")
 
 def _save_cookies(self):
-    cookies = self.driver.get_cookies()
-    with open(self.cookies_file, 'wb') as file:
-        pickle.dump(cookies, file)
+    """Merges the browser's cookies for every domain into the shared session store."""
+    try:
+        cookies = self.driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+    except Exception as e:
+        logging.debug(f"Could not read cookies through CDP, saving only the current domain's: {e}")
+        cookies = self.driver.get_cookies()
+    self.session_store.save(cookies)
 
 def _load_cookies(self):
-    if os.path.exists(self.cookies_file):
-        with open(self.cookies_file, 'rb') as file:
-            cookies = pickle.load(file)
-        for cookie in cookies:
-            self.driver.add_cookie(cookie)
-            
+    """Seeds the stored cookies into the browser before it navigates anywhere.
+
+    Network.setCookies works on a blank tab; add_cookie needs the Shopee domain to be loaded first.
+    """
+    cookies = self.session_store.load()
+    if not cookies:
+        return
+    try:
+        self.driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+        logging.info(f"Seeded {len(cookies)} cookies from {self.session_store.path}.")
+        return
+    except Exception as e:
+        logging.warning(f"Could not seed cookies through CDP, loading them after opening Shopee: {e}")
+    _safe_get(self, f"{self.site_url}/")
+    for cookie in cookies:
+        try:
+            self.driver.add_cookie(to_selenium_cookie(cookie))
+        except Exception as e:
+            logging.debug(f"Could not add cookie {cookie.get('name')}: {e}")
+
 def _safe_get(self, url):
     """Wrapper for driver.get() with captcha checking"""
+    if self.first_request_seconds is None and self.started_at is not None:
+        self.first_request_seconds = time.monotonic() - self.started_at
+        source = "attached to browser daemon" if self.daemon_session else "cold start"
+        logging.info(f"Time to first request: {self.first_request_seconds:.2f}s ({source})")
     self.driver.get(url)
-    time.sleep(3)  # Wait for page to load
+    wait_for_document_ready(self)  # Wait for page to load
     while _check_captcha(self):
         logging.info("Retrying after captcha...")
         self.driver.get(url)
-        time.sleep(3)  # Wait for page to load
+        wait_for_document_ready(self)  # Wait for page to load
         _check_captcha(self)
         self.driver.implicitly_wait(3)
 
@@ -0,0 +1,106 @@
+"""Long-lived browser that short scraper runs attach to instead of starting Chrome themselves.
+
+The daemon starts Chrome once, with the usual profile and cookies, and writes its
+debugger address to a state file. ShopeeScraper runs started with --attach open
+their own tab in that browser and close only that tab when they finish.
+"""
+import json
+import logging
+import os
+import time
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from .browser import _initialize_driver, _save_cookies, _safe_get, _apply_render_profile
+
+DAEMON_STATE_FILE = "browser_daemon.json"
+
+
+def run_browser_daemon(self, state_file=DAEMON_STATE_FILE, cookie_save_interval=300):
+    """Starts the scraper's browser and keeps it open until interrupted (Ctrl+C)."""
+    _initialize_driver(self)
+    try:
+        _safe_get(self, f"{self.site_url}/")
+        state = {
+            "pid": os.getpid(),
+            "debugger_address": self.options.debugger_address,
+            # The chromedriver binary uc.Chrome already patched, so attaching runs skip the patching.
+            "driver_path": getattr(getattr(self.driver, "patcher", None), "executable_path", None),
+            "started_at": time.time(),
+        }
+        _write_state(state_file, state)
+        logging.info(f"Browser daemon listening on {state['debugger_address']}, state written to {state_file}. Press Ctrl+C to stop.")
+
+        while True:
+            time.sleep(cookie_save_interval)
+            if not self.driver.window_handles:
+                logging.warning("Browser daemon has no windows left, stopping.")
+                break
+            _save_cookies(self)
+    except KeyboardInterrupt:
+        logging.info("Stopping browser daemon...")
+    finally:
+        try:
+            _save_cookies(self)
+        except Exception as e:
+            logging.warning(f"Could not save cookies: {e}")
+        if os.path.exists(state_file):
+            os.remove(state_file)
+        self.driver.quit()
+
+
+def attach_to_daemon(self, state_file=DAEMON_STATE_FILE):
+    """Connects self.driver to a running browser daemon in a new tab; returns False if none is reachable."""
+    state = _read_state(state_file)
+    if not state:
+        logging.warning(f"No browser daemon state found in {state_file}, starting a new browser.")
+        return False
+    try:
+        options = webdriver.ChromeOptions()
+        options.debugger_address = state["debugger_address"]
+        service = Service(executable_path=state["driver_path"]) if state.get("driver_path") else Service()
+        self.driver = webdriver.Chrome(service=service, options=options)
+        self.driver.switch_to.new_window('tab')
+    except Exception as e:
+        logging.warning(f"Could not attach to the browser daemon at {state.get('debugger_address')}: {e}. Starting a new browser.")
+        self.driver = None
+        return False
+
+    self.daemon_session = state
+    _apply_render_profile(self)
+    if self.capture_network:
+        # CDP event listeners are only available on browsers started through uc.Chrome.
+        logging.warning("--capture-network is not supported when attached to the browser daemon, disabling it.")
+        self.capture_network = False
+    logging.info(f"Attached to browser daemon at {state['debugger_address']}.")
+    return True
+
+
+def release_daemon_session(self):
+    """Closes this run's tab and disconnects, leaving the daemon's browser running."""
+    try:
+        self.driver.close()
+    except Exception as e:
+        logging.warning(f"Could not close the daemon tab: {e}")
+    try:
+        self.driver.service.stop()
+    except Exception as e:
+        logging.warning(f"Could not stop the chromedriver attached to the daemon: {e}")
+    self.daemon_session = None
+
+
+def _read_state(state_file):
+    if not os.path.exists(state_file):
+        return None
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logging.warning(f"Could not read browser daemon state from {state_file}: {e}")
+        return None
+
+
+def _write_state(state_file, state):
+    tmp_file = f"{state_file}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_file, state_file)
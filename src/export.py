@@ -0,0 +1,313 @@
+"""Export of scraped output into normalized products and reviews tables.
+
+Products are written in full on every export. Reviews are exported incrementally:
+each run only writes the reviews added since the previous export, as a new Parquet
+part file and as a new zstd frame appended to reviews.jsonl.zst, in batches of BATCH_ROWS.
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from .output_store import OutputJournal
+from .review_index import review_fingerprint
+from .utils import _convert_shortened_number
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+FORMATS = ("parquet", "jsonl")
+_STATE_FILE = "export_state.json"
+BATCH_ROWS = 10000 # Review rows held in memory per format before they are written
+
+_PRODUCT_COLUMNS = [
+    ("product_key", "string"), ("link", "string"), ("name", "string"), ("price", "string"),
+    ("rating", "float64"), ("ratings", "int64"), ("sold", "int64"), ("location", "string"), ("img", "string"),
+    ("shop_name", "string"), ("shop_profile_url", "string"), ("description", "string"), ("category", "string"),
+    ("total_rating", "int64"), ("rating_5_star", "int64"), ("rating_4_star", "int64"), ("rating_3_star", "int64"),
+    ("rating_2_star", "int64"), ("rating_1_star", "int64"), ("rating_media", "int64"), ("rating_commented", "int64"),
+    ("review_count", "int64"),
+]
+_REVIEW_COLUMNS = [
+    ("product_key", "string"), ("review_index", "int32"), ("author", "string"), ("author_profile_url", "string"),
+    ("rating", "int8"), ("time", "timestamp"), ("variation", "string"), ("content", "string"),
+    ("seller_respond", "string"), ("like_count", "int32"), ("images", "list"), ("videos", "list"),
+]
+
+
+def export_output(out_file, export_dir, formats=FORMATS):
+    """Exports the output file (with its journal replayed) into export_dir; returns (products, new reviews)."""
+    if "parquet" in formats and pa is None:
+        raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+    if "jsonl" in formats and zstandard is None:
+        raise RuntimeError("Compressed JSONL export needs zstandard: pip install zstandard")
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise ValueError(f"Unknown export formats: {', '.join(sorted(unknown))}")
+    os.makedirs(export_dir, exist_ok=True)
+
+    start = time.time()
+    state = _load_state(export_dir)
+    # Each format remembers which reviews of every product it already holds.
+    fmt_states = {fmt: state.setdefault(fmt, {"reviews": {}, "parts": 0, "size": 0}) for fmt in formats}
+    sinks = {}
+    if "parquet" in formats:
+        # Part names come from the saved state, so a part written before a crash is overwritten.
+        sinks["parquet"] = _ParquetSink(os.path.join(export_dir, "reviews", f"part-{fmt_states['parquet']['parts']:05d}.parquet"))
+    if "jsonl" in formats:
+        # Frames after the saved size were appended by an export that did not save its state.
+        sinks["jsonl"] = _JsonlSink(os.path.join(export_dir, "reviews.jsonl.zst"), fmt_states["jsonl"].get("size"))
+    product_rows = []
+    try:
+        for key, product in OutputJournal(out_file).iter_products():
+            product_rows.append(product_row(key, product))
+            for fmt, sink in sinks.items():
+                sink.add(_new_review_rows(key, product, fmt_states[fmt]["reviews"]))
+    except BaseException:
+        for sink in sinks.values():
+            sink.abort()
+        raise
+
+    new_reviews = 0
+    for fmt, sink in sinks.items():
+        fmt_state = fmt_states[fmt]
+        if fmt == "parquet":
+            _write_parquet(product_rows, _PRODUCT_COLUMNS, os.path.join(export_dir, "products.parquet"))
+        elif fmt == "jsonl":
+            _write_jsonl(product_rows, os.path.join(export_dir, "products.jsonl.zst"))
+        size = sink.close()
+        if sink.rows:
+            fmt_state["parts"] += 1
+        if fmt == "jsonl":
+            fmt_state["size"] = size
+        new_reviews = max(new_reviews, sink.rows)
+    _save_state(export_dir, state)
+
+    logging.info(f"Exported {len(product_rows)} products and {new_reviews} new reviews to {export_dir} "
+                 f"in {time.time() - start:.1f}s.")
+    return len(product_rows), new_reviews
+
+
+def _new_review_rows(key, product, exported):
+    """Rows for the reviews of product not exported yet, updating exported (product key -> [count, digest])."""
+    comments = product.get("comments") or []
+    entry = exported.get(key) or [0, None]
+    done, digest = entry if isinstance(entry, list) else (entry, None) # Older states only hold the count
+    hashed = _hash_reviews(hashlib.sha1(), comments[:done])
+    # Reviews are only ever appended; a product whose exported reviews changed is exported again.
+    if done > len(comments) or digest not in (None, hashed.hexdigest()):
+        done, hashed = 0, hashlib.sha1()
+    exported[key] = [len(comments), _hash_reviews(hashed, comments[done:]).hexdigest()]
+    return [review_row(key, idx, review) for idx, review in enumerate(comments[done:], start=done)]
+
+
+def _hash_reviews(hashed, reviews):
+    """Feeds the review fingerprints, in order, into hashed and returns it."""
+    for review in reviews:
+        hashed.update(review_fingerprint(review).encode("ascii"))
+    return hashed
+
+
+def product_row(key, product):
+    """Flattens a product dict into a products table row."""
+    detailed = product.get("detailed_rating") or {}
+    row = {
+        "product_key": key,
+        "rating": _to_float(product.get("rating")),
+        "ratings": _to_int(product.get("Ratings")),
+        "sold": _to_int(product.get("sold")),
+        "total_rating": _to_int(product.get("total_rating")),
+        "rating_media": _to_int(detailed.get("media")),
+        "rating_commented": _to_int(detailed.get("commented")),
+        "review_count": len(product.get("comments") or []),
+    }
+    for star in range(1, 6):
+        row[f"rating_{star}_star"] = _to_int(detailed.get(f"{star}_star"))
+    for field in ("link", "name", "price", "location", "img", "shop_name", "shop_profile_url", "description", "category"):
+        value = product.get(field)
+        # Placeholders such as '<Location>' mean the field could not be scraped.
+        row[field] = None if value is None or (isinstance(value, str) and value.startswith("<")) else str(value)
+    return row
+
+
+def review_row(key, idx, review):
+    """Flattens a review dict into a reviews table row."""
+    review_time, _, variation = (review.get("time") or "").partition("|")
+    try:
+        parsed_time = datetime.strptime(review_time.strip()[:16], "%Y-%m-%d %H:%M")
+    except ValueError:
+        parsed_time = None
+    return {
+        "product_key": key,
+        "review_index": idx,
+        "author": review.get("author"),
+        "author_profile_url": review.get("author_profile_url"),
+        "rating": _to_int(review.get("rating")),
+        "time": parsed_time,
+        "variation": variation.replace("Variação:", "").strip() or None,
+        "content": review.get("content"),
+        "seller_respond": review.get("seller_respond") or None,
+        "like_count": _to_int(review.get("like_count")),
+        "images": list(review.get("images") or []),
+        "videos": list(review.get("videos") or []),
+    }
+
+
+def _arrow_type(name):
+    return {
+        "string": pa.string(), "float64": pa.float64(), "int64": pa.int64(), "int32": pa.int32(), "int8": pa.int8(),
+        "timestamp": pa.timestamp("s"), "list": pa.list_(pa.string()),
+    }[name]
+
+
+def _schema(columns):
+    return pa.schema([(name, _arrow_type(kind)) for name, kind in columns])
+
+
+def _write_parquet(rows, columns, path):
+    table = pa.Table.from_pylist(rows, schema=_schema(columns))
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, path)
+
+
+def _json_line(row):
+    def default(value):
+        return value.isoformat(sep=" ") if isinstance(value, datetime) else str(value)
+    return json.dumps(row, ensure_ascii=False, default=default) + "\n"
+
+
+def _write_jsonl(rows, path):
+    """Writes rows as one zstd frame, replacing path."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        with zstandard.ZstdCompressor(level=10).stream_writer(f, closefd=False) as writer:
+            for row in rows:
+                writer.write(_json_line(row).encode("utf-8"))
+    os.replace(tmp_path, path)
+
+
+class _ParquetSink:
+    """Writes review rows into one Parquet part, BATCH_ROWS at a time. The part only appears once closed."""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._batch = []
+        self._writer = None
+
+    def add(self, rows):
+        self._batch.extend(rows)
+        if len(self._batch) >= BATCH_ROWS:
+            self._flush()
+
+    def _flush(self):
+        if not self._batch:
+            return
+        table = pa.Table.from_pylist(self._batch, schema=_schema(_REVIEW_COLUMNS))
+        if self._writer is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._writer = pq.ParquetWriter(f"{self.path}.tmp", table.schema, compression="zstd")
+        self._writer.write_table(table)
+        self.rows += len(self._batch)
+        self._batch = []
+
+    def close(self):
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+            os.replace(f"{self.path}.tmp", self.path)
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+            os.remove(f"{self.path}.tmp")
+
+
+class _JsonlSink:
+    """Appends review rows to a zstd JSONL file as one new frame, BATCH_ROWS at a time.
+
+    Concatenated zstd frames decompress as one stream, so appending a frame appends lines.
+    """
+
+    def __init__(self, path, at):
+        self.path = path
+        self.at = at
+        self.rows = 0
+        self._batch = []
+        self._file = self._writer = None
+
+    def add(self, rows):
+        self._batch.extend(rows)
+        if len(self._batch) >= BATCH_ROWS:
+            self._flush()
+
+    def _flush(self):
+        if not self._batch:
+            return
+        if self._writer is None:
+            self._file = open(self.path, 'ab')
+            if self.at is not None and self.at < self._file.seek(0, os.SEEK_END):
+                self._file.truncate(self.at)
+            self._writer = zstandard.ZstdCompressor(level=10).stream_writer(self._file, closefd=False)
+        self._writer.write("".join(_json_line(row) for row in self._batch).encode("utf-8"))
+        self.rows += len(self._batch)
+        self._batch = []
+
+    def close(self):
+        """Ends the frame and returns the file size."""
+        self._flush()
+        if self._writer is None:
+            return self.at
+        self._writer.close()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        size = self._file.tell()
+        self._file.close()
+        return size
+
+    def abort(self):
+        if self._file is not None:
+            self._file.close() # The partial frame is truncated by the next export
+
+
+def _load_state(export_dir):
+    path = os.path.join(export_dir, _STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _save_state(export_dir, state):
+    path = os.path.join(export_dir, _STATE_FILE)
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def _to_int(value):
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value).strip()
+    if not text or text.startswith("<"):
+        return None
+    return _convert_shortened_number(text)
+
+
+def _to_float(value):
+    try:
+        return float(str(value).replace(",", "."))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,143 @@
+"""Persistent crawl frontier for batch runs over many keywords and product links.
+
+Products are keyed by their canonical "shopid.itemid" key, so an item reached from
+several searches or through links with different tracking parameters is queued once.
+State lives in SQLite, so an interrupted batch continues where it stopped.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from .utils import _canonical_product_key
+
+FRONTIER_FILE = "shopee_frontier.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS keywords (
+    keyword TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    priority INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS products (
+    key TEXT PRIMARY KEY,
+    link TEXT NOT NULL,
+    keyword TEXT,
+    data TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    priority INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS products_queue ON products (status, priority DESC);
+"""
+
+
+class Frontier:
+    """Queue of keywords and products with status ('pending', 'in_progress', 'done', 'failed'),
+    attempt counts and priority (higher first)."""
+
+    def __init__(self, path=FRONTIER_FILE, max_attempts=3):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()  # The worker pool's writer thread finishes products
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        # Whatever was in progress when a previous run stopped is queued again.
+        reset = self.requeue_in_progress()
+        if reset:
+            logging.info(f"Reset {reset} entries left in progress in {path}.")
+
+    def add_keywords(self, keywords, priority=0):
+        """Queues keywords that are not in the frontier yet; returns how many were added."""
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO keywords (keyword, priority, updated_at) VALUES (?, ?, ?)",
+                [(k.strip(), priority, time.time()) for k in keywords if k.strip()])
+            return self._conn.total_changes - before
+
+    def add_products(self, products, keyword=None, priority=0):
+        """Queues products (dicts with a 'link', or links) not seen under any keyword; returns how many were added."""
+        rows = []
+        for prod in products:
+            if isinstance(prod, str):
+                prod = {"link": prod.strip(), "comments": []}
+            if not prod.get("link"):
+                continue
+            key = _canonical_product_key(prod["link"])
+            rows.append((key, prod["link"], keyword, json.dumps(prod, ensure_ascii=False), priority, time.time()))
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO products (key, link, keyword, data, priority, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                rows)
+            return self._conn.total_changes - before
+
+    def claim_keyword(self):
+        """Marks the next pending keyword as in progress and returns it, or None when there is none."""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT keyword FROM keywords WHERE status = 'pending' ORDER BY priority DESC, rowid LIMIT 1").fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE keywords SET status = 'in_progress', attempts = attempts + 1, updated_at = ? WHERE keyword = ?",
+                (time.time(), row[0]))
+            return row[0]
+
+    def finish_keyword(self, keyword, succeeded=True):
+        """Marks a keyword done, or queues it again until it runs out of attempts."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE keywords SET status = CASE WHEN ? THEN 'done' WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,"
+                " updated_at = ? WHERE keyword = ?",
+                (succeeded, self.max_attempts, time.time(), keyword))
+
+    def claim_products(self, limit):
+        """Marks up to limit pending products as in progress and returns their stored dicts."""
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT key, data FROM products WHERE status = 'pending' ORDER BY priority DESC, rowid LIMIT ?",
+                (limit,)).fetchall()
+            self._conn.executemany(
+                "UPDATE products SET status = 'in_progress', attempts = attempts + 1, updated_at = ? WHERE key = ?",
+                [(time.time(), key) for key, _ in rows])
+            return [json.loads(data) for _, data in rows]
+
+    def finish_product(self, link):
+        """Marks the product behind link as done."""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE products SET status = 'done', updated_at = ? WHERE key = ?",
+                               (time.time(), _canonical_product_key(link)))
+
+    def fail_product(self, link):
+        """Queues the product behind link again, or marks it failed once it ran out of attempts."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE products SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,"
+                " updated_at = ? WHERE key = ?",
+                (self.max_attempts, time.time(), _canonical_product_key(link)))
+
+    def requeue_in_progress(self):
+        """Queues in-progress entries again, or fails those out of attempts; returns how many were reset."""
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            for table in ("keywords", "products"):
+                self._conn.execute(
+                    f"UPDATE {table} SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,"
+                    " updated_at = ? WHERE status = 'in_progress'",
+                    (self.max_attempts, time.time()))
+            return self._conn.total_changes - before
+
+    def counts(self):
+        """Returns {table: {status: count}}."""
+        with self._lock:
+            return {table: dict(self._conn.execute(f"SELECT status, COUNT(*) FROM {table} GROUP BY status").fetchall())
+                    for table in ("keywords", "products")}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
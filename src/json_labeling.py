@@ -7,6 +7,35 @@ import argparse
 import pyperclip
 import sys
 import re
+import random
+import shutil
+import asyncio
+import hashlib
+import sqlite3
+import unicodedata
+import itertools
+from collections import deque
+
+try:
+    from .json_stream import iter_json_array as _iter_json_array, write_array_item
+except ImportError:  # Run as a script: python src/json_labeling.py
+    from json_stream import iter_json_array as _iter_json_array, write_array_item
+
+try:
+    import ijson  # Optional: faster incremental parsing for --stream
+except ImportError:
+    ijson = None
+
+try:
+    import numpy as np  # Optional: needed by --backend local
+except ImportError:
+    np = None
+
+# Bump when build_prompt changes, so cached labels from the old prompt are not reused.
+PROMPT_VERSION = 1
+LABEL_CACHE_FILE = "label_cache.db"
+LABELS = ("<NEG>", "<NEU>", "<POS>")
+DEFAULT_BASE_URL = "https://api.openai.com/v1"  # Labels cached before --base-url existed came from here
 
 # Set up logging
 logging.basicConfig(
@@ -40,17 +69,152 @@ def load_json(json_path):
         return []
 
 def save_json(json_path, data):
-    """Save JSON data to a file."""
+    """Save JSON data to a file, atomically."""
     try:
-        with open(json_path, "w", encoding="utf-8") as f:
+        tmp_path = json_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, json_path)
     except Exception as e:
         logging.error(f"Error saving JSON: {str(e)}")
 
-def flatten_comments(data):
+def iter_json_array(json_path, read_size=1 << 20):
+    """
+    Yield the items of a top-level JSON array one by one, without loading the whole file.
+    Uses ijson when installed, otherwise the incremental reader shared with the scraper's output store.
+    """
+    if ijson is not None:
+        with open(json_path, "rb") as f:
+            if not f.read(read_size).strip():
+                return # An empty file holds no items, as with the fallback
+            f.seek(0)
+            yield from ijson.items(f, "item", use_float=True)
+        return
+
+    yield from _iter_json_array(json_path, read_size)
+
+def product_key(item, outer_idx):
+    """Key of a product in the label journal: its link, or its position when it has none."""
+    return item.get("link") or str(outer_idx)
+
+def comment_hash(product, content):
+    """Identity of a comment in the label journal: a hash of its product key and text."""
+    return hashlib.sha1(f"{product}\x1f{content}".encode("utf-8")).hexdigest()[:16]
+
+def iter_unlabeled_comments(json_path, labeled):
+    """
+    Lazily yield the unlabeled, non-empty comments of a file in the same shape as flatten_comments,
+    plus a 'product' key. Comments whose (product, comment_idx) is in labeled are skipped.
+    """
+    counter = 0
+    for outer_idx, item in enumerate(iter_json_array(json_path)):
+        if not isinstance(item, dict) or not isinstance(item.get("comments", []), list):
+            continue
+        key = product_key(item, outer_idx)
+        for comment_idx, cmt in enumerate(item.get("comments", [])):
+            text = cmt.get("content", "").strip()
+            if not text or (key, comment_idx) in labeled:
+                continue
+            if "sentiment" not in cmt or cmt["sentiment"] in ("<NEG/NEU/POS>", None, ""):
+                yield {
+                    "global_index": counter,
+                    "product": key,
+                    "outer_idx": outer_idx,
+                    "comment_idx": comment_idx,
+                    "content": text
+                }
+                counter += 1
+
+def iter_chunks(items, chunk_size):
+    """Group an iterable into lists of chunk_size items."""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def load_label_journal(journal_path):
+    """
+    Read the labels journaled so far, as ({(product, comment_idx): sentiment}, {comment_hash: sentiment}).
+    Later lines win.
+    """
+    by_position, by_hash = {}, {}
+    if not os.path.exists(journal_path):
+        return by_position, by_hash
+    with open(journal_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                logging.warning("Skipping a truncated line in the label journal.")
+                continue
+            by_position[(rec["product"], rec["index"])] = rec["sentiment"]
+            if "hash" in rec:
+                by_hash[rec["hash"]] = rec["sentiment"]
+    return by_position, by_hash
+
+def append_label_journal(journal_path, chunk):
+    """Append the labeled items of a chunk to the journal and flush them to disk."""
+    lines = "".join(
+        json.dumps({"product": it["product"], "index": it["comment_idx"], "hash": comment_hash(it["product"], it["content"]),
+                    "sentiment": it["sentiment"]}, ensure_ascii=False) + "\n"
+        for it in chunk if it.get("sentiment")
+    )
+    if not lines:
+        return 0
+    with open(journal_path, "a", encoding="utf-8") as f:
+        f.write(lines)
+        f.flush()
+        os.fsync(f.fileno())
+    return lines.count("\n")
+
+def keep_backup(json_path):
+    """
+    Keep the current file as _backup.json through a hard link (a copy where links are not supported).
+    An existing backup, which holds the oldest data, is never overwritten.
+    """
+    backup_path = json_path.replace(".json", "_backup.json")
+    if os.path.exists(backup_path):
+        logging.info(f"Keeping the existing backup {backup_path}")
+        return
+    try:
+        os.link(json_path, backup_path)
+    except OSError:
+        shutil.copy2(json_path, backup_path)
+
+def merge_labels_streaming(json_path, labels, backup=True):
+    """
+    Write the labels into the JSON file in one streaming pass: the labeled copy is written
+    item by item to a temporary file that then replaces the original (kept as _backup.json).
+    """
+    tmp_path = json_path + ".tmp"
+    merged = 0
+    with open(tmp_path, "w", encoding="utf-8") as out:
+        written = 0
+        for outer_idx, item in enumerate(iter_json_array(json_path)):
+            if isinstance(item, dict) and isinstance(item.get("comments"), list):
+                key = product_key(item, outer_idx)
+                for comment_idx, cmt in enumerate(item["comments"]):
+                    sentiment = labels.get((key, comment_idx))
+                    if sentiment:
+                        cmt["sentiment"] = sentiment
+                        merged += 1
+            written = write_array_item(out, item, written)
+        out.write("\n]" if written else "[]") # Same layout as save_json
+    if backup:
+        # The link keeps the original's data once the labeled copy replaces it, so json_path never goes missing.
+        keep_backup(json_path)
+    os.replace(tmp_path, json_path)
+    return merged
+
+def flatten_comments(data, journaled=None):
     """
     Flatten all non-empty comments into a list of (index, comment_text).
     Also keep track of where they came from: (outer_idx, comment_idx).
+    Comments whose hash is in journaled get that label in data and are skipped.
     """
     flattened = []
     counter = 0
@@ -60,13 +224,18 @@ def flatten_comments(data):
         comments = item.get("comments", [])
         if not isinstance(comments, list):
             continue
+        key = product_key(item, outer_idx)
         for comment_idx, cmt in enumerate(comments):
             text = cmt.get("content", "").strip()
             if text:  # only consider non-empty
                 # If the comment already has a 'sentiment' key, skip if labeled
                 if "sentiment" not in cmt or cmt["sentiment"] in ("<NEG/NEU/POS>", None, ""):
+                    if journaled and comment_hash(key, text) in journaled:
+                        cmt["sentiment"] = journaled[comment_hash(key, text)]
+                        continue
                     flattened.append({
                         "global_index": counter,
+                        "product": key,
                         "outer_idx": outer_idx,
                         "comment_idx": comment_idx,
                         "content": text
@@ -81,8 +250,9 @@ def restore_comments(data, flattened):
     for item in flattened:
         o_idx = item["outer_idx"]
         c_idx = item["comment_idx"]
-        sentiment = item["sentiment"]
-        data[o_idx]["comments"][c_idx]["sentiment"] = sentiment
+        sentiment = item.get("sentiment")
+        if sentiment:
+            data[o_idx]["comments"][c_idx]["sentiment"] = sentiment
 
 def get_user_input_immediate(chunk, all_items, auto_copy=True):
     """
@@ -160,71 +330,577 @@ def get_user_input_immediate(chunk, all_items, auto_copy=True):
 
     return len(new_labels)
 
-def manual_classify(flattened, chunk_size=10, auto_copy=True):
-    """Manual classification logic."""
-    idx = 0
-    with tqdm(total=len(flattened), desc="Processing comments") as pbar:
-        while idx < len(flattened):
-            chunk = flattened[idx:idx+chunk_size]
+def manual_classify(flattened, chunk_size=10, auto_copy=True, chunks=None, on_chunk=None):
+    """
+    Manual classification logic.
+    chunks may be given instead of flattened (e.g. a lazy stream); on_chunk is called after each chunk.
+    """
+    if chunks is None:
+        chunks = (flattened[i:i+chunk_size] for i in range(0, len(flattened), chunk_size))
+    with tqdm(total=len(flattened) if flattened is not None else None, desc="Processing comments") as pbar:
+        for chunk in chunks:
             processed = get_user_input_immediate(chunk, flattened, auto_copy=auto_copy)
             pbar.update(len(chunk))
             logging.info(f"Processed {processed}/{len(chunk)} comments in chunk")
-            idx += chunk_size
-
-def automatic_classify(flattened, chunk_size=10):
-    """Automatic classification logic using openai (if needed)."""
-    from openai import OpenAI
-    client = OpenAI(api_key="YOUR_API_KEY")
-
-    idx = 0
-    with tqdm(total=len(flattened), desc="Processing comments") as pbar:
-        while idx < len(flattened):
-            chunk = flattened[idx:idx+chunk_size]
-            prompt = (
-                "You are a Vietnamese sentiment classifier. Classify each comment as one of <NEG>, <NEU>, or <POS>. "
-                "Reply in the format: INDEX: <NEG/NEU/POS>\n\n"
-            )
-            for it in chunk:
-                prompt += f"Comment {it['global_index']}: {it['content']}\n"
-            prompt += "\nReply with lines in the form:\nINDEX: <NEG/NEU/POS>\n"
+            if on_chunk:
+                on_chunk(chunk)
+
+class RateLimiter:
+    """Sliding one-minute window over requests and (estimated) tokens."""
 
+    def __init__(self, rpm, tpm):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.events = deque()  # (timestamp, tokens)
+        self.tokens = 0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, tokens):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                while self.events and now - self.events[0][0] >= 60:
+                    self.tokens -= self.events.popleft()[1]
+                fits_tokens = not self.tpm or self.tokens + tokens <= self.tpm or not self.events
+                if (not self.rpm or len(self.events) < self.rpm) and fits_tokens:
+                    self.events.append((now, tokens))
+                    self.tokens += tokens
+                    return
+                await asyncio.sleep(60 - (now - self.events[0][0]) + 0.01)
+
+def build_prompt(chunk):
+    """Prompt asking for one 'INDEX: <NEG/NEU/POS>' line per comment of the chunk."""
+    prompt = (
+        "You are a Vietnamese sentiment classifier. Classify each comment as one of <NEG>, <NEU>, or <POS>. "
+        "Reply in the format: INDEX: <NEG/NEU/POS>\n\n"
+    )
+    for it in chunk:
+        prompt += f"Comment {it['global_index']}: {it['content']}\n"
+    prompt += "\nReply with lines in the form:\nINDEX: <NEG/NEU/POS>\n"
+    return prompt
+
+def apply_reply(chunk, reply):
+    """Set 'sentiment' on the chunk items found in a reply; returns how many were labeled."""
+    processed = 0
+    for line in reply.strip().splitlines():
+        parts = line.split(":")
+        if len(parts) == 2:
+            idx_str, label = parts[0].strip(), parts[1].strip()
+            sentiment_type = extract_sentiment(label)
+            if sentiment_type:
+                try:
+                    real_idx = int(idx_str.replace("Comment", "").strip())
+                    # find item in chunk with global_index == real_idx
+                    for it in chunk:
+                        if it["global_index"] == real_idx:
+                            it["sentiment"] = f"<{sentiment_type}>"
+                            processed += 1
+                            break
+                except ValueError:
+                    logging.error(f"Error parsing index in line {line}")
+    return processed
+
+def is_retryable(error):
+    """
+    Rate limits, timeouts, connection failures (refused, reset, DNS), 408/409 and server errors
+    are worth retrying; other API errors are not.
+    """
+    import openai
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError)):  # APITimeoutError included
+        return True
+    return isinstance(error, openai.APIStatusError) and (error.status_code in (408, 409) or error.status_code >= 500)
+
+class AsyncClassifier:
+    """
+    Sends chunks to an OpenAI-compatible API with a cap on in-flight requests and RPM/TPM limits.
+    Rate limited, timed out, unreachable, 408/409 and 5xx requests back off exponentially up to
+    max_retries; other errors are raised. Comments missing from a reply are sent again in two halves.
+    """
+
+    def __init__(self, model="gpt-4o-mini", base_url=None, concurrency=8, rpm=500, tpm=200000,
+                 max_retries=6, backoff=1.0, max_backoff=60.0):
+        from openai import AsyncOpenAI
+        # The key is read from OPENAI_API_KEY. Retries are done here, with the rate limiter.
+        self.client = AsyncOpenAI(base_url=base_url, max_retries=0)
+        self.model = model
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.limiter = RateLimiter(rpm, tpm)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    async def request(self, prompt):
+        """One chat completion, retried with exponential backoff; returns the reply, or None once out of retries."""
+        # Rough token estimate: prompt characters / 3, plus the reply.
+        tokens = len(prompt) // 3 + 256
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire(tokens)
             try:
-                response = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": "You are a helpful assistant."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.0
-                )
-                answer = response.choices[0].message.content.strip().splitlines()
-                processed = 0
-
-                for line in answer:
-                    parts = line.split(":")
-                    if len(parts) == 2:
-                        idx_str, label = parts[0].strip(), parts[1].strip()
-                        sentiment_type = extract_sentiment(label)
-                        if sentiment_type:
-                            try:
-                                real_idx = int(idx_str.replace("Comment", "").strip())
-                                # find item in chunk with global_index == real_idx
-                                for it in chunk:
-                                    if it["global_index"] == real_idx:
-                                        it["sentiment"] = f"<{sentiment_type}>"
-                                        processed += 1
-                                        break
-                            except ValueError:
-                                logging.error(f"Error parsing index in line {line}")
-            
+                async with self.semaphore:
+                    response = await self.client.chat.completions.create(
+                        model=self.model,
+                        messages=[
+                            {"role": "system", "content": "You are a helpful assistant."},
+                            {"role": "user", "content": prompt}
+                        ],
+                        temperature=0.0
+                    )
+                return response.choices[0].message.content or ""
             except Exception as e:
-                logging.error(f"API error: {str(e)}")
-                time.sleep(5)
-                continue
+                if not is_retryable(e):
+                    logging.error(f"API error, not retrying: {str(e)}")
+                    raise
+                if attempt == self.max_retries:
+                    logging.error(f"API error, giving up after {attempt + 1} attempts: {str(e)}")
+                    return None
+                delay = min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+                logging.warning(f"API error: {str(e)}; retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
 
-            pbar.update(len(chunk))
+    async def classify(self, chunk):
+        """Label a chunk; returns how many of its comments got a label."""
+        reply = await self.request(build_prompt(chunk))
+        if reply is None:
+            return 0
+        processed = apply_reply(chunk, reply)
+        missing = [it for it in chunk if not it.get("sentiment")]
+        if missing and len(chunk) > 1:
+            logging.info(f"{len(missing)} comments missing from the reply, retrying them in halves")
+            half = (len(missing) + 1) // 2
+            results = await asyncio.gather(*(self.classify(part) for part in (missing[:half], missing[half:]) if part))
+            processed += sum(results)
+        elif missing:
+            logging.warning(f"No label for comment {missing[0]['global_index']}")
+        return processed
+
+async def classify_chunks_async(chunks, classifier, on_chunk=None, pbar=None, concurrency=8):
+    """Run classifier over an iterable of chunks, keeping up to concurrency chunks in flight."""
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def worker():
+        while True:
+            chunk = await queue.get()
+            if chunk is None:
+                return
+            processed = await classifier.classify(chunk)
             logging.info(f"Processed {processed}/{len(chunk)} comments in chunk")
-            idx += chunk_size
+            if pbar is not None:
+                pbar.update(len(chunk))
+            if on_chunk:
+                on_chunk(chunk)
+
+    async def produce():
+        for chunk in chunks:
+            await queue.put(chunk)
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    tasks = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    tasks.append(asyncio.create_task(produce()))
+    try:
+        # Stop at the first error, so a dead worker cannot leave the producer waiting on a full queue.
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+def automatic_classify(flattened, chunk_size=10, chunks=None, on_chunk=None, **classifier_options):
+    """
+    Automatic classification logic using openai (if needed).
+    chunks may be given instead of flattened (e.g. a lazy stream); on_chunk is called after each chunk.
+    classifier_options are passed to AsyncClassifier (model, base_url, concurrency, rpm, tpm, max_retries).
+    """
+    if chunks is None:
+        chunks = (flattened[i:i+chunk_size] for i in range(0, len(flattened), chunk_size))
+
+    async def run():
+        classifier = AsyncClassifier(**classifier_options)
+        with tqdm(total=len(flattened) if flattened is not None else None, desc="Processing comments") as pbar:
+            await classify_chunks_async(chunks, classifier, on_chunk=on_chunk, pbar=pbar,
+                                        concurrency=classifier_options.get("concurrency", 8))
+
+    asyncio.run(run())
+
+def normalize_text(text):
+    """Normalization applied before hashing: NFKC, lowercase, collapsed whitespace."""
+    return " ".join(unicodedata.normalize("NFKC", text).lower().split())
+
+def cache_key(text, namespace):
+    """Hash of a comment's normalized text within a prompt/model namespace."""
+    return hashlib.sha1(f"{namespace}\x1f{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+class LabelCache:
+    """Persistent text-hash -> label cache; the least recently used entries are evicted beyond max_entries."""
+
+    def __init__(self, path=LABEL_CACHE_FILE, max_entries=1000000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = self.misses = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(
+            "CREATE TABLE IF NOT EXISTS labels (key TEXT PRIMARY KEY, label TEXT NOT NULL, last_used REAL NOT NULL) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS labels_last_used ON labels (last_used);"
+        )
+
+    def get(self, key):
+        row = self.conn.execute("SELECT label FROM labels WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.conn.execute("UPDATE labels SET last_used = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def put(self, key, label):
+        self.conn.execute("INSERT OR REPLACE INTO labels (key, label, last_used) VALUES (?, ?, ?)", (key, label, time.time()))
+
+    def commit(self):
+        self.conn.commit()
+
+    def evict(self):
+        """Drop the least recently used entries above max_entries; returns how many were dropped."""
+        count = self.conn.execute("SELECT COUNT(*) FROM labels").fetchone()[0]
+        excess = count - self.max_entries
+        if excess <= 0:
+            return 0
+        self.conn.execute("DELETE FROM labels WHERE key IN (SELECT key FROM labels ORDER BY last_used LIMIT ?)", (excess,))
+        self.conn.commit()
+        return excess
+
+    def close(self):
+        self.commit()
+        evicted = self.evict()
+        if evicted:
+            logging.info(f"Evicted {evicted} least recently used entries from the label cache.")
+        self.conn.close()
+
+class CacheFilter:
+    """
+    Sits between the comment source and the classifier: cached comments are labeled right away,
+    repeats of a text already on its way to the classifier wait for its label, and only the rest
+    is yielded. resolved receives the items labeled without the classifier, in batches.
+    """
+
+    def __init__(self, cache, namespace, resolved=None, batch_size=256):
+        self.cache = cache
+        self.namespace = namespace
+        self.resolved = resolved
+        self.batch_size = batch_size
+        self.pending = {}  # key -> repeats waiting for the first occurrence's label
+        self.buffer = []
+        self.repeats = 0
+
+    def filter(self, items):
+        for it in items:
+            key = cache_key(it["content"], self.namespace)
+            it["cache_key"] = key
+            label = self.cache.get(key)
+            if label:
+                it["sentiment"] = label
+                self._resolve(it)
+            elif key in self.pending:
+                self.repeats += 1
+                self.pending[key].append(it)
+            else:
+                self.pending[key] = []
+                yield it
+
+    def done(self, chunk, store=True):
+        """
+        Store the labels of a classified chunk and apply them to the waiting repeats.
+        With store=False (e.g. local model labels) the repeats are labeled but nothing is cached.
+        """
+        for it in chunk:
+            repeats = self.pending.pop(it.get("cache_key"), [])
+            if not it.get("sentiment"):
+                continue
+            if store:
+                self.cache.put(it["cache_key"], it["sentiment"])
+            for rep in repeats:
+                rep["sentiment"] = it["sentiment"]
+                self._resolve(rep)
+        self.cache.commit()
+        self.flush()
+
+    def _resolve(self, it):
+        self.buffer.append(it)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer and self.resolved:
+            self.resolved(self.buffer)
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+        total = self.cache.hits + self.cache.misses
+        rate = 100 * self.cache.hits / total if total else 0
+        logging.info(f"Label cache: {self.cache.hits} hits, {self.cache.misses} misses ({rate:.1f}% hit rate), "
+                     f"{self.repeats} repeated texts labeled once.")
+        self.cache.close()
+
+def open_cache_filter(args, resolved=None):
+    """CacheFilter for the command line options, or None with --no-cache."""
+    if args.no_cache:
+        return None
+    # Manual labels are kept apart from the ones of each API model, and of the same model name on another endpoint.
+    namespace = f"v{PROMPT_VERSION}:{'manual' if args.manual else args.model}"
+    base_url = (args.base_url or os.environ.get("OPENAI_BASE_URL") or DEFAULT_BASE_URL).rstrip("/").lower()
+    if not args.manual and base_url != DEFAULT_BASE_URL:
+        namespace += f"@{base_url}"
+    return CacheFilter(LabelCache(args.cache, max_entries=args.cache_size), namespace, resolved=resolved)
+
+def hashed_features(texts, n_features):
+    """
+    Sparse bag of hashed word unigrams and bigrams, as (row, column) index arrays;
+    a repeated (row, column) pair counts once per occurrence.
+    The normalized texts are hashed in place as byte spans of one buffer, with no per-token Python work.
+    """
+    data = np.frombuffer("\n".join(normalize_text(text) for text in texts).encode("utf-8"), dtype=np.uint8)
+    # Normalized words are separated by single spaces and the texts by newlines.
+    breaks = np.flatnonzero((data == ord(" ")) | (data == ord("\n")))
+    starts = np.concatenate(([0], breaks + 1))
+    ends = np.append(breaks, len(data))
+    row = np.concatenate(([0], np.cumsum(data[breaks] == ord("\n"))))
+    words = ends > starts  # Empty texts leave empty spans
+    starts, ends, row = starts[words], ends[words], row[words]
+    # A bigram is the span from a word's start to the next word's end, when both are in the same text.
+    pairs = row[1:] == row[:-1]
+    rows = np.concatenate((row, row[:-1][pairs])).astype(np.int64)
+    hashes = fnv1a_spans(data, np.concatenate((starts, starts[:-1][pairs])), np.concatenate((ends, ends[1:][pairs])))
+    return rows, hashes.astype(np.int64) & (n_features - 1)
+
+def fnv1a_spans(data, starts, ends):
+    """32-bit FNV-1a of every data[start:end] span, advancing all spans one byte per step."""
+    lengths = ends - starts
+    order = np.argsort(-lengths, kind="stable")  # Longest first, so the spans still running are a prefix
+    starts, lengths = starts[order], lengths[order]
+    running = np.searchsorted(-lengths, -np.arange(1, lengths.max(initial=0) + 1), side="right")
+    hashes = np.full(len(starts), 2166136261, dtype=np.uint32)
+    for step, n in enumerate(running):
+        hashes[:n] = (hashes[:n] ^ data[starts[:n] + step]) * np.uint32(16777619)
+    result = np.empty_like(hashes)
+    result[order] = hashes
+    return result
+
+class NaiveBayes:
+    """Multinomial naive Bayes over hashed n-gram counts."""
+
+    def __init__(self, n_features=1 << 18, alpha=1.0):
+        self.n_features = n_features
+        self.alpha = alpha
+
+    def fit(self, texts, labels):
+        self.classes = sorted(set(labels))
+        y = np.array([self.classes.index(label) for label in labels], dtype=np.int64)
+        rows, cols = hashed_features(texts, self.n_features)
+        counts = np.bincount(y[rows] * self.n_features + cols, minlength=len(self.classes) * self.n_features)
+        counts = counts.reshape(len(self.classes), self.n_features).astype(np.float64) + self.alpha
+        self.feature_log_prob = np.log(counts / counts.sum(axis=1, keepdims=True))
+        self.class_log_prior = np.log(np.bincount(y, minlength=len(self.classes)) / len(y))
+        return self
+
+    def predict(self, texts):
+        """Returns (labels, confidences) for a batch of texts."""
+        rows, cols = hashed_features(texts, self.n_features)
+        scores = np.empty((len(texts), len(self.classes)))
+        for c in range(len(self.classes)):
+            scores[:, c] = self.class_log_prior[c] + np.bincount(rows, weights=self.feature_log_prob[c, cols], minlength=len(texts))
+        scores -= scores.max(axis=1, keepdims=True)
+        probs = np.exp(scores)
+        probs /= probs.sum(axis=1, keepdims=True)
+        best = probs.argmax(axis=1)
+        return [self.classes[b] for b in best], probs[np.arange(len(texts)), best]
+
+def labeled_texts(items):
+    """Yield (content, label) for the comments of the given products that already carry a label."""
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get("comments"), list):
+            continue
+        for cmt in item["comments"]:
+            text = cmt.get("content", "").strip()
+            if text and cmt.get("sentiment") in LABELS:
+                yield text, cmt["sentiment"]
+
+def iter_labeled_texts(paths):
+    """Yield (content, label) for the comments of the given files that already carry a label."""
+    for path in paths:
+        yield from labeled_texts(iter_json_array(path))
+
+class LocalFilter:
+    """
+    Labels comments with a local model in vectorized batches and yields only those whose
+    confidence is below threshold, to be escalated to the API (or manual) backend.
+    resolved receives the locally labeled items, one batch at a time.
+    """
+
+    def __init__(self, model, threshold, resolved=None, batch_size=4096):
+        self.model = model
+        self.threshold = threshold
+        self.resolved = resolved
+        self.batch_size = batch_size
+        self.labeled = self.escalated = 0
+
+    def filter(self, items):
+        batch = []
+        for it in items:
+            batch.append(it)
+            if len(batch) == self.batch_size:
+                yield from self._classify(batch)
+                batch = []
+        if batch:
+            yield from self._classify(batch)
+
+    def _classify(self, batch):
+        labels, confidences = self.model.predict([it["content"] for it in batch])
+        confident, escalated = [], []
+        for it, label, confidence in zip(batch, labels, confidences):
+            if confidence >= self.threshold:
+                it["sentiment"] = label
+                confident.append(it)
+            else:
+                escalated.append(it)
+        self.labeled += len(confident)
+        self.escalated += len(escalated)
+        if confident and self.resolved:
+            self.resolved(confident)
+        return escalated
+
+    def close(self):
+        logging.info(f"Local model: {self.labeled} comments labeled, {self.escalated} escalated "
+                     f"(confidence below {self.threshold}).")
+
+def open_local_filter(args, labeled, resolved=None):
+    """
+    LocalFilter trained on labeled, the (content, label) pairs of the input, and on the --train files;
+    None if not in use.
+    """
+    if args.backend != "local":
+        return None
+    if np is None:
+        raise RuntimeError("The local backend needs numpy: pip install numpy")
+    start = time.time()
+    texts, labels = [], []
+    for text, label in itertools.chain(labeled, iter_labeled_texts(args.train)):
+        texts.append(text)
+        labels.append(label)
+    if len(texts) < args.min_train_labels or len(set(labels)) < 2:
+        logging.warning(f"Only {len(texts)} labeled comments to train on, sending everything to the "
+                        f"{'manual' if args.manual else 'API'} backend.")
+        return None
+    model = NaiveBayes().fit(texts, labels)
+    logging.info(f"Trained the local model on {len(texts)} labels in {time.time() - start:.1f}s.")
+    return LocalFilter(model, args.local_threshold, resolved=resolved)
+
+class Checkpointer:
+    """
+    on_chunk hook for in-memory mode: every finished chunk is appended to the label journal,
+    and every `every` chunks the labels are merged into the JSON file atomically.
+    Labels found without the classifier go through journal() and do not count as chunks.
+    """
+
+    def __init__(self, json_path, journal_path, data, flattened, every=50):
+        self.json_path = json_path
+        self.journal_path = journal_path
+        self.data = data
+        self.flattened = flattened
+        self.every = every
+        self.chunks = 0
+        self.dirty = False
+
+    def __call__(self, chunk):
+        self.journal(chunk)
+        self.chunks += 1
+        if self.every and self.chunks % self.every == 0:
+            self.merge()
+
+    def journal(self, items):
+        append_label_journal(self.journal_path, items)
+        self.dirty = True
+
+    def merge(self):
+        if not self.dirty:
+            return
+        self.dirty = False
+        restore_comments(self.data, self.flattened)
+        save_json(self.json_path, self.data)
+        logging.info(f"Checkpoint: labels of {self.chunks} chunks merged into {self.json_path}")
+
+def classifier_options(args):
+    """AsyncClassifier options from the command line."""
+    return {
+        "model": args.model,
+        "base_url": args.base_url,
+        "concurrency": args.concurrency,
+        "rpm": args.rpm,
+        "tpm": args.tpm,
+        "max_retries": args.max_retries,
+    }
+
+def run_streaming(args):
+    """
+    Streaming mode: comments are read lazily, each finished chunk is appended to the label journal,
+    and the labels are merged into the JSON in a single streaming pass at the end.
+    Re-running after a crash skips everything already in the journal.
+    """
+    json_path = args.file
+    journal_path = json_path + ".labels.jsonl"
+    labels, _ = load_label_journal(journal_path)
+    if labels:
+        logging.info(f"Resuming with {len(labels)} labels from {journal_path}")
+
+    def save_labels(chunk):
+        append_label_journal(journal_path, chunk)
+        for it in chunk:
+            if it.get("sentiment"):
+                labels[(it["product"], it["comment_idx"])] = it["sentiment"]
+
+    comments = iter_unlabeled_comments(json_path, set(labels))
+    on_chunk = save_labels
+    cache_filter = open_cache_filter(args, resolved=save_labels)
+    if cache_filter:
+        comments = cache_filter.filter(comments)
+
+        def on_chunk(chunk):
+            cache_filter.done(chunk)
+            save_labels(chunk)
+
+    def save_local_labels(items):
+        save_labels(items)
+        if cache_filter:
+            cache_filter.done(items, store=False)
+
+    # Nothing is loaded in streaming mode, so the labels to train on take their own pass over the file.
+    local_filter = open_local_filter(args, iter_labeled_texts([json_path]), resolved=save_local_labels)
+    if local_filter:
+        comments = local_filter.filter(comments)
+
+    chunks = iter_chunks(comments, args.chunk_size)
+    try:
+        # Nothing may be left for the API once the cache and the local model have run.
+        first = next(chunks, None)
+        if first is not None:
+            chunks = itertools.chain([first], chunks)
+            if args.manual:
+                manual_classify(None, auto_copy=not args.no_auto_copy, chunks=chunks, on_chunk=on_chunk)
+            else:
+                automatic_classify(None, chunks=chunks, on_chunk=on_chunk, **classifier_options(args))
+    finally:
+        if local_filter:
+            local_filter.close()
+        if cache_filter:
+            cache_filter.close()
+
+    if not labels:
+        logging.info("No labels to merge.")
+        return
+    merged = merge_labels_streaming(json_path, labels)
+    os.remove(journal_path)
+    logging.info(f"Merged {merged} labels into {json_path}.")
 
 def main():
     parser = argparse.ArgumentParser()
@@ -232,33 +908,92 @@ def main():
     parser.add_argument("-c", "--chunk_size", type=int, default=20, help="Chunk size for processing")
     parser.add_argument("-f", "--file", type=str, default='shopee_genshinimpact.json', help="Path to JSON file")
     parser.add_argument("--no-auto-copy", action="store_true", help="Disable auto-copy to clipboard")
+    parser.add_argument("--stream", action="store_true", help="Stream the file instead of loading it; labels are merged in one pass at the end")
+    parser.add_argument("--model", type=str, default="gpt-4o-mini", help="Model used in automatic mode")
+    parser.add_argument("--base-url", type=str, default=None, help="OpenAI-compatible API base URL (the key is read from OPENAI_API_KEY)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum requests in flight in automatic mode")
+    parser.add_argument("--rpm", type=int, default=500, help="Requests per minute limit (0 for none)")
+    parser.add_argument("--tpm", type=int, default=200000, help="Estimated tokens per minute limit (0 for none)")
+    parser.add_argument("--max-retries", type=int, default=6, help="Retries per request before a chunk is left unlabeled")
+    parser.add_argument("--backend", choices=["api", "local"], default="api",
+                        help="local: label with a model trained on existing labels, escalating low-confidence comments to the API (or to manual mode with -m)")
+    parser.add_argument("--train", type=str, nargs="*", default=[], help="Extra labeled JSON files to train the local model on")
+    parser.add_argument("--local-threshold", type=float, default=0.9, help="Minimum confidence for a local label; below it the comment is escalated")
+    parser.add_argument("--min-train-labels", type=int, default=200, help="Labels needed to train the local model")
+    parser.add_argument("--checkpoint-every", type=int, default=50, help="Merge journaled labels into the JSON every N classified chunks (0: only at the end)")
+    parser.add_argument("--cache", type=str, default=LABEL_CACHE_FILE, help="Label cache database shared across files and runs")
+    parser.add_argument("--cache-size", type=int, default=1000000, help="Maximum labels kept in the cache (least recently used are evicted)")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the label cache")
     args = parser.parse_args()
 
+    if args.stream:
+        run_streaming(args)
+        return
+
     # Load data
     json_path = args.file
     logging.info(f"Loading JSON from {json_path}")
     data = load_json(json_path)
 
+    # Labels journaled by an interrupted run
+    journal_path = json_path + ".labels.jsonl"
+    _, journaled = load_label_journal(journal_path)
+    if journaled:
+        logging.info(f"Resuming with {len(journaled)} labels from {journal_path}")
+    else:
+        # Backup original
+        backup_path = json_path.replace(".json", "_backup.json")
+        logging.info(f"Backing up to {backup_path}")
+        save_json(backup_path, data)
+
     # Flatten relevant comments
-    flattened = flatten_comments(data)
+    flattened = flatten_comments(data, journaled)
     if not flattened:
         logging.info("No unlabeled, non-empty comments found.")
+        if journaled:
+            save_json(json_path, data)
+            os.remove(journal_path)
         return
 
-    # Backup original
-    backup_path = json_path.replace(".json", "_backup.json")
-    logging.info(f"Backing up to {backup_path}")
-    save_json(backup_path, data)
+    checkpoint = Checkpointer(json_path, journal_path, data, flattened, every=args.checkpoint_every)
 
-    # Classify
-    if args.manual:
-        manual_classify(flattened, chunk_size=args.chunk_size, auto_copy=not args.no_auto_copy)
-    else:
-        automatic_classify(flattened, chunk_size=args.chunk_size)
+    def save_local_labels(items):
+        checkpoint.journal(items)
+        if cache_filter:
+            cache_filter.done(items, store=False)
+
+    # Label what the cache already knows (then what the local model is sure of), classify the rest
+    cache_filter = open_cache_filter(args, resolved=checkpoint.journal)
+    local_filter = open_local_filter(args, labeled_texts(data), resolved=save_local_labels)
+    to_classify = flattened
+    if cache_filter:
+        to_classify = cache_filter.filter(to_classify)
+    if local_filter:
+        to_classify = local_filter.filter(to_classify)
+    to_classify = list(to_classify)
+
+    def on_chunk(chunk):
+        if cache_filter:
+            cache_filter.done(chunk)
+        checkpoint(chunk)
+
+    try:
+        if not to_classify:
+            logging.info("All comments were labeled without the classifier.")
+        elif args.manual:
+            manual_classify(to_classify, chunk_size=args.chunk_size, auto_copy=not args.no_auto_copy, on_chunk=on_chunk)
+        else:
+            automatic_classify(to_classify, chunk_size=args.chunk_size, on_chunk=on_chunk, **classifier_options(args))
+    finally:
+        if local_filter:
+            local_filter.close()
+        if cache_filter:
+            cache_filter.close()
+        # Write back results (also when interrupted; the journal is kept until a run completes)
+        checkpoint.merge()
 
-    # Write back results
-    restore_comments(data, flattened)
-    save_json(json_path, data)
+    if os.path.exists(journal_path):
+        os.remove(journal_path)
     logging.info("Classification completed and saved.")
 
 if __name__ == "__main__":
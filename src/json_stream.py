@@ -0,0 +1,68 @@
+"""Incremental reading and writing of large top-level JSON arrays.
+
+Kept free of package imports, so json_labeling.py can still be run as a script.
+"""
+import json
+import re
+import textwrap
+
+_WHITESPACE = re.compile(r"[ \t\r\n]*")
+
+
+def iter_json_array(path, read_size=1 << 20):
+    """Yields the items of the JSON array in path one by one, without loading the whole file.
+
+    An empty file holds no items. Raises ValueError (json.JSONDecodeError for malformed
+    or truncated arrays) when path does not hold a JSON array.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buf, pos, eof = "", 0, False
+        expect = "["  # "[", "item or ]", "item", ", or ]"
+        while True:
+            pos = _WHITESPACE.match(buf, pos).end()
+            if pos == len(buf):
+                if eof:
+                    if expect == "[":
+                        return
+                    raise json.JSONDecodeError("Unterminated array", buf, pos)
+                buf, pos, eof = _refill(f, buf, pos, read_size)
+                continue
+            char = buf[pos]
+            if expect == "[":
+                if char != "[":
+                    raise ValueError(f"{path} does not contain a JSON array")
+                pos, expect = pos + 1, "item or ]"
+            elif expect == ", or ]" or (expect == "item or ]" and char == "]"):
+                if char == "]":
+                    return
+                if char != ",":
+                    raise json.JSONDecodeError("Expecting ',' delimiter", buf, pos)
+                pos, expect = pos + 1, "item"
+            else:
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                    # A number cut by the read may look complete ("6." reads as 6): wait for the delimiter.
+                    complete = eof or (end < len(buf) and buf[end] in " \t\r\n,]")
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    complete = False
+                if not complete:
+                    buf, pos, eof = _refill(f, buf, pos, read_size)
+                    continue
+                yield item
+                pos, expect = end, ", or ]"
+
+
+def _refill(f, buf, pos, read_size):
+    """Drops the consumed part of buf and reads more; reads grow with the pending item, so large items decode in linear time."""
+    chunk = f.read(max(read_size, len(buf) - pos))
+    return buf[pos:] + chunk, 0, not chunk
+
+
+def write_array_item(f, item, written):
+    """Writes item as the next element of a JSON array, formatted like json.dump(..., indent=2)."""
+    f.write("[\n" if not written else ",\n")
+    f.write(textwrap.indent(json.dumps(item, ensure_ascii=False, indent=2), "  "))
+    return written + 1
@@ -0,0 +1,165 @@
+"""Passive capture of the JSON the Shopee frontend downloads, through CDP network events.
+
+Only response metadata is recorded while events arrive; bodies are fetched with
+Network.getResponseBody when the scraper asks for them, on the driver's own thread.
+"""
+import base64
+import json
+import logging
+import threading
+from urllib.parse import urlparse, parse_qs
+from .review_api import _rating_to_review
+from .utils import _canonical_product_key
+
+_ENDPOINTS = {
+    "search": ("/api/v4/search/search_items",),
+    "item": ("/api/v4/pdp/get_pc", "/api/v4/item/get"),
+    "ratings": ("/api/v2/item/get_ratings",),
+}
+_PRICE_DIVISOR = 100000  # Prices in the API are integers scaled by 1e5
+_MAX_BODY_ATTEMPTS = 3
+
+# Fields a captured item must provide for DOM extraction of basic info to be skipped.
+CAPTURED_BASIC_FIELDS = {"name", "price", "rating", "Ratings", "sold", "shop_name", "shop_profile_url", "description", "category"}
+
+
+class NetworkCapture:
+    """Collects search, item and ratings responses seen by the browser."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = []  # (kind, requestId, url, attempts)
+        self.search_products = []
+        self.items = {}  # canonical key -> product fields
+        self.ratings = {}  # canonical key -> list of (type, filter, offset, reviews) in arrival order
+
+    def attach(self, driver):
+        driver.add_cdp_listener("Network.responseReceived", self._on_response)
+
+    def _on_response(self, message):
+        params = message.get("params", {})
+        url = params.get("response", {}).get("url", "")
+        path = urlparse(url).path
+        for kind, paths in _ENDPOINTS.items():
+            if path in paths:
+                with self._lock:
+                    self._pending.append((kind, params.get("requestId"), url, 0))
+                return
+
+    def drain(self, driver):
+        """Fetches and decodes the bodies of every response captured so far."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        retry = []
+        for kind, request_id, url, attempts in pending:
+            try:
+                body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+            except Exception as e:
+                # The body may still be loading; try again on the next drain.
+                if attempts + 1 < _MAX_BODY_ATTEMPTS:
+                    retry.append((kind, request_id, url, attempts + 1))
+                logging.debug(f"Could not read captured {kind} response body yet: {e}")
+                continue
+            try:
+                text = base64.b64decode(body["body"]).decode("utf-8") if body.get("base64Encoded") else body["body"]
+                self._decode(kind, url, json.loads(text))
+            except Exception as e:
+                logging.debug(f"Could not decode captured {kind} response from {url}: {e}")
+        if retry:
+            with self._lock:
+                self._pending.extend(retry)
+
+    def take_search_products(self, driver):
+        """Returns and forgets the search results captured so far."""
+        self.drain(driver)
+        products, self.search_products = self.search_products, []
+        return products
+
+    def product_details(self, driver, link):
+        """Returns the captured item fields for a product link, if its item response was seen."""
+        self.drain(driver)
+        return self.items.get(_canonical_product_key(link))
+
+    def take_ratings(self, driver, link):
+        """Returns and forgets the (type, filter, offset, reviews) pages captured for a product link.
+
+        type and filter are the request's star and filter parameters, so pages of one review
+        filter are not mistaken for another filter's page at the same offset.
+        """
+        self.drain(driver)
+        return self.ratings.pop(_canonical_product_key(link), [])
+
+    def _decode(self, kind, url, data):
+        parsed = urlparse(url)
+        base_url = f"{parsed.scheme}://{parsed.netloc}"
+        if kind == "search":
+            for entry in data.get("items") or []:
+                self.search_products.append(_decode_search_item(entry, base_url))
+        elif kind == "item":
+            payload = data.get("data") or {}
+            item = payload.get("item") or payload
+            if item.get("itemid"):
+                product = _decode_item(item, payload.get("shop_detailed") or {}, base_url)
+                self.items[f"{item['shopid']}.{item['itemid']}"] = product
+        elif kind == "ratings":
+            query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+            ratings = (data.get("data") or {}).get("ratings") or []
+            key = f"{query.get('shopid')}.{query.get('itemid')}"
+            reviews = [_rating_to_review(r, base_url) for r in ratings]
+            page = (int(query.get("type") or 0), int(query.get("filter") or 0), int(query.get("offset") or 0), reviews)
+            self.ratings.setdefault(key, []).append(page)
+
+
+def _format_price(raw_min, raw_max=None):
+    def fmt(raw):
+        value = f"{raw / _PRICE_DIVISOR:,.2f}"
+        return "R$" + value.replace(",", "_").replace(".", ",").replace("_", ".")
+    if raw_max and raw_max != raw_min:
+        return f"{fmt(raw_min)} - {fmt(raw_max)}"
+    return fmt(raw_min)
+
+
+def _decode_search_item(entry, base_url):
+    """Converts a search_items entry into the dict produced by the search page parser."""
+    item = entry.get("item_basic") or entry
+    image = item.get("image")
+    return {
+        "link": f"{base_url}/product/{item['shopid']}/{item['itemid']}",
+        "name": item.get("name") or "<Product name>",
+        "price": _format_price(item.get("price_min") or item.get("price") or 0, item.get("price_max")),
+        "rating": f"{(item.get('item_rating') or {}).get('rating_star') or 0:.1f}",
+        "location": item.get("shop_location") or "<Location>",
+        "img": f"https://down-br.img.susercontent.com/file/{image}" if image else "<Image>",
+        "sold": item.get("historical_sold") or item.get("sold") or 0,
+    }
+
+
+def _decode_item(item, shop, base_url):
+    """Converts an item/pdp response into the fields produced by the product page parser."""
+    item_rating = item.get("item_rating") or {}
+    counts = item_rating.get("rating_count") or []
+    detailed_rating = {}
+    if len(counts) >= 6:
+        detailed_rating["all"] = counts[0]
+        for star in range(5, 0, -1):
+            detailed_rating[f"{star}_star"] = counts[star]
+    if "rcount_with_context" in item_rating:
+        detailed_rating["commented"] = item_rating["rcount_with_context"]
+    if "rcount_with_image" in item_rating:
+        detailed_rating["media"] = item_rating["rcount_with_image"]
+
+    categories = [c.get("display_name") for c in item.get("categories") or [] if c.get("display_name")]
+    product = {
+        "name": item.get("name"),
+        "price": _format_price(item.get("price_min") or item.get("price") or 0, item.get("price_max")),
+        "rating": f"{item_rating.get('rating_star') or 0:.1f}",
+        "Ratings": counts[0] if counts else 0,
+        "sold": item.get("historical_sold") or item.get("sold") or 0,
+        "shop_name": shop.get("name"),
+        "shop_profile_url": f"{base_url}/shop/{item['shopid']}",
+        "description": (item.get("description") or "").replace('\n', ' ').strip(),
+        "category": " ".join(categories),
+        "detailed_rating": detailed_rating,
+        "total_rating": sum(detailed_rating.get(f"{star}_star", 0) for star in range(1, 6)),
+    }
+    return {k: v for k, v in product.items() if v is not None}
@@ -0,0 +1,87 @@
+"""lxml equivalent of the WebDriver review extractor, fed with HTML captured from the browser.
+
+The functions here are module-level and only take plain strings so they can run in a
+process pool while the browser moves on to the next page.
+"""
+import logging
+import re
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urljoin
+from lxml import html as lxml_html
+from .xpaths import _REVIEW_XPATHS
+
+_SOLID_STAR_CLASS = 'shopee-svg-icon icon-rating-solid--active icon-rating-solid'
+_HIDDEN_STYLE = re.compile(r'display\s*:\s*none|visibility\s*:\s*hidden')
+
+
+def parse_review_page(page_html, base_url, limit):
+    """Offline version of _extract_review_data for every review in a captured rating list.
+
+    Layout is not available offline, so images are kept unless they are hidden by inline
+    style or have a zero width/height attribute.
+    """
+    doc = lxml_html.fromstring(page_html)
+    reviews = []
+    for item in doc.xpath(_REVIEW_XPATHS["item"])[:limit]:
+        author = item.find_class('shopee-product-rating__author-name')
+        author = author[0] if author else None
+        rating_box = _first(item, _REVIEW_XPATHS["rating"])
+        stars = 0
+        if rating_box is not None:
+            stars = sum(1 for s in rating_box if _SOLID_STAR_CLASS in (s.get("class") or ""))
+
+        content = ""
+        for xpath in _REVIEW_XPATHS["content"]:
+            el = _first(item, xpath)
+            if el is not None:
+                content = _text(el) or ""
+                break
+
+        like_text = _text(_first(item, _REVIEW_XPATHS["like_count"])) or ""
+        reviews.append({
+            "author": _text(author) or "",
+            "author_profile_url": urljoin(base_url, author.get("href")) if author is not None and author.get("href") else "",
+            "rating": stars,
+            "time": _text(_first(item, _REVIEW_XPATHS["time"])) or "",
+            "content": content,
+            "seller_respond": _text(_first(item, _REVIEW_XPATHS["seller_respond"])) or "",
+            "like_count": int(like_text) if like_text.isdigit() else 0,
+            "images": [urljoin(base_url, img.get("src")) for img in item.iter("img") if img.get("src") and _is_visible(img)],
+            "videos": [urljoin(base_url, v.get("src")) for v in item.iter("video") if v.get("src")],
+        })
+    return reviews
+
+
+class ParsePipeline:
+    """Process pool that parses captured review pages while the browser keeps paging.
+
+    Search and product pages are not sent here: their results (product links, rating
+    filters) are needed before the next navigation, so a pool round trip would only add IPC.
+    """
+
+    def __init__(self, workers=None):
+        self._executor = ProcessPoolExecutor(max_workers=workers)
+
+    def submit_review_page(self, page_html, base_url, limit):
+        return self._executor.submit(parse_review_page, page_html, base_url, limit)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+def _first(ctx, xpath):
+    found = ctx.xpath(xpath)
+    return found[0] if found else None
+
+
+def _text(el):
+    """Approximates WebDriver's .text: whitespace-normalized text content, or None."""
+    if el is None:
+        return None
+    return re.sub(r'\s+', ' ', " ".join(el.itertext())).strip()
+
+
+def _is_visible(img):
+    if _HIDDEN_STYLE.search(img.get("style") or ""):
+        return False
+    return img.get("width") not in ("0", "0px") and img.get("height") not in ("0", "0px")
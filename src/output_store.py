@@ -0,0 +1,394 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from .json_stream import iter_json_array, write_array_item
+from .utils import _canonical_product_key
+
+
+class OutputJournal:
+    """Append-only JSONL journal kept next to the JSON output file.
+
+    Each save appends only what changed since the previous one (new comments,
+    changed product fields), so its cost no longer depends on the size of the
+    output file. The journal is periodically compacted into the final JSON in
+    a background thread, and replayed on top of it when loading. Compaction
+    streams the output file, so only one stored product is in memory at a time.
+    """
+
+    def __init__(self, out_file, fsync_every=50, fsync_interval=2.0, compact_bytes=64 * 1024 * 1024):
+        self.out_file = out_file
+        self.journal_file = f"{out_file}.journal"
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.compact_bytes = compact_bytes
+        self._lock = threading.Lock()
+        self._fh = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._state = {}  # key -> (serialized product fields, number of journaled comments or None)
+        self._compaction_thread = None
+
+    def load(self, keep_comments=True):
+        """Returns the stored products, keyed by canonical key, with all journals replayed.
+
+        With keep_comments=False, comment lists are not kept in memory: a product's
+        comments become a SpilledComments that only knows their number.
+        """
+        products = {}
+        counts = {}  # key -> number of comments, when they are not kept
+        if os.path.exists(self.out_file):
+            try:
+                for idx, item in enumerate(iter_json_array(self.out_file)):
+                    key = self._key_for(item, idx)
+                    if not keep_comments:
+                        _drop_comments(item, key, counts)
+                    products[key] = item
+            except (json.JSONDecodeError, ValueError):
+                logging.warning(f"Error decoding JSON from {self.out_file}. Starting with empty data.")
+                products, counts = {}, {}
+
+        for path in self._rotated_journals() + [self.journal_file]:
+            if os.path.exists(path):
+                self._replay(path, products, counts if not keep_comments else None)
+
+        for key, count in counts.items():
+            if key in products:
+                products[key]['comments'] = SpilledComments(self, key, count) if count else []
+        self._state = {key: self._snapshot(product) for key, product in products.items()}
+        return products
+
+    def iter_products(self):
+        """Yields (key, product) like load() returns them, reading the output file one product at a time."""
+        journals = [path for path in self._rotated_journals() + [self.journal_file] if os.path.exists(path)]
+        return self._merge(journals)
+
+    def spill_comments(self, product, on_extend=None):
+        """Journals product and replaces its comment list by a SpilledComments of the same length.
+
+        Reviews added to the product from then on go straight to the journal. on_extend is
+        called with every batch of reviews added.
+        """
+        comments = product.get('comments')
+        if isinstance(comments, SpilledComments):
+            comments.on_extend = on_extend
+            return comments
+        self.record([product])
+        product['comments'] = SpilledComments(self, self._key_for(product), len(comments or []), on_extend)
+        return product['comments']
+
+    def append_comments(self, key, start, items):
+        """Journals items as the comments of key from position start on."""
+        with self._lock:
+            self._append_locked([{"op": "comments", "key": key, "start": start, "items": items}])
+            prev_meta, _ = self._state.get(key, (None, None))
+            self._state[key] = (prev_meta, start + len(items))
+
+    def record(self, products):
+        """Appends the changes of the given products since they were last recorded."""
+        with self._lock:
+            # Diffing against _state and journaling the diff is one step, so no append_comments slips in between.
+            records = []
+            for product in products:
+                key = self._key_for(product)
+                if not key:
+                    continue
+                meta, comments = self._split(product)
+                meta_json = json.dumps(meta, ensure_ascii=False, sort_keys=True)
+                prev_meta, prev_count = self._state.get(key, (None, None))
+                count = len(comments) if comments is not None else None
+
+                if isinstance(comments, SpilledComments):
+                    # Its comments were journaled as they were added.
+                    if meta_json != prev_meta:
+                        records.append({"op": "meta", "key": key, "data": meta})
+                elif prev_count is not None and (count is None or count < prev_count):
+                    # Comments were replaced rather than extended, write the whole product again.
+                    records.append({"op": "product", "key": key, "data": product})
+                else:
+                    if meta_json != prev_meta:
+                        records.append({"op": "meta", "key": key, "data": meta})
+                    if count is not None and (prev_count is None or count > prev_count):
+                        start = prev_count or 0
+                        records.append({"op": "comments", "key": key, "start": start, "items": comments[start:]})
+                self._state[key] = (meta_json, count)
+
+            if records:
+                self._append_locked(records)
+        if self._journal_size() >= self.compact_bytes:
+            self.compact(wait=False)
+
+    def sync(self):
+        """Forces every appended record to disk."""
+        with self._lock:
+            self._sync_locked()
+
+    def compact(self, wait=True):
+        """Merges the journal into the output JSON. Runs in the background unless wait is set."""
+        with self._lock:
+            if self._compaction_thread and self._compaction_thread.is_alive():
+                if not wait:
+                    return
+                running = self._compaction_thread
+            else:
+                running = None
+        if running:
+            running.join()
+
+        with self._lock:
+            self._rotate_locked()
+            thread = threading.Thread(target=self._compact_rotated, name="journal-compaction", daemon=True)
+            self._compaction_thread = thread
+            thread.start()
+        if wait:
+            thread.join()
+
+    def close(self):
+        """Compacts everything into the output JSON and removes the journal files."""
+        self.compact(wait=True)
+        with self._lock:
+            if self._fh:
+                self._fh.close()
+                self._fh = None
+
+    def _append_locked(self, records):
+        lines = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+        if self._fh is None:
+            self._fh = open(self.journal_file, 'a', encoding='utf-8')
+        self._fh.write(lines)
+        self._fh.flush()
+        self._unsynced += len(records)
+        if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self._sync_locked()
+
+    def _sync_locked(self):
+        if self._fh and self._unsynced:
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _rotate_locked(self):
+        if self._fh:
+            self._sync_locked()
+            self._fh.close()
+            self._fh = None
+        if os.path.exists(self.journal_file):
+            os.replace(self.journal_file, f"{self.journal_file}.{time.time_ns()}")
+
+    def _compact_rotated(self):
+        rotated = self._rotated_journals()
+        try:
+            tmp_file = f"{self.out_file}.tmp"
+            written = 0
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                for _, product in self._merge(rotated):
+                    written = write_array_item(f, product, written)
+                f.write("\n]" if written else "[]")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.out_file)
+            _fsync_dir(self.out_file)
+            for path in rotated:
+                os.remove(path)
+            logging.debug(f"Compacted {len(rotated)} journal file(s) into {self.out_file}")
+        except Exception as e:
+            logging.warning(f"Journal compaction failed, journal kept for replay: {e}")
+
+    def _merge(self, journals):
+        """Yields (key, product) of the output file with journals applied, one product at a time.
+
+        Journal records are held by key; the output file itself is streamed.
+        """
+        pending = {}
+        for path in journals:
+            for record in self._read_records(path):
+                pending.setdefault(record.get("key"), []).append(record)
+        for idx, item in enumerate(self._iter_output()):
+            key = self._key_for(item, idx)
+            products = {key: item}
+            for record in pending.pop(key, ()):
+                _apply_record(products, record)
+            yield key, products[key]
+        for key, records in pending.items():
+            products = {}
+            for record in records:
+                _apply_record(products, record)
+            if key in products:
+                yield key, products[key]
+
+    def _iter_output(self):
+        if not os.path.exists(self.out_file):
+            return
+        try:
+            yield from iter_json_array(self.out_file)
+        except (json.JSONDecodeError, ValueError):
+            logging.warning(f"Could not decode {self.out_file}, only the products read before the error are used.")
+
+    def _rotated_journals(self):
+        paths = glob.glob(glob.escape(self.journal_file) + ".*")
+        paths = [p for p in paths if p.rsplit('.', 1)[-1].isdigit()]
+        return sorted(paths, key=lambda p: int(p.rsplit('.', 1)[-1]))
+
+    def _journal_size(self):
+        try:
+            return os.path.getsize(self.journal_file)
+        except OSError:
+            return 0
+
+    def _replay(self, path, products, counts=None):
+        """Applies a journal to products; with counts, comments are only counted, per key."""
+        for record in self._read_records(path):
+            if counts is None:
+                _apply_record(products, record)
+            else:
+                _count_record(products, counts, record)
+
+    @staticmethod
+    def _read_records(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_num, line in enumerate(f, 1):
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn last line is expected after a crash; nothing after it was acknowledged.
+                    logging.warning(f"Ignoring unreadable journal line {line_num} in {path}")
+                    return
+
+    @staticmethod
+    def _key_for(product, idx=None):
+        link = product.get('link')
+        if link:
+            return _canonical_product_key(link)
+        return f"#{idx}" if idx is not None else None
+
+    @staticmethod
+    def _split(product):
+        meta = {k: v for k, v in product.items() if k != 'comments'}
+        comments = product.get('comments')
+        return meta, comments if isinstance(comments, (list, SpilledComments)) else None
+
+    def _snapshot(self, product):
+        meta, comments = self._split(product)
+        return json.dumps(meta, ensure_ascii=False, sort_keys=True), len(comments) if comments is not None else None
+
+
+class SpilledComments:
+    """Comment list of a product whose comments are journaled instead of kept in memory.
+
+    extend() appends reviews to the journal right away and only their number is kept,
+    so a product with tens of thousands of reviews costs no memory. Iterating yields
+    nothing; the comments are in the output file once the journal is compacted.
+    """
+
+    def __init__(self, journal, key, count=0, on_extend=None):
+        self.journal = journal
+        self.key = key
+        self.count = count
+        self.on_extend = on_extend
+
+    def buffer(self):
+        """Returns a list stand-in for one collector: it adds to this product and counts what it added."""
+        return _SpillBuffer(self)
+
+    def extend(self, reviews):
+        if isinstance(reviews, _SpillBuffer) and reviews.target is self:
+            return  # Already journaled when the collector added them
+        reviews = list(reviews)
+        if not reviews:
+            return
+        self.journal.append_comments(self.key, self.count, reviews)
+        self.count += len(reviews)
+        if self.on_extend:
+            self.on_extend(reviews)
+
+    def append(self, review):
+        self.extend([review])
+
+    def __iadd__(self, reviews):
+        self.extend(reviews)
+        return self
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return iter(())
+
+
+class _SpillBuffer(SpilledComments):
+    def __init__(self, target):
+        super().__init__(target.journal, target.key)
+        self.target = target
+
+    def extend(self, reviews):
+        if isinstance(reviews, _SpillBuffer) and reviews.target is self.target:
+            self.count += len(reviews)  # A nested collector's reviews, already added to the target
+            return
+        reviews = list(reviews)
+        self.target.extend(reviews)
+        self.count += len(reviews)
+
+
+def _drop_comments(product, key, counts):
+    comments = product.pop('comments', None)
+    if isinstance(comments, list):
+        counts[key] = len(comments)
+
+
+def _count_record(products, counts, record):
+    """Like _apply_record, but only keeps the number of comments per key."""
+    key = record.get("key")
+    op = record.get("op")
+    if op == "product":
+        product = dict(record["data"])
+        _drop_comments(product, key, counts)
+        products[key] = product
+    elif op == "meta":
+        product = products.setdefault(key, {})
+        product.clear()
+        product.update(record["data"])
+    elif op == "comments":
+        products.setdefault(key, {})
+        count = counts.get(key, 0)
+        counts[key] = max(count, min(record.get("start", 0), count) + len(record["items"]))
+    else:
+        logging.warning(f"Unknown journal record type: {op}")
+
+
+def _apply_record(products, record):
+    key = record.get("key")
+    op = record.get("op")
+    if op == "product":
+        products[key] = record["data"]
+    elif op == "meta":
+        product = products.setdefault(key, {})
+        comments = product.pop('comments', None)
+        product.clear()
+        product.update(record["data"])
+        if comments is not None:
+            product['comments'] = comments
+    elif op == "comments":
+        comments = products.setdefault(key, {}).setdefault('comments', [])
+        start = record.get("start", 0)
+        if start > len(comments):
+            logging.warning(f"Journal gap for {key}: expected comment {len(comments)}, got {start}")
+            start = len(comments)
+        comments[start:start + len(record["items"])] = record["items"]
+    else:
+        logging.warning(f"Unknown journal record type: {op}")
+
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
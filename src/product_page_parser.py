@@ -1,37 +1,126 @@
+import json
 import logging
 import re
 import time
 from .utils import _convert_shortened_number
-from .review_parser import collect_reviews  # Import review-related functions
+from .review_parser import collect_reviews, _take_resume_offset, _resume_skips_filter  # Import review-related functions
+from .review_api import collect_reviews_via_api, _review_filter_name
+from .network_capture import CAPTURED_BASIC_FIELDS
+from .readiness import click_and_wait_for_reviews, wait_for_review_section
 from .browser import _safe_get
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import NoSuchElementException, TimeoutException
 from selenium.webdriver.support import expected_conditions as EC
+from .xpaths import _PRODUCT_XPATHS, _RATING_OVERVIEW_XPATH
+
+SCRAPE_FAILED_KEY = "_scrape_failed" # Set on products whose scrape fell back to defaults; popped before storing
+
+# Reads every basic product field plus the rating filter labels in a single round trip.
+_PRODUCT_SNAPSHOT_SCRIPT = """
+const xp = arguments[0];
+const first = (ctx, path) => document.evaluate(path, ctx, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+const text = el => el ? (el.innerText || el.textContent || '').trim() : null;
+const flatFirst = paths => {
+    for (const path of paths) {
+        const t = text(first(document, path));
+        if (t) return t.replace(/\\n/g, ' ').trim();
+    }
+    return null;
+};
+const main = first(document, xp.main);
+const filters = [];
+const r = document.evaluate(xp.rating_filters, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+for (let i = 0; i < r.snapshotLength; i++) filters.push(text(r.snapshotItem(i)) || '');
+const shopLink = first(document, xp.shop_profile_url);
+return JSON.stringify({
+    main_found: !!main,
+    name: main ? text(first(main, xp.name)) : null,
+    price: main ? text(first(main, xp.price)) : null,
+    rating: main ? text(first(main, xp.rating)) : null,
+    ratings: main ? text(first(main, xp.ratings)) : null,
+    sold: main ? text(first(main, xp.sold)) : null,
+    shop_name: text(first(document, xp.shop_name)),
+    shop_profile_url: shopLink ? (shopLink.href || shopLink.getAttribute('href')) : null,
+    description: flatFirst(xp.description),
+    category: flatFirst(xp.category),
+    rating_filters: filters
+});
+"""
 
 def scrape_product_details(self, product):
     """Main function to scrape product details."""
     try:
         logging.info(f"Scraping details for: {product.get('link', 'N/A')}")
         _safe_get(self, product["link"])
+    except Exception as e:
+        logging.exception(f"Error scraping details for {product.get('link', 'N/A')}: {e}")
+        _set_missing_detail_defaults(product)
+        return product
+    return _scrape_loaded_product(self, product)
 
+def _scrape_loaded_product(self, product):
+    """Scrapes details and reviews from the product page already loaded in the current tab."""
+    self.current_product_link = product.get("link")
+    try:
         _scroll_page_for_reviews(self)
 
         product.setdefault("comments", []) 
-        _extract_basic_product_info(self, product)
+        if self.bounded_memory:
+            self._spill_comments(product)
+        captured = self.network_capture.product_details(self.driver, product["link"]) if self.network_capture else None
+        if captured and captured.get("total_rating") == 0:
+            logging.info("Captured item response reports no ratings, not waiting for reviews.")
+            has_reviews = False
+        else:
+            has_reviews = _wait_for_first_review(self)
+
+        if captured and CAPTURED_BASIC_FIELDS <= captured.keys():
+            logging.debug("Basic product info taken from the captured item response.")
+            snapshot = None
+        else:
+            if self.fast_extract:
+                snapshot = _snapshot_product_page(self, wait_for_filters=has_reviews)
+            else:
+                snapshot = None
+            if snapshot:
+                _apply_product_snapshot(product, snapshot)
+            else:
+                _extract_basic_product_info(self, product)
+        if captured:
+            # Exact values from the frontend's own JSON win over rendered text.
+            product.update(captured)
 
-        if not _wait_for_first_review(self):
+        if not has_reviews:
             product["detailed_rating"] = {}
             product["total_rating"] = 0
             return product
 
-        filters = _parse_rating_filters(self)
-        detailed_rating, total_ratings = _extract_detailed_rating(filters)
+        filters = None
+        if captured and captured.get("detailed_rating"):
+            detailed_rating, total_ratings = captured["detailed_rating"], captured["total_rating"]
+        elif snapshot and any(f.strip() for f in snapshot["rating_filters"]):
+            detailed_rating, total_ratings = _extract_detailed_rating(snapshot["rating_filters"])
+        else:
+            filters = _parse_rating_filters(self)
+            detailed_rating, total_ratings = _extract_detailed_rating(filters)
         product["detailed_rating"] = detailed_rating
         product["total_rating"] = total_ratings
 
         
         product.setdefault("comments", []) 
+
+        if self.review_source == "api":
+            api_reviews = _collect_api_reviews(self, product, detailed_rating, total_ratings)
+            if api_reviews is not None:
+                product["comments"].extend(api_reviews)
+                logging.info(f"Finished scraping details. Collected {len(product['comments'])} comments.")
+                return product
+            logging.warning("Ratings API unavailable, falling back to paging through the review list.")
+
+        if filters is None:
+            # Filter elements are only needed when they have to be clicked.
+            filters = _parse_rating_filters(self) if self.media_only or self.all_star_types else []
         
         if self.media_only:
             media_reviews = _collect_media_reviews(self, filters, detailed_rating.get("media", 0))
@@ -53,12 +142,88 @@ def scrape_product_details(self, product):
 
     except Exception as e:
         logging.exception(f"Error scraping details for {product.get('link', 'N/A')}: {e}")
-        product.setdefault("category", "")
-        product.setdefault("description", "")
-        product.setdefault("detailed_rating", {})
-        product.setdefault("total_rating", 0)
+        _set_missing_detail_defaults(product)
+    finally:
+        self._current_comments = None
 
     return product
+
+def probe_product_counters(self, link):
+    """Loads a product page and reads its counters without touching the review section.
+
+    Returns the counters that could be read, or None if the page could not be read.
+    """
+    _safe_get(self, link)
+    self.current_product_link = link
+    captured = self.network_capture.product_details(self.driver, link) if self.network_capture else None
+    if captured:
+        return {field: captured[field] for field in ("sold", "Ratings", "total_rating", "detailed_rating") if field in captured}
+    snapshot = _snapshot_product_page(self, wait_for_filters=False)
+    if not snapshot or not snapshot["main_found"]:
+        return None
+    counters = {}
+    if snapshot["sold"] is not None:
+        counters["sold"] = _convert_shortened_number(snapshot["sold"])
+    if snapshot["ratings"] is not None:
+        counters["Ratings"] = _convert_shortened_number(snapshot["ratings"])
+    return counters or None
+
+def _set_missing_detail_defaults(product):
+    """Fills the detail fields a failed scrape left out and flags the product as failed."""
+    product[SCRAPE_FAILED_KEY] = True
+    product.setdefault("category", "")
+    product.setdefault("description", "")
+    product.setdefault("detailed_rating", {})
+    product.setdefault("total_rating", 0)
+
+def _snapshot_product_page(self, wait_for_filters=True, timeout=10):
+    """Reads all basic product fields with one script call, polling until the rating filters render.
+
+    Returns None if the script fails, so the caller can fall back to per-element extraction.
+    """
+    last_snapshot = {}
+
+    def _snapshot_ready(driver):
+        snapshot = json.loads(driver.execute_script(_PRODUCT_SNAPSHOT_SCRIPT, _PRODUCT_XPATHS))
+        last_snapshot["value"] = snapshot
+        if not snapshot["main_found"]:
+            return False
+        if wait_for_filters and not any(f.strip() for f in snapshot["rating_filters"]):
+            return False
+        return snapshot
+
+    try:
+        return WebDriverWait(self.driver, timeout, poll_frequency=0.25).until(_snapshot_ready)
+    except TimeoutException:
+        logging.debug("Timed out waiting for a complete product snapshot, using the last one read.")
+        return last_snapshot.get("value")
+    except Exception as e:
+        logging.warning(f"Product snapshot failed, falling back to per-element extraction: {e}")
+        return None
+
+def _apply_product_snapshot(product, snapshot):
+    """Fills the product dict from a page snapshot, keeping fields already present."""
+    if not snapshot["main_found"]:
+        logging.warning("Could not find the main content element on the product page.")
+        return product
+
+    product["description"] = snapshot["description"] or ""
+    if not product["description"]:
+        logging.warning("Could not find description.")
+    product["category"] = snapshot["category"] or ""
+    if not product["category"]:
+        logging.warning("Could not find category.")
+
+    for key in ("name", "price", "rating", "shop_name", "shop_profile_url"):
+        if key not in product and snapshot[key] is not None:
+            product[key] = snapshot[key]
+    if "Ratings" not in product and snapshot["ratings"] is not None:
+        product["Ratings"] = _convert_shortened_number(snapshot["ratings"])
+    if "sold" not in product and snapshot["sold"] is not None:
+        product["sold"] = _convert_shortened_number(snapshot["sold"])
+    logging.debug(f"Applied product snapshot: {snapshot}")
+    return product
+
 def _extract_basic_product_info(self, product):
     main_el = None
     try:
@@ -186,6 +351,8 @@ def _scrape_product_category(self):
 
 def _scroll_page_for_reviews(self, num_attempts=4, scroll_fraction=0.2, pause_time=0.5):
     """Scrolls the page to help load review section."""
+    if wait_for_review_section(self):
+        return
     try:
         logging.debug("Scrolling down to load reviews section...")
         last_height = self.driver.execute_script("return document.body.scrollHeight")
@@ -211,8 +378,8 @@ def _wait_for_first_review(self, timeout=15):
         
 def _parse_rating_filters(self):
     """Parses the rating overview filters and returns them."""
-    overview_xpath = '//*[@id="sll2-normal-pdp-main"]/div/div/div/div[2]/div[3]/div/div[1]/div[2]/div/div/div[2]'
-    filter_locator = (By.XPATH, f"{overview_xpath}//div[contains(@class,'product-rating-overview__filter')]//div[contains(@class,'product-rating-overview__filter')]")
+    overview_xpath = _RATING_OVERVIEW_XPATH
+    filter_locator = (By.XPATH, _PRODUCT_XPATHS["rating_filters"])
     filters = []
     try:
         wait_filters_text = WebDriverWait(self.driver, 15)
@@ -230,13 +397,13 @@ def _parse_rating_filters(self):
         return []
 
 def _extract_detailed_rating(filters):
-    """Extracts detailed rating information from the filters."""
+    """Extracts detailed rating information from filter elements or their label strings."""
     detailed_rating = {}
     total_ratings = 0
     if filters:
         logging.info(f"Found {len(filters)} filter elements.")
         for f in filters:
-            text = f.text.strip()
+            text = (f if isinstance(f, str) else f.text).strip()
             logging.debug(f"Processing filter text: '{text}'")
             if text.lower() == 'tudo':
                 logging.debug("Ignoring Filter 'Tudo'.")
@@ -269,18 +436,53 @@ def _normalize_rating_key(label):
     elif "mídia" in label or "media" in label: return "media"
     else: return re.sub(r'\s+', '_', label)
 
+def _collect_api_reviews(self, product, detailed_rating, total_ratings):
+    """Collects the same review sets as the filter-clicking helpers below, through the ratings API.
+
+    Returns None if the API could not be used at all.
+    """
+    requests = []
+    if self.media_only:
+        requests.append(({"media": True}, min(detailed_rating.get("media", 0), self.review_limit)))
+    if self.all_star_types:
+        for star in range(5, 0, -1):
+            requests.append(({"star": star}, min(detailed_rating.get(f"{star}_star", 0), self.star_limit_per_type)))
+    if not self.media_only and not self.all_star_types:
+        requests.append(({}, min(detailed_rating.get("all", total_ratings), self.review_limit)))
+
+    all_reviews = self._review_buffer()
+    for review_filter, reviews_to_collect in requests:
+        if reviews_to_collect <= 0:
+            logging.debug(f"Skipping API reviews for {review_filter or 'all'} as count is zero.")
+            continue
+        if _resume_skips_filter(self, _review_filter_name(**review_filter)):
+            logging.info(f"Skipping API reviews for {review_filter or 'all'}, already collected before the resume point.")
+            continue
+        self.review_filter = _review_filter_name(**review_filter)
+        offset = _take_resume_offset(self)
+        if offset:
+            logging.info(f"Resuming '{self.review_filter}' reviews at offset {offset}.")
+        reviews = collect_reviews_via_api(self, product["link"], reviews_to_collect, offset=offset, **review_filter)
+        if reviews is None:
+            return all_reviews or None
+        logging.info(f"Collected {len(reviews)} reviews for {review_filter or 'all'} through the ratings API.")
+        all_reviews += reviews
+    return all_reviews
+
 def _collect_media_reviews(self, filters, media_count):
     """Collects reviews with media only."""
     all_reviews = []
-    if self.media_only and media_count > 0 and filters:
+    if self.media_only and _resume_skips_filter(self, "media"):
+        logging.info("Skipping media reviews, already collected before the resume point.")
+    elif self.media_only and media_count > 0 and filters:
         for filter_div in filters:
             if "mídia" in filter_div.text.strip().lower() or "media" in filter_div.text.strip().lower():
                 logging.info("Found and attempting to click 'Com Mídia' filter.")
                 try:
                     wait = WebDriverWait(self.driver, 10)
                     media_filter_element = wait.until(EC.element_to_be_clickable(filter_div))
-                    media_filter_element.click()
-                    time.sleep(2)
+                    self.review_filter = "media"
+                    click_and_wait_for_reviews(self, media_filter_element.click)
                     reviews_to_collect = min(media_count, self.review_limit)
                     all_reviews = collect_reviews(self, reviews_to_collect)
                     return all_reviews
@@ -296,7 +498,7 @@ def _collect_media_reviews(self, filters, media_count):
 
 def _collect_all_star_reviews(self, filters):
     """Collects reviews for all star types."""
-    all_reviews = []
+    all_reviews = self._review_buffer()
     if self.all_star_types and filters:
         star_filters = [f for f in filters if re.match(r'\d+\s*(?:[Ss]ao|[Ee]strela)[s]?\s*\(', f.text.strip())]
         if star_filters:
@@ -305,11 +507,13 @@ def _collect_all_star_reviews(self, filters):
                 if match:
                     star_value = match.group(1)
                     star_count = _convert_shortened_number(match.group(2))
-                    if star_count > 0:
+                    if _resume_skips_filter(self, f"{star_value}_star"):
+                        logging.info(f"Skipping {star_value}-star reviews, already collected before the resume point.")
+                    elif star_count > 0:
                         logging.info(f"Clicking filter for {star_value} stars ({star_count} reviews)...")
                         try:
-                            self.driver.execute_script("arguments[0].click();", filter_div)
-                            time.sleep(2)
+                            self.review_filter = f"{star_value}_star"
+                            click_and_wait_for_reviews(self, lambda: self.driver.execute_script("arguments[0].click();", filter_div))
                             reviews_to_collect = min(star_count, self.star_limit_per_type)
                             logging.info(f"Collecting up to {reviews_to_collect} reviews for {star_value} stars.")
                             all_reviews += collect_reviews(self, reviews_to_collect)
@@ -332,6 +536,7 @@ def _collect_general_reviews(self, detailed_rating, total_ratings):
         reviews_to_collect = min(total_reviews_available, self.review_limit)
         if reviews_to_collect > 0:
             logging.info(f"Attempting to collect up to {reviews_to_collect} general reviews.")
+            self.review_filter = "all"
             return collect_reviews(self, reviews_to_collect)
         else:
             logging.info("No general reviews available or count is zero.")
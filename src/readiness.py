@@ -0,0 +1,152 @@
+"""Waits on concrete page conditions instead of fixed sleeps.
+
+Every wait has its own timeout and records how long it actually took in
+self.readiness_stats, which is summarized when scraping finishes.
+"""
+import logging
+import time
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+# Watches the review list and marks it settled once mutations stop for a short while after a change.
+_ARM_REVIEW_OBSERVER_SCRIPT = """
+const settleMs = arguments[0];
+const list = document.querySelector('.product-ratings__list') || document.querySelector('.product-ratings');
+if (!list) return false;
+if (window.__reviewListObserver) window.__reviewListObserver.disconnect();
+window.__reviewListSettled = false;
+window.__reviewListWaiters = [];
+window.__reviewListObserver = new MutationObserver(() => {
+    clearTimeout(window.__reviewListSettle);
+    window.__reviewListSettle = setTimeout(() => {
+        window.__reviewListSettled = true;
+        window.__reviewListWaiters.splice(0).forEach(resolve => resolve(true));
+    }, settleMs);
+});
+window.__reviewListObserver.observe(list.parentElement || list, {childList: true, subtree: true, characterData: true});
+return true;
+"""
+
+_WAIT_REVIEW_CHANGE_SCRIPT = """
+const timeout = arguments[0], callback = arguments[arguments.length - 1];
+let finished = false;
+const done = value => { if (!finished) { finished = true; callback(value); } };
+if (window.__reviewListSettled) return done(true);
+if (!window.__reviewListWaiters) return done(false);
+window.__reviewListWaiters.push(done);
+setTimeout(() => done(false), timeout);
+"""
+
+# Scrolls down until the review section exists, then brings it into the viewport.
+_WAIT_REVIEW_SECTION_SCRIPT = """
+const timeout = arguments[0], callback = arguments[arguments.length - 1];
+const start = Date.now();
+const step = () => {
+    const section = document.querySelector('.product-ratings');
+    if (section) {
+        section.scrollIntoView({block: 'start'});
+        return callback(true);
+    }
+    if (Date.now() - start > timeout) return callback(false);
+    window.scrollBy(0, Math.max(window.innerHeight * 0.8, 400));
+    setTimeout(step, 100);
+};
+step();
+"""
+
+# Scrolls through the search results until every card is rendered (has its link and image) or the page ends.
+_WAIT_SEARCH_RESULTS_SCRIPT = """
+const timeout = arguments[0], callback = arguments[arguments.length - 1];
+const start = Date.now();
+const step = () => {
+    const items = Array.from(document.querySelectorAll('ul.shopee-search-item-result__items > li'));
+    const unrendered = items.filter(li => !li.querySelector('a.contents') || !li.querySelector('img'));
+    if (items.length && !unrendered.length) return callback(true);
+    // Past the last result page there is no result list at all.
+    if (Date.now() - start > timeout || (!items.length && Date.now() - start > 3000)) return callback(false);
+    if (unrendered.length) unrendered[0].scrollIntoView({block: 'center'});
+    else window.scrollBy(0, Math.max(window.innerHeight * 0.8, 400));
+    setTimeout(step, 150);
+};
+step();
+"""
+
+
+def wait_for_condition(self, name, condition, timeout, poll_frequency=0.1):
+    """Polls condition(driver) until it is truthy or timeout expires; returns its last result."""
+    start = time.monotonic()
+    result = None
+    try:
+        result = WebDriverWait(self.driver, timeout, poll_frequency=poll_frequency).until(condition)
+    except TimeoutException:
+        pass
+    _record_wait(self, name, time.monotonic() - start, timeout, bool(result))
+    return result
+
+
+def wait_for_document_ready(self, timeout=10):
+    """Waits until document.readyState is 'complete'."""
+    return wait_for_condition(self, "document_ready",
+                              lambda driver: driver.execute_script("return document.readyState") == "complete",
+                              timeout)
+
+
+def arm_review_list_observer(self, settle_ms=150):
+    """Starts watching the review list; call it right before the click that changes the list."""
+    try:
+        return self.driver.execute_script(_ARM_REVIEW_OBSERVER_SCRIPT, settle_ms)
+    except Exception as e:
+        logging.debug(f"Could not install review list observer: {e}")
+        return False
+
+
+def wait_for_review_list_change(self, timeout=10):
+    """Waits until the review list armed by arm_review_list_observer changed and settled."""
+    return _async_wait(self, "review_list_change", _WAIT_REVIEW_CHANGE_SCRIPT, timeout)
+
+
+def click_and_wait_for_reviews(self, click, timeout=10, fallback_sleep=2):
+    """Runs click() and waits for the review list to change, sleeping only if it cannot be observed."""
+    armed = arm_review_list_observer(self)
+    click()
+    if armed:
+        return wait_for_review_list_change(self, timeout)
+    time.sleep(fallback_sleep)
+    return True
+
+
+def wait_for_review_section(self, timeout=5):
+    """Scrolls until the review section is rendered and in the viewport."""
+    return _async_wait(self, "review_section", _WAIT_REVIEW_SECTION_SCRIPT, timeout)
+
+
+def wait_for_search_results(self, timeout=15):
+    """Scrolls the search results until lazily loaded cards are rendered."""
+    return _async_wait(self, "search_results", _WAIT_SEARCH_RESULTS_SCRIPT, timeout)
+
+
+def log_readiness_stats(self):
+    """Logs how often each condition was waited on and how long it took in total."""
+    for name, (count, total, timeouts) in sorted(self.readiness_stats.items()):
+        logging.info(f"Readiness '{name}': {count} waits, {total:.1f}s total, {total / count:.2f}s average, {timeouts} timeouts")
+
+
+def _async_wait(self, name, script, timeout):
+    start = time.monotonic()
+    result = False
+    try:
+        self.driver.set_script_timeout(timeout + 5)
+        result = bool(self.driver.execute_async_script(script, int(timeout * 1000)))
+    except Exception as e:
+        logging.debug(f"Waiting for {name} failed: {e}")
+    _record_wait(self, name, time.monotonic() - start, timeout, result)
+    return result
+
+
+def _record_wait(self, name, elapsed, timeout, satisfied):
+    count, total, timeouts = self.readiness_stats.get(name, (0, 0.0, 0))
+    self.readiness_stats[name] = (count + 1, total + elapsed, timeouts + (0 if satisfied else 1))
+    if satisfied:
+        logging.debug(f"Waited {elapsed:.2f}s for {name}")
+    else:
+        logging.debug(f"Gave up on {name} after {elapsed:.2f}s (timeout {timeout}s)")
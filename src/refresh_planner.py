@@ -0,0 +1,110 @@
+"""Change-aware refresh of a watched product list.
+
+For every product the planner stores the counters seen last time (sold, Ratings,
+total_rating, detailed_rating) and when it is due again. A refresh first probes the
+product page once; reviews are only collected when the counters moved. Products that
+change often are checked more often, static ones back off, and a page budget caps
+the work done per run.
+"""
+import json
+import logging
+import math
+import sqlite3
+import threading
+import time
+from .review_api import _DOM_REVIEWS_PER_PAGE
+from .utils import _canonical_product_key
+
+REFRESH_FILE = "shopee_refresh.db"
+COUNTER_FIELDS = ("sold", "Ratings", "total_rating", "detailed_rating")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    key TEXT PRIMARY KEY,
+    link TEXT NOT NULL,
+    counters TEXT,
+    interval REAL NOT NULL,
+    next_due REAL NOT NULL,
+    last_checked REAL,
+    last_changed REAL
+);
+CREATE INDEX IF NOT EXISTS products_due ON products (next_due);
+"""
+
+
+class RefreshPlanner:
+    """Schedules product refreshes; intervals halve when a product changed and double when it did not."""
+
+    def __init__(self, path=REFRESH_FILE, initial_interval=86400, min_interval=3600, max_interval=30 * 86400):
+        self.path = path
+        self.initial_interval = initial_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._lock = threading.Lock()  # Shared by the copies the worker pool makes of the scraper
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def add(self, links, now=None):
+        """Starts watching links (due immediately); returns how many were new."""
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO products (key, link, interval, next_due) VALUES (?, ?, ?, ?)",
+                [(_canonical_product_key(link), link, self.initial_interval, now) for link in links])
+            return self._conn.total_changes - before
+
+    def due(self, now=None):
+        """Returns the links that are due, most overdue first."""
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self._conn.execute("SELECT link FROM products WHERE next_due <= ? ORDER BY next_due", (now,)).fetchall()
+        return [row[0] for row in rows]
+
+    def counters(self, link):
+        """Returns the counters stored for link, or None if it was never scraped."""
+        with self._lock:
+            row = self._conn.execute("SELECT counters FROM products WHERE key = ?", (_canonical_product_key(link),)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def has_changed(self, link, probed):
+        """True if any probed counter differs from the stored one (or nothing is stored yet)."""
+        stored = self.counters(link)
+        if stored is None:
+            return True
+        return any(stored.get(field) != value for field, value in probed.items())
+
+    def record(self, link, changed, counters=None, now=None):
+        """Stores the outcome of a refresh and schedules the next one."""
+        now = time.time() if now is None else now
+        key = _canonical_product_key(link)
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT interval FROM products WHERE key = ?", (key,)).fetchone()
+            interval = row[0] if row else self.initial_interval
+            interval = max(self.min_interval, interval / 2) if changed else min(self.max_interval, interval * 2)
+            self._conn.execute(
+                "INSERT INTO products (key, link, counters, interval, next_due, last_checked, last_changed)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET"
+                " counters = COALESCE(excluded.counters, counters), interval = excluded.interval,"
+                " next_due = excluded.next_due, last_checked = excluded.last_checked,"
+                " last_changed = COALESCE(excluded.last_changed, last_changed)",
+                (key, link, json.dumps(counters) if counters is not None else None, interval, now + interval,
+                 now, now if changed else None))
+        logging.debug(f"Next refresh of {link} in {interval / 3600:.1f}h ({'changed' if changed else 'unchanged'}).")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def product_counters(product):
+    """The counters of a scraped product that the planner compares."""
+    return {field: product[field] for field in COUNTER_FIELDS if field in product}
+
+
+def estimated_review_pages(self, link, probed):
+    """Review pages a full scrape of link is expected to load, from the growth of its rating count."""
+    stored = self.refresh_planner.counters(link) or {}
+    new_ratings = probed.get("Ratings", 0) - stored.get("Ratings", 0) if "Ratings" in stored else self.review_limit
+    per_page = self.api_page_size if self.review_source == "api" else _DOM_REVIEWS_PER_PAGE
+    return max(1, math.ceil(min(max(new_ratings, 1), self.review_limit) / per_page))
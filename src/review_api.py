@@ -0,0 +1,163 @@
+"""Review collection through the ratings JSON endpoint the product page itself calls.
+
+Requests are issued with fetch() from inside the browser, so the logged-in cookies and
+anti-bot state of the session apply. Paging is done by offset instead of by clicking.
+"""
+import json
+import logging
+import time
+from urllib.parse import urlencode, urlparse
+from tqdm import tqdm
+from .utils import _parse_product_ids
+from .review_index import filter_new_reviews
+
+_RATINGS_PATH = "/api/v2/item/get_ratings"
+_MEDIA_FILTER = 3  # Value of the endpoint's 'filter' parameter for "with media"
+_IMAGE_URL = "https://down-br.img.susercontent.com/file/{}"
+_DOM_REVIEWS_PER_PAGE = 6  # Page size of the product page's review list, used for last_review_page
+
+_FETCH_SCRIPT = """
+const url = arguments[0], done = arguments[arguments.length - 1];
+fetch(url, {credentials: 'include', headers: {'x-api-source': 'pc', 'x-shopee-language': 'pt-BR'}})
+    .then(r => r.text().then(body => done({status: r.status, body: body})))
+    .catch(e => done({status: 0, body: String(e)}));
+"""
+
+
+def build_ratings_url(base_url, shopid, itemid, offset, limit, star=None, media=False):
+    """Builds a ratings request URL; star filters by 1-5 stars, media keeps reviews with images/videos."""
+    params = {
+        "itemid": itemid,
+        "shopid": shopid,
+        "limit": limit,
+        "offset": offset,
+        "type": star or 0,
+        "filter": _MEDIA_FILTER if media else 0,
+        "flag": 1,
+        "exclude_filter": 1,
+        "fold_filter": 0,
+        "relevant_reviews": "false",
+        "request_source": 2,
+    }
+    return f"{base_url.rstrip('/')}{_RATINGS_PATH}?{urlencode(params)}"
+
+
+def iter_review_pages(fetch, base_url, shopid, itemid, offset=0, page_size=50, star=None, media=False):
+    """Yields (offset, reviews) for each page returned by the ratings endpoint.
+
+    fetch takes a URL and returns the decoded JSON body.
+    """
+    while True:
+        data = fetch(build_ratings_url(base_url, shopid, itemid, offset, page_size, star=star, media=media))
+        if data.get("error"):
+            raise RuntimeError(f"Ratings endpoint returned error {data.get('error')}: {data.get('error_msg')}")
+        ratings = (data.get("data") or {}).get("ratings") or []
+        if not ratings:
+            return
+        yield offset, [_rating_to_review(r, base_url) for r in ratings]
+        offset += len(ratings)
+        if len(ratings) < page_size:
+            return
+
+
+def collect_reviews_via_api(self, product_link, max_reviews, star=None, media=False, offset=0):
+    """Collects up to max_reviews reviews through the ratings endpoint.
+
+    Returns None if nothing could be fetched, so callers can fall back to the DOM pager.
+    """
+    ids = _parse_product_ids(product_link)
+    if not ids:
+        logging.warning(f"Could not extract shop/item IDs from {product_link}, cannot use the ratings API.")
+        return None
+    shopid, itemid = ids
+    base_url = self.api_base_url or _origin(product_link)
+    fetch = self.review_fetcher or _browser_fetch(self)
+
+    collected_reviews = self._review_buffer()
+    with tqdm(total=max_reviews, desc="Collecting reviews (API)") as pbar:
+        try:
+            pages = iter_review_pages(fetch, base_url, shopid, itemid, offset=offset,
+                                      page_size=min(self.api_page_size, max_reviews), star=star, media=media)
+            for page_offset, reviews in pages:
+                reviews = reviews[:max_reviews - len(collected_reviews)]
+                page_size = len(reviews)
+                reviews, reached_known = filter_new_reviews(self, reviews)
+                collected_reviews.extend(reviews)
+                self._publish_reviews(reviews)
+                pbar.update(len(reviews))
+                logging.debug(f"Fetched {len(reviews)} new reviews at offset {page_offset}")
+                _record_resume_state(self, page_offset + page_size, star, media)
+                if reached_known or len(collected_reviews) >= max_reviews:
+                    break
+        except Exception as e:
+            logging.warning(f"Error fetching reviews from the ratings API: {e}")
+            if not collected_reviews:
+                return None
+    return collected_reviews
+
+
+def _review_filter_name(star=None, media=False):
+    """Name of a review filter as stored in the resume state ('all', 'media' or '<n>_star')."""
+    if media:
+        return "media"
+    if star:
+        return f"{star}_star"
+    return "all"
+
+
+def _api_filter_args(filter_name):
+    """Inverse of _review_filter_name, as keyword arguments for collect_reviews_via_api."""
+    if filter_name == "media":
+        return {"media": True}
+    if filter_name and filter_name.endswith("_star"):
+        return {"star": int(filter_name.split("_")[0])}
+    return {}
+
+
+def _record_resume_state(self, next_offset, star, media):
+    """Saves where this filter's reviews should continue from, for --continue-scrape."""
+    self.last_review_offset = next_offset
+    self.last_review_page = next_offset // _DOM_REVIEWS_PER_PAGE
+    self.last_review_filter = _review_filter_name(star, media)
+    if self.product_link:
+        self._periodic_save(self.product_link)
+
+
+def _browser_fetch(self):
+    """Returns a fetch function that runs the request inside the browser session."""
+    def fetch(url):
+        self.driver.set_script_timeout(30)
+        result = self.driver.execute_async_script(_FETCH_SCRIPT, url)
+        if result["status"] != 200:
+            raise RuntimeError(f"HTTP {result['status']} for {url}: {result['body'][:200]}")
+        return json.loads(result["body"])
+    return fetch
+
+
+def _origin(link):
+    parsed = urlparse(link)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+def _rating_to_review(rating, base_url):
+    """Converts one ratings endpoint entry into the review dict produced by the DOM parsers."""
+    review_time = ""
+    if rating.get("ctime"):
+        review_time = time.strftime("%Y-%m-%d %H:%M", time.localtime(rating["ctime"]))
+        items = rating.get("product_items") or []
+        if items and items[0].get("model_name"):
+            review_time = f"{review_time} | Variação: {items[0]['model_name']}"
+
+    reply = rating.get("ItemRatingReply") or {}
+    author_shopid = rating.get("author_shopid")
+    return {
+        "author": rating.get("author_username") or "",
+        "author_profile_url": f"{base_url.rstrip('/')}/shop/{author_shopid}" if author_shopid else "",
+        "rating": rating.get("rating_star") or 0,
+        "time": review_time,
+        "content": (rating.get("comment") or "").replace('\n', ' ').strip(),
+        "seller_respond": (reply.get("comment") or "").replace('\n', ' ').strip(),
+        "like_count": rating.get("like_count") or 0,
+        "images": [_IMAGE_URL.format(image) for image in rating.get("images") or []],
+        "videos": [video["url"] for video in rating.get("videos") or [] if video.get("url")],
+    }
@@ -0,0 +1,103 @@
+"""Persistent index of the reviews already scraped per product, for incremental runs.
+
+Each review is reduced to a short fingerprint of its author, time and content. Reviews
+normally arrive newest first, so paging stops at a known review, but only while the
+page's review times confirm that order.
+"""
+import hashlib
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from .utils import _canonical_product_key
+
+REVIEW_INDEX_FILE = "shopee_review_index.db"
+
+
+class ReviewIndex:
+    def __init__(self, path=REVIEW_INDEX_FILE):
+        self.path = path
+        self._lock = threading.Lock()  # Shared by the copies the worker pool makes of the scraper
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS reviews (product TEXT NOT NULL, fingerprint TEXT NOT NULL,"
+            " PRIMARY KEY (product, fingerprint)) WITHOUT ROWID")
+
+    def fingerprints(self, link):
+        """Returns the fingerprints stored for the product behind link."""
+        with self._lock:
+            rows = self._conn.execute("SELECT fingerprint FROM reviews WHERE product = ?",
+                                      (_canonical_product_key(link),)).fetchall()
+        return {row[0] for row in rows}
+
+    def add(self, link, reviews):
+        """Stores the fingerprints of reviews for the product behind link."""
+        key = _canonical_product_key(link)
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO reviews (product, fingerprint) VALUES (?, ?)",
+                                   [(key, review_fingerprint(r)) for r in reviews])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def review_fingerprint(review):
+    """Short hash of a review's author, time and content."""
+    text = "\x1f".join(str(review.get(field) or "") for field in ("author", "time", "content"))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def filter_new_reviews(self, reviews):
+    """Drops reviews of the current product that are already known or older than self.since.
+
+    Returns (new_reviews, stop); stop is True once a known or too old review was seen on a
+    page whose reviews are newest first, since every later page then only holds older
+    reviews. Out of order pages are filtered but never stop the paging.
+    """
+    if self.review_index is None and self.since is None:
+        return reviews, False
+    known = _known_fingerprints(self)
+    new_reviews = []
+    reached_old = False
+    for review in reviews:
+        review_time = _parse_review_time(review.get("time"))
+        if known is not None and review_fingerprint(review) in known:
+            reached_old = True
+        elif self.since and review_time and review_time < self.since:
+            reached_old = True
+        else:
+            new_reviews.append(review)
+    if reached_old and not _newest_first(reviews):
+        logging.info("Reviews on this page are not sorted by time, not stopping at known or old reviews.")
+        return new_reviews, False
+    if reached_old:
+        logging.info("Reached reviews that were already scraped or are too old, stopping.")
+    return new_reviews, reached_old
+
+
+def _newest_first(reviews):
+    """True if the review times that can be read never increase along the page."""
+    times = [t for t in (_parse_review_time(r.get("time")) for r in reviews) if t]
+    return all(a >= b for a, b in zip(times, times[1:]))
+
+
+def _known_fingerprints(self):
+    """Fingerprints of the current product from the index plus the comments already in the output."""
+    if self.review_index is None:
+        return None
+    link = self.current_product_link
+    if link not in self._known_reviews:
+        known = self.review_index.fingerprints(link)
+        existing = self.output_data.get(link, {}).get("comments") or []
+        known.update(review_fingerprint(r) for r in existing)
+        self._known_reviews[link] = known
+    return self._known_reviews[link]
+
+
+def _parse_review_time(value):
+    """Parses the 'YYYY-MM-DD HH:MM' prefix of a review time, ignoring the variation suffix."""
+    try:
+        return datetime.strptime((value or "")[:16], "%Y-%m-%d %H:%M")
+    except ValueError:
+        return None
@@ -1,3 +1,4 @@
+import json
 import logging
 import time
 from selenium.common.exceptions import NoSuchElementException, TimeoutException
@@ -5,58 +6,92 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from tqdm import tqdm
+from .xpaths import _REVIEW_XPATHS
+from .readiness import click_and_wait_for_reviews
+from .review_api import collect_reviews_via_api, _api_filter_args, _DOM_REVIEWS_PER_PAGE, _MEDIA_FILTER
+from .review_index import filter_new_reviews
+
+# Extracts every review of the current page in a single round trip and returns them as a JSON string.
+_REVIEW_PAGE_SCRIPT = """
+const container = arguments[0], limit = arguments[1], xp = arguments[2], checkSize = arguments[3];
+const first = (ctx, path) => document.evaluate(path, ctx, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+const all = (ctx, path) => {
+    const r = document.evaluate(path, ctx, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    const out = [];
+    for (let i = 0; i < r.snapshotLength; i++) out.push(r.snapshotItem(i));
+    return out;
+};
+const text = el => el ? (el.innerText || el.textContent || '').trim() : '';
+const flat = el => text(el).replace(/\\n/g, ' ').trim();
+return JSON.stringify(all(container, xp.item).slice(0, limit).map(item => {
+    const author = item.querySelector('.shopee-product-rating__author-name');
+    const ratingBox = first(item, xp.rating);
+    const stars = ratingBox ? Array.from(ratingBox.children).filter(
+        s => (s.getAttribute('class') || '').includes('shopee-svg-icon icon-rating-solid--active icon-rating-solid')).length : 0;
+    let content = '';
+    for (const path of xp.content) {
+        const el = first(item, path);
+        if (el) { content = flat(el); break; }
+    }
+    const likeText = text(first(item, xp.like_count));
+    // Blocked images never get a size, so without checkSize only images that are not hidden are kept.
+    const images = Array.from(item.querySelectorAll('img')).filter(img => {
+        if (!checkSize) return img.src && img.getClientRects().length > 0;
+        const box = img.getBoundingClientRect();
+        return img.src && box.width > 0 && box.height > 0;
+    }).map(img => img.src);
+    const videos = Array.from(item.querySelectorAll('video')).map(v => v.src).filter(Boolean);
+    return {
+        author: text(author),
+        author_profile_url: author ? (author.href || author.getAttribute('href') || '') : '',
+        rating: stars,
+        time: text(first(item, xp.time)),
+        content: content,
+        seller_respond: flat(first(item, xp.seller_respond)),
+        like_count: /^\\d+$/.test(likeText) ? parseInt(likeText, 10) : 0,
+        images: images,
+        videos: videos
+    };
+}));
+"""
 
 
 def collect_reviews(self, max_reviews):
-            collected_reviews = []
+            collected_reviews = self._review_buffer()
             page_num = 1
 
-            # If continue_scrape is enabled and we know the last page, try to navigate to the page AFTER the last one
-            if self.continue_scrape and self.last_review_page and self.last_review_page >= 1:
-                start_page = self.last_review_page + 1
-                logging.info(f"Attempting to navigate to the page to continue scraping: {start_page}")
-                nav_element = None
-                try:
-                    nav_element = self.driver.find_element(By.CLASS_NAME, 'product-ratings__page-controller')
-                    buttons = nav_element.find_elements(By.TAG_NAME, 'button')
-                    # Click next buttons until we reach the page to continue
-                    while page_num < start_page:
-                        next_button_found = False
-                        for button in buttons:
-                            if button.text.strip() == str(page_num + 1):
-                                logging.info(f"Clicking next page to reach: {page_num + 1}")
-                                button.click()
-                                time.sleep(2) # Wait for the new page to load
-                                page_num += 1
-                                nav_element = self.driver.find_element(By.CLASS_NAME, 'product-ratings__page-controller')
-                                buttons = nav_element.find_elements(By.TAG_NAME, 'button')
-                                next_button_found = True
-                                break
-                        if not next_button_found:
-                            logging.warning("Could not find the next page button while trying to continue.")
-                            break
-                    logging.info(f"Reached or attempted to reach page: {page_num}")
-                except NoSuchElementException:
-                    logging.warning("Could not find the page controller to continue.")
-                except Exception as e:
-                    logging.warning(f"Error navigating to the starting page: {e}")
-                self.last_review_page = None # Reset so we start collecting from here
+            # If continue_scrape is enabled and we know where the last run stopped, jump straight there
+            resume_offset = _take_resume_offset(self)
+            if resume_offset:
+                logging.info(f"Resuming '{self.review_filter}' reviews at offset {resume_offset} through the ratings API.")
+                reviews = collect_reviews_via_api(self, self.driver.current_url, max_reviews, offset=resume_offset,
+                                                  **_api_filter_args(self.review_filter))
+                if reviews is not None:
+                    return reviews
+                start_page = resume_offset // _DOM_REVIEWS_PER_PAGE + 1
+                logging.warning(f"Could not resume through the ratings API, clicking through to page {start_page} instead.")
+                page_num = _click_to_page(self, start_page)
 
+            pending_pages = [] # Offline parses still running while we keep paging
+            collected_count = 0
             with tqdm(total=max_reviews, desc="Collecting reviews") as pbar:
-                while len(collected_reviews) < max_reviews:
+                while collected_count < max_reviews:
                     logging.info(f"Collecting reviews from page {page_num}")
                     try:
                         rating_container = self.driver.find_element(By.CLASS_NAME, 'product-ratings__list')
-                        rating_items = rating_container.find_elements(By.XPATH, './/div[contains(@class,"shopee-product-rating__main")]')
-                        newly_collected = 0
-                        for item in rating_items:
-                            if len(collected_reviews) >= max_reviews:
-                                break
-                            review_data = _extract_review_data(self, item)
-                            collected_reviews.append(review_data)
-                            pbar.update(1)
-                            newly_collected += 1
-                        if newly_collected == 0 or len(collected_reviews) >= max_reviews:
+                        reached_known = False
+                        # Incremental runs must see each page before deciding to go on, so they skip offline parsing.
+                        if self.parse_pipeline and self.review_index is None and self.since is None:
+                            newly_collected = _submit_page_reviews(self, rating_container, max_reviews - collected_count, pending_pages)
+                        else:
+                            page_reviews = _extract_page_reviews(self, rating_container, max_reviews - collected_count, page_num)
+                            page_reviews, reached_known = filter_new_reviews(self, page_reviews)
+                            collected_reviews.extend(page_reviews)
+                            self._publish_reviews(page_reviews)
+                            newly_collected = len(page_reviews)
+                        collected_count += newly_collected
+                        pbar.update(newly_collected)
+                        if reached_known or newly_collected == 0 or collected_count >= max_reviews:
                             logging.info("No more reviews on this page or limit reached.")
                             break
                         # Try to click the next page button
@@ -66,12 +101,14 @@ def collect_reviews(self, max_reviews):
                         for button in buttons:
                             if button.text.strip() == str(page_num + 1):
                                 logging.info(f"Clicking next page: {page_num + 1}")
-                                button.click()
-                                time.sleep(2) # Wait for the new page to load
+                                click_and_wait_for_reviews(self, button.click) # Wait for the new page to load
                                 page_num += 1
                                 self.last_review_page = page_num # Update the last visited page
+                                self.last_review_offset = page_num * _DOM_REVIEWS_PER_PAGE
+                                self.last_review_filter = self.review_filter
                                 next_button_found = True
-                                self._periodic_save() # Save after each review page
+                                if self.product_link:
+                                    self._periodic_save(self.product_link) # Save resume state after each review page
                                 break
                         if not next_button_found:
                             logging.info("Next page button not found or reached the end.")
@@ -82,8 +119,139 @@ def collect_reviews(self, max_reviews):
                     except Exception as e:
                         logging.warning(f"Error collecting reviews on page {page_num}: {e}")
                         break
+
+            for future in pending_pages:
+                try:
+                    page_reviews = future.result()
+                    collected_reviews.extend(page_reviews)
+                    self._publish_reviews(page_reviews)
+                except Exception as e:
+                    logging.warning(f"Offline parsing of a review page failed: {e}")
             return collected_reviews
 
+def _take_resume_offset(self):
+            """Returns the offset to resume the active review filter from and clears the saved resume state.
+
+            Returns 0 when there is nothing to resume or the saved state belongs to another filter.
+            """
+            if not self.continue_scrape or not (self.last_review_offset or self.last_review_page):
+                return 0
+            if self.last_review_filter not in (None, self.review_filter):
+                return 0
+            if self.last_review_offset is not None:
+                offset = self.last_review_offset
+            else:
+                # Older output files only record the page, which was fully collected.
+                offset = self.last_review_page * _DOM_REVIEWS_PER_PAGE
+            self.last_review_page = None # Reset so we start collecting from here
+            self.last_review_offset = None
+            self.last_review_filter = None
+            return offset
+
+def _planned_review_filters(self):
+            """Review filters this run collects, in the order the collectors go through them."""
+            planned = ["media"] if self.media_only else []
+            if self.all_star_types:
+                planned += [f"{star}_star" for star in range(5, 0, -1)]
+            if not self.media_only and not self.all_star_types:
+                planned.append("all")
+            return planned
+
+def _resume_skips_filter(self, filter_name):
+            """True if --continue-scrape stopped in a later filter than filter_name, which was then fully collected."""
+            if not self.continue_scrape or not (self.last_review_offset or self.last_review_page):
+                return False
+            planned = _planned_review_filters(self)
+            saved = self.last_review_filter
+            if saved in (None, filter_name) or saved not in planned or filter_name not in planned:
+                return False
+            return planned.index(filter_name) < planned.index(saved)
+
+def _click_to_page(self, start_page):
+            """Clicks through the page controller until start_page; returns the page reached."""
+            page_num = 1
+            try:
+                nav_element = self.driver.find_element(By.CLASS_NAME, 'product-ratings__page-controller')
+                buttons = nav_element.find_elements(By.TAG_NAME, 'button')
+                # Click next buttons until we reach the page to continue
+                while page_num < start_page:
+                    next_button_found = False
+                    for button in buttons:
+                        if button.text.strip() == str(page_num + 1):
+                            logging.info(f"Clicking next page to reach: {page_num + 1}")
+                            click_and_wait_for_reviews(self, button.click) # Wait for the new page to load
+                            page_num += 1
+                            nav_element = self.driver.find_element(By.CLASS_NAME, 'product-ratings__page-controller')
+                            buttons = nav_element.find_elements(By.TAG_NAME, 'button')
+                            next_button_found = True
+                            break
+                    if not next_button_found:
+                        logging.warning("Could not find the next page button while trying to continue.")
+                        break
+                logging.info(f"Reached or attempted to reach page: {page_num}")
+            except NoSuchElementException:
+                logging.warning("Could not find the page controller to continue.")
+            except Exception as e:
+                logging.warning(f"Error navigating to the starting page: {e}")
+            return page_num
+
+def _submit_page_reviews(self, rating_container, limit, pending_pages):
+            """Captures the rating list HTML and queues it for offline parsing.
+
+            Returns how many reviews the page will yield, so paging can go on without waiting.
+            """
+            page_html, item_count, base_url = self.driver.execute_script(
+                "const r = document.evaluate(arguments[1], arguments[0], null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);"
+                "return [arguments[0].outerHTML, r.snapshotLength, document.baseURI];",
+                rating_container, _REVIEW_XPATHS["item"])
+            count = min(item_count, limit)
+            if count > 0:
+                pending_pages.append(self.parse_pipeline.submit_review_page(page_html, base_url, count))
+            return count
+
+def _extract_page_reviews(self, rating_container, limit, page_num=None):
+            """Extracts up to limit reviews from the current page, in bulk when possible."""
+            if self.network_capture and page_num:
+                reviews = _captured_page_reviews(self, page_num, limit)
+                if reviews is not None:
+                    return reviews
+            if self.fast_extract:
+                reviews = _extract_reviews_bulk(self, rating_container, limit)
+                if reviews is not None:
+                    return reviews
+            rating_items = rating_container.find_elements(By.XPATH, _REVIEW_XPATHS["item"])
+            return [_extract_review_data(self, item) for item in rating_items[:limit]]
+
+def _captured_page_reviews(self, page_num, limit):
+            """Returns the reviews of the current page from its captured ratings response, if it was seen."""
+            pages = self.network_capture.take_ratings(self.driver, self.driver.current_url)
+            expected_offset = (page_num - 1) * _DOM_REVIEWS_PER_PAGE
+            filter_args = _api_filter_args(self.review_filter)
+            expected_type = filter_args.get("star", 0)
+            expected_filter = _MEDIA_FILTER if filter_args.get("media") else 0
+            matching = [reviews for star, filter_value, offset, reviews in pages
+                        if (star, filter_value, offset) == (expected_type, expected_filter, expected_offset)]
+            if matching:
+                logging.debug(f"Using captured ratings response for page {page_num}")
+                return matching[-1][:limit]
+            return None
+
+def _extract_reviews_bulk(self, rating_container, limit):
+            """Extracts all reviews of the current page with a single execute_script call.
+
+            Returns None if the script fails, so the caller can fall back to per-element extraction.
+            """
+            start_time = time.time()
+            try:
+                raw = self.driver.execute_script(_REVIEW_PAGE_SCRIPT, rating_container, limit, _REVIEW_XPATHS,
+                                                 self.render_profile != "light")
+                reviews = json.loads(raw)
+                logging.debug(f"Bulk extracted {len(reviews)} reviews in {time.time() - start_time:.4f} seconds")
+                return reviews
+            except Exception as e:
+                logging.warning(f"Bulk review extraction failed, falling back to per-element extraction: {e}")
+                return None
+
 def _extract_review_data(self, item):
             review_data = {}
             start_time = time.time()
@@ -201,8 +369,12 @@ def _extract_review_data(self, item):
                 for img in image_elems:
                     img_url = img.get_attribute('src')
                     if img_url:
-                        # Verificar se a imagem tem dimensões visíveis
-                        if img.size['width'] > 0 and img.size['height'] > 0:
+                        # Verificar se a imagem tem dimensões visíveis (imagens bloqueadas no perfil leve não têm tamanho)
+                        if self.render_profile == "light":
+                            visible = self.driver.execute_script("return arguments[0].getClientRects().length > 0", img)
+                        else:
+                            visible = img.size['width'] > 0 and img.size['height'] > 0
+                        if visible:
                             review_data["images"].append(img_url)
                         else:
                             logging.debug(f"Ignorando imagem invisível: {img_url}")
@@ -1,7 +1,8 @@
-import json
-import os
 import sys
 import re
+import time
+import queue
+import threading
 import undetected_chromedriver as uc
 import logging
 from tqdm import tqdm
@@ -10,14 +11,25 @@ from .browser import (
     _initialize_driver,
     _configure_options,
     _save_cookies,
+    SITE_URL,
 )
-from .search_page_parser import scrape_search_page
-from .product_page_parser import scrape_product_details
+from .search_page_parser import scrape_search_page, iter_search_products
+from .product_page_parser import scrape_product_details, _scrape_loaded_product, probe_product_counters, SCRAPE_FAILED_KEY
+from .output_store import OutputJournal
+from .session_store import SessionStore
+from .worker_pool import run_worker_pool
+from .tab_scheduler import run_tab_scheduler
+from .readiness import log_readiness_stats
+from .browser_daemon import attach_to_daemon, release_daemon_session
+from .utils import _StreamClosed
+from .review_index import ReviewIndex, REVIEW_INDEX_FILE
+from .refresh_planner import product_counters, estimated_review_pages
 
 class ShopeeScraper:
-    def __init__(self, search_term, max_products, index_only, review_limit, all_star_types=False, star_limit_per_type=10, chrome_user_data_dir=None, media_only=False, product_link=None, continue_scrape=False, output_file=None):
+    def __init__(self, search_term, max_products, index_only, review_limit, all_star_types=False, star_limit_per_type=10, chrome_user_data_dir=None, media_only=False, product_link=None, continue_scrape=False, output_file=None, fast_extract=True, offline_parse=False, parse_workers=None, workers=1, tabs=1, review_source="dom", api_page_size=50, api_base_url=None, capture_network=False, render_profile="full", attach_state_file=None, frontier=None, bounded_memory=False, incremental=False, since=None, review_index_file=REVIEW_INDEX_FILE, refresh_planner=None, refresh_budget=100, site_url=SITE_URL):
         self.driver = None
-        self.cookies_file = 'cookies_shopee.dat'
+        self.cookies_file = 'cookies_shopee.json'
+        self.session_store = SessionStore(self.cookies_file) # Shared cookie jar, seeded before the first navigation
         self.search_term = search_term
         self.max_products = max_products
         self.index_only = index_only
@@ -29,6 +41,41 @@ class ShopeeScraper:
         self.product_link = product_link
         self.continue_scrape = continue_scrape
         self.last_review_page = None # To track the last scraped review page
+        self.last_review_offset = None # Offset to resume from within last_review_filter
+        self.last_review_filter = None # Review filter ('all', 'media', '<n>_star') the resume state belongs to
+        self.review_filter = "all" # Review filter currently being collected
+        self.fast_extract = fast_extract # Extract whole pages with in-page scripts instead of per-element lookups
+        self.offline_parse = offline_parse # Parse captured HTML with lxml in a process pool
+        self.parse_workers = parse_workers
+        self.parse_pipeline = None
+        self.workers = max(1, workers) # Number of browsers scraping product pages in parallel
+        self.tabs = max(1, tabs) # Number of tabs sharing one browser when not using workers
+        self.review_source = review_source # "dom" clicks through the review list, "api" pages the ratings endpoint
+        self.api_page_size = api_page_size
+        self.api_base_url = api_base_url # Defaults to the origin of the product link
+        self.review_fetcher = None # Optional url -> JSON callable replacing the in-browser fetch
+        self.capture_network = capture_network # Decode the frontend's JSON responses from CDP network events
+        self.network_capture = None
+        self.readiness_stats = {} # condition name -> (waits, seconds waited, timeouts)
+        self.render_profile = render_profile # "full" renders everything, "light" runs headless and blocks images, media, fonts and trackers
+        self.attach_state_file = attach_state_file # State file of a browser daemon to attach to instead of starting Chrome
+        self.daemon_session = None # Daemon state while attached to it
+        self.started_at = None # When execute() started, to measure the time to the first request
+        self.first_request_seconds = None
+        self.frontier = frontier # Frontier of queued keywords and product links for batch runs
+        self.bounded_memory = bounded_memory # Drop finished products from output_data once they are journaled
+        self._flushed_links = set() # Links of finished products dropped from output_data
+        self.current_product_link = None # Product whose reviews are being collected
+        self._current_comments = None # SpilledComments of that product in bounded-memory mode
+        self._stream_queue = None # Records for iter_products/iter_reviews consumers
+        self._stream_kinds = set()
+        self._stream_closed = None
+        self.review_index = ReviewIndex(review_index_file) if incremental else None # Fingerprints of reviews scraped in earlier runs
+        self.since = since # Optional datetime; older reviews are not collected
+        self._known_reviews = {} # link -> known review fingerprints of products being scraped
+        self.refresh_planner = refresh_planner # Schedules change-aware refreshes of watched products
+        self.refresh_budget = refresh_budget # Page loads allowed per refresh run
+        self.site_url = site_url.rstrip("/") # Origin of search pages and the home page, e.g. a local mock site
 
         self._last_content_xpath_found = None
 
@@ -55,26 +102,127 @@ class ShopeeScraper:
                 except Exception as e:
                     logging.warning(f"Could not extract IDs from product link for filename: {e}")
                     base_filename = f"shopee_link"
+            elif self.frontier:
+                base_filename = "shopee_batch"
+            elif self.refresh_planner:
+                base_filename = "shopee_refresh"
             elif self.search_term: 
                 safe_keyword = re.sub(r'[^a-z0-9_]+', '', self.search_term.lower())
                 if safe_keyword: 
                     base_filename = f"shopee_{safe_keyword}"
             self.out_file = f"{base_filename}.json"
+        self.journal = OutputJournal(self.out_file)
         self._load_existing_data()
+        if self.bounded_memory:
+            for link, product in list(self.output_data.items()):
+                if product.get("comments") and link != self.product_link:
+                    self._flush_product(link)
 
     def execute(self):
         """Main execution method to orchestrate the scraping process."""
         sys.excepthook = self._handle_exception
-        _initialize_driver(self)
+        if self.offline_parse:
+            from .offline_parser import ParsePipeline
+            self.parse_pipeline = ParsePipeline(self.parse_workers)
+        self.started_at = time.monotonic()
+        if not (self.attach_state_file and attach_to_daemon(self, self.attach_state_file)):
+            _initialize_driver(self)
 
         try:
             if self.product_link:
                 self._process_single_product()
+            elif self.frontier:
+                self._process_frontier()
+            elif self.refresh_planner:
+                self._process_refresh()
             else:
                 self._process_keyword_search()
         finally:
             self._finalize_scraping()
 
+    def iter_products(self, buffer_size=16):
+        """Runs the scrape in a background thread and yields each product as soon as it is stored.
+
+        The scrape waits while buffer_size products are not consumed yet. Closing the
+        generator early stops the scrape at the next product or review page it hands over.
+        """
+        for _, product in self._stream({"product"}, buffer_size):
+            yield product
+
+    def iter_reviews(self, buffer_size=256):
+        """Like iter_products, but yields (product_link, review) as each review page is extracted."""
+        for _, item in self._stream({"review"}, buffer_size):
+            yield item
+
+    def _stream(self, kinds, buffer_size):
+        self._stream_queue = queue.Queue(maxsize=buffer_size)
+        self._stream_kinds = kinds
+        self._stream_closed = threading.Event()
+        done = ("done", None)
+        errors = []
+
+        def run():
+            try:
+                self.execute()
+            except _StreamClosed:
+                logging.info("Stream consumer stopped reading, scraping stopped.")
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                try:
+                    self._put_stream(done)
+                except _StreamClosed:
+                    pass
+
+        thread = threading.Thread(target=run, name="scraper-stream", daemon=True)
+        thread.start()
+        try:
+            while True:
+                entry = self._stream_queue.get()
+                if entry is done:
+                    break
+                yield entry
+        finally:
+            self._stream_closed.set()
+            thread.join()
+            self._stream_queue = None
+        if errors:
+            raise errors[0]
+
+    def _emit(self, kind, item):
+        """Hands a record to the iter_products/iter_reviews consumer, if one asked for this kind."""
+        if self._stream_queue is not None and kind in self._stream_kinds:
+            self._put_stream((kind, item))
+
+    def _put_stream(self, entry):
+        while True:
+            if self._stream_closed.is_set():
+                raise _StreamClosed()
+            try:
+                self._stream_queue.put(entry, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _review_buffer(self):
+        """List a review collector adds to; in bounded-memory mode it journals reviews as they are added."""
+        if self._current_comments is None:
+            return []
+        return self._current_comments.buffer()
+
+    def _spill_comments(self, product):
+        """Journals product and sends the reviews collected for it straight to the journal from now on."""
+        link = product["link"]
+        on_extend = (lambda reviews: self.review_index.add(link, reviews)) if self.review_index else None
+        self._current_comments = self.journal.spill_comments(product, on_extend)
+
+    def _publish_reviews(self, reviews):
+        """Streams freshly extracted reviews of the current product to an iter_reviews consumer."""
+        if self._stream_queue is None or "review" not in self._stream_kinds:
+            return
+        for review in reviews:
+            self._emit("review", (self.current_product_link, review))
+
     def _rescrape_missing_comments(self):
         """Rescrapes comments for products in output data that have no comments."""
         logging.info("Rescraping missing comments from existing data...")
@@ -83,65 +231,52 @@ class ShopeeScraper:
                 try:
                     updated_product = scrape_product_details(self, product)
                     self.output_data[link] = updated_product
-                    self._periodic_save()
+                    self._periodic_save(link)
                 except Exception as e:
                     logging.warning(f"Error rescraping comments for {link}: {e}")
 
     def _load_existing_data(self):
-        if os.path.exists(self.out_file):
-            try:
-                with open(self.out_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                self.output_data = {item['link']: item for item in data if 'link' in item}
-                logging.debug(f"_load_existing_data - Loaded {len(self.output_data)} products from {self.out_file}")
-                # Attempt to load the last review page if continue_scrape is True and it's a single product
-                if self.continue_scrape and self.product_link and data and data[0].get('last_review_page'):
-                    self.last_review_page = data[0]['last_review_page']
-                    logging.info(f"Continuing scrape from review page: {self.last_review_page + 1} ")
-                elif self.continue_scrape and self.product_link and data:
-                    logging.info("Continue scrape requested, but no last_review_page found in existing data.")
-            except json.JSONDecodeError:
-                logging.warning(f"Error decoding JSON from {self.out_file}. Starting with empty data.")
-                self.output_data = {}
-            except FileNotFoundError:
-                logging.info(f"Output file {self.out_file} not found. Starting with empty data.")
-                self.output_data = {}
-        else:
-            self.output_data = {}
-
-    def _periodic_save(self):
-        """Save the current output data to JSON, including the last review page."""
+        """Loads the output file and replays its journal on top of it."""
         try:
-            all_data = []
-
-            if os.path.exists(self.out_file):
-                with open(self.out_file, 'r', encoding='utf-8') as f:
-                    try:
-                        all_data = json.load(f)
-                    except json.JSONDecodeError:
-                        logging.warning("Could not decode existing JSON file. Starting with empty data.")
-
-            updated_data = list(self.output_data.values())
-
-            existing_products = {item.get('link'): item for item in all_data if item.get('link')}
+            products = self.journal.load(keep_comments=not self.bounded_memory)
+        except Exception as e:
+            logging.warning(f"Could not load existing data from {self.out_file}: {e}. Starting with empty data.")
+            products = {}
+        self.output_data = {item['link']: item for item in products.values() if 'link' in item}
+        logging.debug(f"_load_existing_data - Loaded {len(self.output_data)} products from {self.out_file}")
+        # Attempt to load the last review page if continue_scrape is True and it's a single product
+        if self.continue_scrape and self.product_link:
+            existing = self.output_data.get(self.product_link)
+            if existing is None and products:
+                existing = next(iter(products.values()))
+            if existing and (existing.get('last_review_page') or existing.get('last_review_offset')):
+                self.last_review_page = existing.get('last_review_page') or 0
+                self.last_review_offset = existing.get('last_review_offset')
+                self.last_review_filter = existing.get('last_review_filter')
+                logging.info(f"Continuing scrape from review page: {self.last_review_page + 1} ")
+            elif existing:
+                logging.info("Continue scrape requested, but no last_review_page found in existing data.")
 
-            for product in updated_data:
-                link = product.get('link')
-                if link:
-                    existing_products[link] = product
-                else:
-                    all_data.append(product)
+    def _periodic_save(self, link=None):
+        """Journals what changed since the last save, including the last review page.
 
-            final_data = list(existing_products.values())
+        When link is given only that product is checked for changes.
+        """
+        try:
+            if self.product_link and self.last_review_page is not None and self.product_link in self.output_data:
+                product = self.output_data[self.product_link]
+                product['last_review_page'] = self.last_review_page
+                product['last_review_offset'] = self.last_review_offset
+                product['last_review_filter'] = self.last_review_filter
 
-            if self.product_link and final_data and self.last_review_page is not None:
-                for item in final_data:
-                    if item.get('link') == self.product_link:
-                        item['last_review_page'] = self.last_review_page
-                        break
+            if link is not None:
+                products = [self.output_data[link]] if link in self.output_data else []
+                if self.product_link in self.output_data and link != self.product_link:
+                    products.append(self.output_data[self.product_link])
+            else:
+                products = list(self.output_data.values())
 
-            with open(self.out_file, 'w', encoding='utf-8') as f:
-                json.dump(final_data, f, ensure_ascii=False, indent=2)
+            self.journal.record(products)
             logging.info("Periodic save successful.")
         except Exception as e:
             logging.warning(f"Periodic save failed: {e}")
@@ -154,7 +289,7 @@ class ShopeeScraper:
                 try:
                     scrape_product_details(self, product)
                     self.output_data[link] = product
-                    self._periodic_save()
+                    self._periodic_save(link)
                 except Exception as e:
                     logging.warning(f"Error scraping comments for {link}: {e}")
 
@@ -162,15 +297,30 @@ class ShopeeScraper:
         logging.error("Uncaught exception", exc_info=(exc_type, exc_value, exc_traceback))
 
     def _finalize_scraping(self):
-        """Saves cookies and quits the WebDriver."""
+        """Saves cookies and quits the WebDriver, or only releases the session when attached to the browser daemon."""
         logging.info("Finalizing scraping...")
         try:
             _save_cookies(self)
         except Exception as e:
             logging.warning(f"Could not save cookies: {e}")
-        if self.driver:
+        if self.driver and self.daemon_session:
+            release_daemon_session(self)
+        elif self.driver:
             self.driver.quit()
+        if self.parse_pipeline:
+            self.parse_pipeline.shutdown()
+        log_readiness_stats(self)
         self._periodic_save()
+        if self.frontier:
+            self.frontier.close()
+        if self.review_index:
+            self.review_index.close()
+        if self.refresh_planner:
+            self.refresh_planner.close()
+        try:
+            self.journal.close()
+        except Exception as e:
+            logging.warning(f"Could not compact journal into {self.out_file}: {e}")
         logging.info(f"Scraping finished. Data saved to {self.out_file}")
 
     def _process_keyword_search(self):
@@ -178,27 +328,117 @@ class ShopeeScraper:
         if self.output_data and self.continue_scrape:
             self._rescrape_missing_comments()
 
-        products = []
-        try:
-            products = scrape_search_page(self)
-        except Exception as e:
-            logging.error(f"Error scraping search page: {e}")
-
-        if not products:
-            logging.warning("No products found or error during search page scraping.")
-            return
+        # Products are scraped as soon as their result page is read, while later pages are still to be loaded.
+        self._scrape_products(self._unprocessed(iter_search_products(self)), total=self.max_products)
 
-        for prod in tqdm(products, desc="Processing products"):
+    def _unprocessed(self, products):
+        """Yields the products that have no scraped comments in output_data yet."""
+        for prod in products:
             link = prod["link"]
-            if link in self.output_data and self.output_data[link].get("comments"):
+            if link in self._flushed_links or (link in self.output_data and self.output_data[link].get("comments")):
                 logging.debug(f"Skipping already processed product: {link}")
                 continue
+            yield prod
+
+    def _process_frontier(self):
+        """Expands every queued keyword into products, then scrapes the queued products in batches."""
+        while True:
+            keyword = self.frontier.claim_keyword()
+            if keyword is None:
+                break
+            self.search_term = keyword
+            products = []
+            try:
+                products = scrape_search_page(self)
+            except Exception as e:
+                logging.error(f"Error scraping search page for '{keyword}': {e}")
+            added = self.frontier.add_products(products, keyword=keyword)
+            logging.info(f"Keyword '{keyword}': {len(products)} results, {added} not seen before.")
+            self.frontier.finish_keyword(keyword, succeeded=bool(products))
+
+        batch_size = max(self.workers, self.tabs) * 10
+        while True:
+            batch = self.frontier.claim_products(batch_size)
+            if not batch:
+                break
+            self._scrape_products(batch)
+            # Products a failing worker handed back were not stored; retry them in a later batch.
+            self.frontier.requeue_in_progress()
+        logging.info(f"Frontier status: {self.frontier.counts()}")
 
+    def _process_refresh(self):
+        """Probes the watched products that are due and collects reviews only for those whose counters moved."""
+        budget = self.refresh_budget
+        due = self.refresh_planner.due()
+        probed = changed = 0
+        logging.info(f"{len(due)} watched products are due for a refresh, page budget {budget}.")
+        for link in due:
+            if budget <= 0:
+                logging.info("Refresh page budget used up, the remaining products stay due.")
+                break
+            budget -= 1
+            probed += 1
+            try:
+                counters = probe_product_counters(self, link)
+            except Exception as e:
+                logging.warning(f"Could not probe {link}: {e}")
+                continue
+            if counters is not None and not self.refresh_planner.has_changed(link, counters):
+                logging.info(f"No change on {link}, skipping review collection.")
+                self.refresh_planner.record(link, changed=False)
+                continue
+
+            changed += 1
+            budget -= estimated_review_pages(self, link, counters or {})
+            product = self.output_data.get(link) or {"link": link, "comments": []}
+            for field in ("sold", "Ratings"):
+                product.pop(field, None) # Let the page refill them with the current values
+            product = _scrape_loaded_product(self, product) # The probe already loaded the page
+            failed = product.get(SCRAPE_FAILED_KEY, False) # Consumed by _store_product
+            self._store_product(product)
+            if failed:
+                # Keep the old counters, so the next probe still sees the change and collects the missed reviews.
+                self.refresh_planner.record(link, changed=True)
+            else:
+                self.refresh_planner.record(link, changed=True, counters=product_counters(product))
+        logging.info(f"Refresh finished: {probed} products probed, {changed} changed.")
+
+    def _scrape_products(self, products, total=None):
+        """Scrapes the details of products (a list or an iterator) unless index_only, and stores them."""
+        if not self.index_only and self.workers > 1:
+            run_worker_pool(self, products, total=total)
+            return
+        if not self.index_only and self.tabs > 1:
+            run_tab_scheduler(self, products, total=total)
+            return
+
+        for prod in tqdm(products, total=total, desc="Processing products"):
             if not self.index_only:
                 prod = scrape_product_details(self, prod)
+            self._store_product(prod)
+
+    def _store_product(self, prod):
+        """Stores a finished product in output_data, journals it and hands it to a stream consumer."""
+        link = prod["link"]
+        failed = prod.pop(SCRAPE_FAILED_KEY, False)
+        self.output_data[link] = prod
+        self._periodic_save(link)
+        if self.frontier:
+            if failed:
+                self.frontier.fail_product(link) # Retried in a later batch until it runs out of attempts
+            else:
+                self.frontier.finish_product(link)
+        if self.review_index:
+            self.review_index.add(link, prod.get("comments") or [])
+            self._known_reviews.pop(link, None)
+        if self.bounded_memory:
+            self._flush_product(link)
+        self._emit("product", prod)
 
-            self.output_data[link] = prod
-            self._periodic_save()
+    def _flush_product(self, link):
+        """Drops a journaled product from output_data, remembering that it is done."""
+        del self.output_data[link]
+        self._flushed_links.add(link)
 
     def _process_single_product(self):
         """Processes scraping for a single product link."""
@@ -215,9 +455,8 @@ class ShopeeScraper:
                 product_data["comments"] = []
         else:
             product_data = {"link": self.product_link, "comments": []}
+            self.output_data[self.product_link] = product_data # So the resume state is journaled while scraping
         try:
-            updated_product = scrape_product_details(self, product_data)
-            self.output_data[self.product_link] = updated_product
-            self._periodic_save()
+            self._store_product(scrape_product_details(self, product_data))
         except Exception as e:
             logging.error(f"Error scraping details for {self.product_link}: {e}")
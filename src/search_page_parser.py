@@ -1,19 +1,53 @@
 import logging
 import re
+from itertools import count
 from selenium.common.exceptions import NoSuchElementException
-from .browser import _safe_get, _load_cookies 
+from .browser import _safe_get
 from selenium.webdriver.common.by import By
+from .readiness import wait_for_search_results
+from .utils import _canonical_product_key
 
 def scrape_search_page(self):
-        logging.info("Loading Shopee search page...")
-        base_url = "https://shopee.com.br/search?keyword="
+        """Returns up to max_products search results as a list."""
+        return list(iter_search_products(self))
+
+def iter_search_products(self):
+        """Yields search results page by page (page=0, 1, ...) until max_products were yielded.
+
+        Every result page is fully extracted before its products are yielded, so the caller
+        may navigate the same driver to the products in between pages.
+        """
+        base_url = f"{self.site_url}/search?keyword="
         kw_encoded = re.sub(r'\s+', '%20', self.search_term.strip())
-        url = f"{base_url}{kw_encoded}&page=0&sortBy=sales"
-        _safe_get(self, url)
-        _load_cookies(self)
-        _safe_get(self, url)
-        self.driver.implicitly_wait(5)
-        return _retrieve_products(self)
+        seen = set()
+        for page in count():
+            remaining = self.max_products - len(seen)
+            if remaining <= 0:
+                break
+            logging.info(f"Loading Shopee search page {page}...")
+            try:
+                _safe_get(self, f"{base_url}{kw_encoded}&page={page}&sortBy=sales") # Cookies were already seeded when the driver started
+                self.driver.implicitly_wait(5)
+                wait_for_search_results(self) # Scroll until lazily rendered cards are filled in
+                products = _retrieve_products(self, remaining)
+            except Exception as e:
+                logging.error(f"Error scraping search page {page}: {e}")
+                break
+
+            new_products = []
+            for prod in products:
+                key = _canonical_product_key(prod["link"])
+                if prod["link"] == "<Link>" or key in seen:
+                    continue
+                seen.add(key)
+                new_products.append(prod)
+            if not new_products:
+                logging.info(f"Search page {page} has no new products, stopping.")
+                break
+            logging.info(f"Search page {page}: {len(new_products)} new products ({len(seen)}/{self.max_products}).")
+            yield from new_products[:remaining]
+        if not seen:
+            logging.warning("No products found or error during search page scraping.")
 
 def _get_search_page_product_elements(self):
     logging.info("Retrieving product data...")
@@ -32,11 +66,11 @@ def _get_search_page_product_elements(self):
 
     return product_elements
 
-def _extract_product_search_page_info(self, product_elements):
+def _extract_product_search_page_info(self, product_elements, limit):
     result = []
     for idx, li in enumerate(product_elements):
-        if idx >= self.max_products:
-            logging.info(f"Reached maximum number of products ({self.max_products}). Stopping product retrieval.")
+        if idx >= limit:
+            logging.info(f"Reached maximum number of products ({limit}) for this page. Stopping product retrieval.")
             break
         logging.debug(f"Processing product element at index: {idx}")
         product_info = {}
@@ -121,9 +155,42 @@ def _extract_product_search_page_info(self, product_elements):
     logging.info(f"Processed {len(result)} product data items.")
     return result
 
-def _retrieve_products(self):
+def _retrieve_products(self, limit):
+        captured = _captured_search_products(self)
+        if len(captured) >= limit:
+            logging.info(f"Using {limit} products from captured search responses.")
+            return captured[:limit]
+        return _merge_captured_search_products(_retrieve_dom_products(self, limit), captured, limit)
+
+def _captured_search_products(self):
+        """Returns the search results decoded from captured network responses, without duplicates."""
+        if not self.network_capture:
+            return []
+        products = {}
+        for prod in self.network_capture.take_search_products(self.driver):
+            products.setdefault(_canonical_product_key(prod["link"]), prod)
+        return list(products.values())
+
+def _merge_captured_search_products(products, captured, max_products):
+        """Fills placeholder fields of DOM-scraped products with the exact values from captured responses."""
+        if not captured:
+            return products
+        by_key = {_canonical_product_key(prod["link"]): prod for prod in captured}
+        seen = set()
+        for prod in products:
+            key = _canonical_product_key(prod["link"])
+            seen.add(key)
+            for field, value in by_key.get(key, {}).items():
+                if field == "link":
+                    continue
+                if field not in prod or str(prod[field]).startswith("<"):
+                    prod[field] = value
+        extra = [prod for key, prod in by_key.items() if key not in seen]
+        return (products + extra)[:max_products]
+
+def _retrieve_dom_products(self, limit):
         product_elements = _get_search_page_product_elements(self)
         if product_elements:
-            return _extract_product_search_page_info(self, product_elements)
+            return _extract_product_search_page_info(self, product_elements, limit)
         return []
     
\ No newline at end of file
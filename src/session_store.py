@@ -0,0 +1,123 @@
+"""Cookie jar shared by every scraper process that uses the same file.
+
+Cookies are kept as JSON in the shape CDP's Network.setCookies accepts, so they can be
+seeded into a fresh browser before its first navigation. Saves merge with what other
+processes wrote in the meantime and replace the file atomically, holding a lock file
+so that concurrent saves cannot drop each other's cookies.
+"""
+import json
+import logging
+import os
+import pickle
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+_COOKIE_FIELDS = ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite")
+
+
+class SessionStore:
+    def __init__(self, path="cookies_shopee.json", legacy_path="cookies_shopee.dat"):
+        self.path = path
+        self.legacy_path = legacy_path
+
+    def load(self, now=None):
+        """Returns the cookies that have not expired yet."""
+        now = time.time() if now is None else now
+        cookies = self._read()
+        live = [c for c in cookies if not _is_expired(c, now)]
+        if len(live) < len(cookies):
+            logging.info(f"Dropped {len(cookies) - len(live)} expired cookies from {self.path}.")
+        expiries = [c["expires"] for c in live if c.get("expires")]
+        if expiries:
+            logging.debug(f"Earliest cookie in {self.path} expires in {(min(expiries) - now) / 3600:.1f}h.")
+        return live
+
+    def save(self, cookies, now=None):
+        """Merges cookies into the stored jar, newest value winning, and writes it atomically."""
+        now = time.time() if now is None else now
+        with _file_lock(f"{self.path}.lock"):
+            merged = {_cookie_key(c): c for c in self._read()}
+            for cookie in cookies:
+                merged[_cookie_key(cookie)] = normalize_cookie(cookie)
+            live = [c for c in merged.values() if not _is_expired(c, now)]
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(live, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def _read(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return [normalize_cookie(c) for c in json.load(f)]
+            except (OSError, json.JSONDecodeError) as e:
+                logging.warning(f"Could not read cookies from {self.path}: {e}")
+                return []
+        if self.legacy_path and os.path.exists(self.legacy_path):
+            # Cookies saved by older versions with pickle, in Selenium's format.
+            try:
+                with open(self.legacy_path, 'rb') as f:
+                    cookies = [normalize_cookie(c) for c in pickle.load(f)]
+                logging.info(f"Migrating {len(cookies)} cookies from {self.legacy_path} to {self.path}.")
+                return cookies
+            except Exception as e:
+                logging.warning(f"Could not read legacy cookies from {self.legacy_path}: {e}")
+        return []
+
+
+@contextmanager
+def _file_lock(lock_path):
+    """Holds an exclusive lock on lock_path, blocking until other processes release it."""
+    with open(lock_path, 'a+b') as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # LK_LOCK gives up after about 10 seconds; keep waiting
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def normalize_cookie(cookie):
+    """Converts a Selenium or CDP cookie dict into the stored CDP CookieParam shape."""
+    normalized = {k: cookie[k] for k in _COOKIE_FIELDS if cookie.get(k) is not None}
+    normalized.setdefault("path", "/")
+    # Selenium uses 'expiry', CDP uses 'expires' with -1 (or session=True) for session cookies.
+    expires = cookie.get("expires", cookie.get("expiry"))
+    if expires is not None and expires > 0 and not cookie.get("session"):
+        normalized["expires"] = expires
+    return normalized
+
+
+def to_selenium_cookie(cookie):
+    """Converts a stored cookie into the dict driver.add_cookie accepts."""
+    converted = {k: v for k, v in cookie.items() if k != "expires"}
+    if cookie.get("expires"):
+        converted["expiry"] = int(cookie["expires"])
+    return converted
+
+
+def _cookie_key(cookie):
+    return (cookie.get("name"), cookie.get("domain"), cookie.get("path") or "/")
+
+
+def _is_expired(cookie, now):
+    expires = cookie.get("expires")
+    return bool(expires) and expires <= now
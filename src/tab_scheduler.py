@@ -0,0 +1,110 @@
+import logging
+import time
+from collections import deque
+from tqdm import tqdm
+from .browser import _check_captcha, _apply_render_profile
+from .product_page_parser import _scrape_loaded_product, _set_missing_detail_defaults
+
+# Navigates without blocking and leaves a marker that disappears once the new document replaces the old one.
+_NAVIGATE_SCRIPT = "window.__shopeeTabPending = true; window.location.href = arguments[0];"
+_READY_SCRIPT = (
+    "return !window.__shopeeTabPending && document.readyState === 'complete'"
+    " && !!document.evaluate('//div[contains(@role, \"main\")]', document, null,"
+    " XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;"
+)
+
+
+def run_tab_scheduler(self, products, total=None, load_timeout=30, poll_interval=0.2):
+    """Scrapes products across self.tabs tabs of the scraper's single browser.
+
+    Every idle tab starts loading the next product without blocking; the first tab whose
+    page is ready is brought to the front and extracted while the others keep loading.
+    Only navigation is overlapped: extraction, including the review waits and review page
+    clicks, runs in one tab at a time, so this is a prefetch of the next product pages.
+
+    products may be an iterator that uses the scraper's own driver (like the search
+    harvester). It is then read lazily in the scraper's original tab, one product per idle
+    tab, and the products are loaded in self.tabs extra tabs.
+    """
+    driver = self.driver
+    feed_handle = driver.current_window_handle
+    lazy = not isinstance(products, (list, tuple))
+    if total is None and not lazy:
+        total = len(products)
+    handles = [] if lazy else [feed_handle]
+    while len(handles) < self.tabs:
+        driver.switch_to.new_window('tab')
+        _apply_render_profile(self)
+        handles.append(driver.current_window_handle)
+    logging.info(f"Scraping with {len(handles)} tabs.")
+
+    products = iter(products)
+    exhausted = False
+    idle = deque(handles)
+    loading = {}  # handle -> (product, load start time)
+    try:
+        with tqdm(total=total, desc="Processing products") as pbar:
+            while True:
+                while idle and not exhausted:
+                    if lazy:
+                        driver.switch_to.window(feed_handle) # The iterator may load the next search page
+                    prod = next(products, None)
+                    if prod is None:
+                        exhausted = True
+                        break
+                    handle = idle.popleft()
+                    driver.switch_to.window(handle)
+                    driver.execute_script(_NAVIGATE_SCRIPT, prod["link"])
+                    loading[handle] = (prod, time.monotonic())
+                if not loading:
+                    break
+
+                handle = _next_ready_tab(self, loading, load_timeout)
+                if handle is None:
+                    time.sleep(poll_interval)
+                    continue
+
+                prod, _ = loading.pop(handle)
+                self._store_product(_scrape_in_tab(self, prod))
+                idle.append(handle)
+                pbar.update(1)
+    finally:
+        for handle in handles:
+            if handle == feed_handle:
+                continue
+            try:
+                driver.switch_to.window(handle)
+                driver.close()
+            except Exception as e:
+                logging.debug(f"Could not close tab {handle}: {e}")
+        driver.switch_to.window(feed_handle)
+
+
+def _next_ready_tab(self, loading, load_timeout):
+    """Switches to and returns the first tab that finished loading (or timed out), if any."""
+    for handle, (prod, started) in loading.items():
+        self.driver.switch_to.window(handle)
+        try:
+            ready = self.driver.execute_script(_READY_SCRIPT)
+        except Exception as e:
+            logging.debug(f"Readiness check failed for {prod.get('link', 'N/A')}: {e}")
+            ready = False
+        if ready:
+            return handle
+        if time.monotonic() - started > load_timeout:
+            logging.warning(f"Timed out waiting for {prod.get('link', 'N/A')} to load, scraping what is there.")
+            return handle
+    return None
+
+
+def _scrape_in_tab(self, prod):
+    logging.info(f"Scraping details for: {prod.get('link', 'N/A')}")
+    try:
+        while _check_captcha(self):
+            logging.info("Retrying after captcha...")
+            self.driver.get(prod["link"])
+        return _scrape_loaded_product(self, prod)
+    except Exception as e:
+        logging.exception(f"Error scraping details for {prod.get('link', 'N/A')}: {e}")
+        _set_missing_detail_defaults(prod)
+        return prod
@@ -1,4 +1,12 @@
 import logging
+import re
+
+class _StreamClosed(BaseException):
+    """Raised in the scraping thread once the consumer of a result stream stopped reading.
+
+    Derives from BaseException so the broad `except Exception` handlers around page scraping let it through.
+    """
+
 def _convert_shortened_number(text):
     """Converts strings like '1,2k' or '15k' or '1,2mil' or '15mil' to integer."""
     text = text.lower().strip()
@@ -21,4 +29,19 @@ def _convert_shortened_number(text):
     except ValueError:
         logging.warning(f"Could not parse number from text: '{text}'")
         return 0
-    
\ No newline at end of file
+
+def _parse_product_ids(link):
+    """Extracts (shopid, itemid) from links like '...-i.123.456?...' or '/product/123/456'."""
+    if not link:
+        return None
+    match = re.search(r'i\.(\d+)\.(\d+)', link) or re.search(r'/product/(\d+)/(\d+)', link)
+    if match:
+        return match.group(1), match.group(2)
+    return None
+
+def _canonical_product_key(link):
+    """Returns 'shopid.itemid' for a product link, falling back to the link itself."""
+    ids = _parse_product_ids(link)
+    if ids:
+        return f"{ids[0]}.{ids[1]}"
+    return link
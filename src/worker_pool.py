@@ -0,0 +1,163 @@
+import copy
+import logging
+import os
+import queue
+import threading
+import undetected_chromedriver as uc
+from tqdm import tqdm
+from .browser import _initialize_driver, _configure_options
+from .product_page_parser import scrape_product_details
+from .utils import _StreamClosed
+
+# uc.Chrome patches the shared chromedriver binary on startup, so drivers are started one at a time.
+_driver_start_lock = threading.Lock()
+
+
+def run_worker_pool(self, products, total=None):
+    """Scrapes product details with self.workers browsers pulling from a shared queue.
+
+    products may be an iterator that uses the scraper's own driver (like the search
+    harvester); it is consumed while the other workers already scrape. The scraper's own
+    driver then acts as worker 0; every other worker owns its driver and Chrome profile.
+    Every worker scrapes with its own copy of the mutable scraper state; finished products
+    are merged into output_data, and readiness stats into the scraper, by a single writer thread.
+    """
+    product_queue = queue.Queue()
+    result_queue = queue.Queue()
+    stop_event = threading.Event()
+    feeding_done = threading.Event()
+    # Copied up front, before the writer thread starts changing output_data.
+    states = [_fork_state(self) for _ in range(self.workers)]
+
+    pbar = tqdm(total=total if total is not None else len(products), desc="Processing products")
+    writer_errors = []
+    writer = threading.Thread(target=_writer_loop, args=(self, result_queue, pbar, stop_event, writer_errors),
+                              name="result-writer", daemon=True)
+    writer.start()
+
+    workers = []
+    for worker_id in range(1, self.workers):
+        thread = threading.Thread(target=_worker_thread, args=(states[worker_id], worker_id, product_queue, result_queue, stop_event, feeding_done),
+                                  name=f"scrape-worker-{worker_id}", daemon=True)
+        thread.start()
+        workers.append(thread)
+
+    try:
+        for prod in products:
+            product_queue.put(prod)
+        feeding_done.set()
+        _worker_loop(states[0], 0, product_queue, result_queue, stop_event, feeding_done)
+    except BaseException:
+        stop_event.set()
+        raise
+    finally:
+        feeding_done.set()
+        for thread in workers:
+            thread.join()
+        result_queue.put(("state", states[0]))
+        result_queue.put(None)
+        writer.join()
+        pbar.close()
+
+    if writer_errors:
+        raise writer_errors[0]
+    if not product_queue.empty():
+        logging.warning(f"{product_queue.qsize()} products were left unprocessed because all workers failed.")
+
+
+def _fork_state(self):
+    """Returns a copy of the scraper sharing its driver, with its own mutable per-scrape state."""
+    worker = copy.copy(self)
+    worker.readiness_stats = {}
+    worker._known_reviews = {}
+    worker.output_data = dict(self.output_data) # Read only, for comments scraped before this run
+    return worker
+
+
+def _make_worker(worker, worker_id):
+    """Gives a forked scraper state its own driver options and Chrome profile."""
+    worker.driver = None
+    worker.daemon_session = None # Extra workers always start their own browser
+    worker.started_at = None
+    worker.continue_scrape = False
+    worker.last_review_page = None
+    worker.last_review_offset = None
+    worker.last_review_filter = None
+    worker._last_content_xpath_found = None
+    worker.chrome_user_data_dir = os.path.join(os.path.abspath("chrome_profiles"), f"worker_{worker_id}")
+    os.makedirs(worker.chrome_user_data_dir, exist_ok=True)
+    worker.options = uc.ChromeOptions()
+    _configure_options(worker)
+    return worker
+
+
+def _worker_thread(worker, worker_id, product_queue, result_queue, stop_event, feeding_done):
+    try:
+        _make_worker(worker, worker_id)
+        with _driver_start_lock:
+            _initialize_driver(worker) # Also seeds the shared cookies
+    except Exception as e:
+        logging.error(f"Worker {worker_id} could not start its browser: {e}")
+        if worker.driver:
+            worker.driver.quit()
+        return
+
+    try:
+        _worker_loop(worker, worker_id, product_queue, result_queue, stop_event, feeding_done)
+    finally:
+        result_queue.put(("state", worker))
+        try:
+            worker.driver.quit()
+        except Exception as e:
+            logging.warning(f"Worker {worker_id} could not quit its browser: {e}")
+
+
+def _worker_loop(worker, worker_id, product_queue, result_queue, stop_event, feeding_done):
+    while not stop_event.is_set():
+        try:
+            prod = product_queue.get(timeout=0.5)
+        except queue.Empty:
+            if feeding_done.is_set():
+                return
+            continue
+        try:
+            result_queue.put(("product", scrape_product_details(worker, prod)))
+            worker._known_reviews.pop(prod.get("link"), None)
+        except Exception as e:
+            # The browser is most likely unusable; hand the product to another worker and stop this one.
+            logging.error(f"Worker {worker_id} failed on {prod.get('link', 'N/A')}, stopping it: {e}")
+            product_queue.put(prod)
+            return
+
+
+def _writer_loop(self, result_queue, pbar, stop_event, writer_errors):
+    finished = []
+    while True:
+        entry = result_queue.get()
+        if entry is None:
+            break
+        kind, prod = entry
+        if kind == "state":
+            finished.append(prod)
+            continue
+        if writer_errors:
+            continue # Drain results of workers that are still stopping
+        try:
+            self._store_product(prod)
+        except _StreamClosed as e:
+            # Nobody reads the results anymore; stop the workers and let run_worker_pool re-raise.
+            writer_errors.append(e)
+            stop_event.set()
+            continue
+        except Exception as e:
+            logging.warning(f"Could not store product {prod.get('link', 'N/A')}: {e}")
+        pbar.update(1)
+    # Merged only now: until None is queued, the product feed may still record waits on the scraper itself.
+    for worker in finished:
+        _merge_readiness_stats(self, worker.readiness_stats)
+
+
+def _merge_readiness_stats(self, stats):
+    for name, (count, total, timeouts) in stats.items():
+        merged = self.readiness_stats.get(name, (0, 0.0, 0))
+        self.readiness_stats[name] = (merged[0] + count, merged[1] + total, merged[2] + timeouts)
@@ -0,0 +1,51 @@
+"""XPaths shared by the live WebDriver extractors and the offline page parser."""
+
+# Search result cards, as read by _extract_product_search_page_info.
+_SEARCH_XPATHS = {
+    "container": '//ul[contains(@class,"shopee-search-item-result__items")]',
+    "item": './/li',
+    "link": './/a[@class="contents"]',
+    "name": './/div[contains(@class,"line-clamp-2 break-words min-w-0")]',
+    "price": './/div[@class="truncate flex items-baseline"]',
+    "rating": './/div[@class="text-shopee-black87 text-xs/sp14 flex-none"]',
+    "location": './/div[@class="flex-shrink min-w-0 truncate text-shopee-black54 font-extralight text-sp10"]',
+    "img": './/img[@class="inset-y-0 w-full h-full pointer-events-none object-contain absolute"]',
+}
+
+_RATING_OVERVIEW_XPATH = '//*[@id="sll2-normal-pdp-main"]/div/div/div/div[2]/div[3]/div/div[1]/div[2]/div/div/div[2]'
+
+# Product page fields read by the one-shot snapshot and the offline parser.
+_PRODUCT_XPATHS = {
+    "main": '//div[contains(@role, "main")]',
+    "name": './/h1',
+    "price": './/section[contains(@aria-live,"polite")]/div/div[1]',
+    "rating": './/div[@class="F9RHbS dQEiAI jMXp4d"]',
+    "ratings": './/div[@class="F9RHbS"]',
+    "sold": './/span[@class="AcmPRb"]',
+    "shop_name": './/section[contains(@class, "page-product__shop")]//div[@class="fV3TIn"]',
+    "shop_profile_url": './/section[contains(@class, "page-product__shop")]//a[1]',
+    "description": [
+        '//section[contains(@class, "I_DV_3")][h2[contains(text(), "Descrição")]]/div/div',
+        '//*[@id="sll2-normal-pdp-main"]/div/div/div/div[2]/div[4]/div/div[1]/div[1]/section[2]/div',
+        '//*[@id="sll2-normal-pdp-main"]/div/div/div/div[2]/div[3]/div/div[1]/div[1]/section[2]/div'
+    ],
+    "category": [
+        '//section[contains(@class, "I_DV_3")][h2[contains(text(), "Detalhes")]]/div/div[h3[contains(text(), "Categoria")]]/div',
+    ],
+    "rating_filters": f"{_RATING_OVERVIEW_XPATH}//div[contains(@class,'product-rating-overview__filter')]//div[contains(@class,'product-rating-overview__filter')]",
+}
+
+# Review fields read by the bulk extractor and the offline parser; they mirror _extract_review_data.
+_REVIEW_XPATHS = {
+    "item": './/div[contains(@class,"shopee-product-rating__main")]',
+    "rating": './/div[@class="shopee-product-rating__rating"]',
+    "time": './/div[@class="shopee-product-rating__time"]',
+    "content": [
+        './div[contains(@style, "position: relative")]',
+        './div/div[contains(@style, "position: relative")]',
+        './/div[3]/div[contains(@style, "margin-top: 0.75rem;")]',
+        './div[3]/div'
+    ],
+    "seller_respond": './/div[@class="TQTPT9"]//div[@class="qiTixQ"]',
+    "like_count": './/div[@class="shopee-product-rating__like-count"]',
+}
@@ -0,0 +1,28 @@
+import unittest
+
+try:
+    from benchmarks.run_benchmarks import compare
+except ImportError:  # The runner imports the scraper, which needs selenium
+    compare = None
+
+OPTIONS = {"latency_ms": 0, "lazy": True, "workers": 1, "tabs": 1}
+
+
+@unittest.skipIf(compare is None, "scraper dependencies are not installed")
+class TestCompare(unittest.TestCase):
+
+    def test_regressions_are_flagged_per_metric(self):
+        baseline = {"options": OPTIONS, "scenarios": {"search_api": {"products_per_min": 100, "peak_rss_mb": 500}}}
+        results = {"search_api": {"products_per_min": 80, "peak_rss_mb": 510}, "product_dom": {"products_per_min": 5}}
+        lines, regressions = compare(results, baseline, 0.15, dict(OPTIONS))
+        self.assertEqual(regressions, [("search_api", "products_per_min")])
+        self.assertIn("product_dom: no baseline", lines)
+
+    def test_baseline_with_other_options_is_refused(self):
+        baseline = {"options": OPTIONS, "scenarios": {"search_api": {"products_per_min": 100}}}
+        with self.assertRaises(ValueError):
+            compare({"search_api": {"products_per_min": 10}}, baseline, 0.15, dict(OPTIONS, workers=3))
+
+
+if __name__ == "__main__":
+    unittest.main()
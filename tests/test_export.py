@@ -0,0 +1,113 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+from src.export import export_output, product_row, review_row, pq, zstandard
+from src.output_store import OutputJournal
+
+
+class TestExportRows(unittest.TestCase):
+
+    def test_product_row_types_counters_and_drops_placeholders(self):
+        row = product_row("1.2", {
+            "link": "https://shopee.com.br/x-i.1.2", "name": "Mouse", "rating": "4.9", "Ratings": "1,2mil",
+            "sold": 37, "location": "<Location>", "detailed_rating": {"all": 10, "5_star": 8, "1_star": 2, "media": 3},
+            "comments": [{}, {}],
+        })
+        self.assertEqual((row["rating"], row["ratings"], row["sold"]), (4.9, 1200, 37))
+        self.assertEqual((row["rating_5_star"], row["rating_1_star"], row["rating_3_star"], row["rating_media"]), (8, 2, None, 3))
+        self.assertIsNone(row["location"])
+        self.assertEqual(row["review_count"], 2)
+
+    def test_review_row_splits_time_and_variation(self):
+        row = review_row("1.2", 4, {"author": "a", "rating": 5, "time": "2024-05-01 13:22 | Variação: Azul,M",
+                                    "content": "ok", "seller_respond": "", "like_count": 2, "images": ["i"]})
+        self.assertEqual(row["time"], datetime(2024, 5, 1, 13, 22))
+        self.assertEqual(row["variation"], "Azul,M")
+        self.assertIsNone(row["seller_respond"])
+        self.assertEqual((row["review_index"], row["images"], row["videos"]), (4, ["i"], []))
+
+
+@unittest.skipIf(zstandard is None, "zstandard is not installed")
+class TestIncrementalExport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.out_file = os.path.join(self.tmpdir.name, "out.json")
+        self.export_dir = os.path.join(self.tmpdir.name, "export")
+        self.reviews_file = os.path.join(self.export_dir, "reviews.jsonl.zst")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _exported_reviews(self):
+        with open(self.reviews_file, "rb") as f:
+            reader = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+            return [json.loads(line) for line in io.TextIOWrapper(reader, encoding="utf-8")]
+
+    def test_second_export_only_writes_new_reviews(self):
+        product = {"link": "https://shopee.com.br/x-i.1.2", "name": "x", "comments": [{"content": "a"}, {"content": "b"}]}
+        journal = OutputJournal(self.out_file)
+        journal.record([product])
+        journal.close()
+        self.assertEqual(export_output(self.out_file, self.export_dir, formats=("jsonl",)), (1, 2))
+
+        journal = OutputJournal(self.out_file)
+        product["comments"].append({"content": "c"})
+        journal.record([product])
+        journal.sync()  # Left in the journal, export replays it
+        self.assertEqual(export_output(self.out_file, self.export_dir, formats=("jsonl",)), (1, 1))
+        self.assertEqual(export_output(self.out_file, self.export_dir, formats=("jsonl",)), (1, 0))
+        self.assertEqual([r["content"] for r in self._exported_reviews()], ["a", "b", "c"])
+
+    def test_frame_appended_without_saved_state_is_replaced(self):
+        product = {"link": "https://shopee.com.br/x-i.1.2", "comments": [{"content": "a"}]}
+        journal = OutputJournal(self.out_file)
+        journal.record([product])
+        journal.sync()
+        state_file = os.path.join(self.export_dir, "export_state.json")
+        export_output(self.out_file, self.export_dir, formats=("jsonl",))
+        with open(state_file, encoding="utf-8") as f:
+            state = f.read()
+
+        product["comments"].append({"content": "b"})
+        journal.record([product])
+        journal.sync()
+        export_output(self.out_file, self.export_dir, formats=("jsonl",))
+        with open(state_file, "w", encoding="utf-8") as f:
+            f.write(state)  # As if the export crashed after appending its frame
+
+        self.assertEqual(export_output(self.out_file, self.export_dir, formats=("jsonl",)), (1, 1))
+        self.assertEqual([r["content"] for r in self._exported_reviews()], ["a", "b"])
+
+    def test_changed_reviews_with_the_same_count_are_exported_again(self):
+        product = {"link": "https://shopee.com.br/x-i.1.2", "comments": [{"content": "a"}, {"content": "b"}]}
+        with open(self.out_file, "w", encoding="utf-8") as f:
+            json.dump([product], f)
+        export_output(self.out_file, self.export_dir, formats=("jsonl",))
+
+        product["comments"] = [{"content": "c"}, {"content": "d"}]
+        with open(self.out_file, "w", encoding="utf-8") as f:
+            json.dump([product], f)
+        self.assertEqual(export_output(self.out_file, self.export_dir, formats=("jsonl",)), (1, 2))
+        self.assertEqual([r["content"] for r in self._exported_reviews()], ["a", "b", "c", "d"])
+
+    @unittest.skipIf(pq is None, "pyarrow is not installed")
+    def test_reviews_are_written_in_batches(self):
+        products = [{"link": f"https://shopee.com.br/x-i.1.{i}", "comments": [{"content": f"{i}-{j}"} for j in range(3)]}
+                    for i in range(5)]
+        journal = OutputJournal(self.out_file)
+        journal.record(products)
+        journal.sync()
+        with mock.patch("src.export.BATCH_ROWS", 4):
+            self.assertEqual(export_output(self.out_file, self.export_dir), (5, 15))
+        part = pq.ParquetFile(os.path.join(self.export_dir, "reviews", "part-00000.parquet"))
+        self.assertEqual(part.metadata.num_rows, 15)
+        self.assertGreater(part.metadata.num_row_groups, 1)
+        self.assertEqual(len(self._exported_reviews()), 15)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+from src.frontier import Frontier
+
+
+class TestFrontier(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "frontier.db")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_products_are_deduplicated_by_shop_and_item_id(self):
+        frontier = Frontier(self.path)
+        self.assertEqual(frontier.add_products(["https://shopee.com.br/x-i.10.20?sp_atk=abc"], priority=1), 1)
+        added = frontier.add_products([{"link": "https://shopee.com.br/product/10/20", "name": "x"},
+                                       {"link": "https://shopee.com.br/y-i.10.21"}], keyword="mouse")
+        self.assertEqual(added, 1)
+        claimed = frontier.claim_products(10)
+        self.assertEqual([p["link"] for p in claimed],
+                         ["https://shopee.com.br/x-i.10.20?sp_atk=abc", "https://shopee.com.br/y-i.10.21"])
+        frontier.finish_product("https://shopee.com.br/product/10/20")
+        self.assertEqual(frontier.counts()["products"], {"done": 1, "in_progress": 1})
+        frontier.close()
+
+    def test_unfinished_entries_resume_after_restart_until_out_of_attempts(self):
+        frontier = Frontier(self.path, max_attempts=2)
+        frontier.add_keywords(["mouse", " ", "mouse"])
+        frontier.add_products(["https://shopee.com.br/x-i.1.2"])
+        self.assertEqual(frontier.claim_keyword(), "mouse")
+        frontier.claim_products(10)
+        frontier.close()
+
+        frontier = Frontier(self.path, max_attempts=2)
+        self.assertEqual(frontier.counts(), {"keywords": {"pending": 1}, "products": {"pending": 1}})
+        frontier.claim_keyword()
+        frontier.finish_keyword("mouse", succeeded=False)
+        self.assertEqual(len(frontier.claim_products(10)), 1)
+        frontier.requeue_in_progress()
+        self.assertEqual(frontier.counts(), {"keywords": {"failed": 1}, "products": {"failed": 1}})
+        self.assertIsNone(frontier.claim_keyword())
+        frontier.close()
+
+    def test_failed_products_are_retried_until_out_of_attempts(self):
+        frontier = Frontier(self.path, max_attempts=2)
+        frontier.add_products(["https://shopee.com.br/x-i.1.2"])
+        frontier.claim_products(10)
+        frontier.fail_product("https://shopee.com.br/x-i.1.2")
+        self.assertEqual(frontier.counts()["products"], {"pending": 1})
+        frontier.claim_products(10)
+        frontier.fail_product("https://shopee.com.br/x-i.1.2")
+        self.assertEqual(frontier.counts()["products"], {"failed": 1})
+        self.assertEqual(frontier.claim_products(10), [])
+        frontier.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
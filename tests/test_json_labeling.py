@@ -0,0 +1,410 @@
+import asyncio
+import itertools
+import json
+import os
+import re
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest import mock
+
+try:
+    from src import json_labeling
+except ImportError:  # pyperclip is only installed for manual labeling
+    json_labeling = None
+
+try:
+    import openai
+except ImportError:
+    openai = None
+
+LINK = "https://shopee.com.br/x-i.1.2"
+
+
+def _product(link, *contents):
+    return {"link": link, "name": "x", "comments": [{"content": content} for content in contents]}
+
+
+@unittest.skipIf(json_labeling is None, "json_labeling dependencies are not installed")
+class TestStreaming(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.json_path = os.path.join(self.tmpdir.name, "out.json")
+        self.journal_path = self.json_path + ".labels.jsonl"
+        self.data = [_product(LINK, "bom", "", "ruim"), {"name": "no link", "comments": [{"content": "ok", "sentiment": "<POS>"}]},
+                     _product("https://shopee.com.br/y-i.1.3", "ótimo, [sic] \"produto\"")]
+        with open(self.json_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _read(self, path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_iter_json_array_fallback_with_small_reads(self):
+        with mock.patch.object(json_labeling, "ijson", None):
+            for read_size in (1, 7, 1 << 20):
+                self.assertEqual(list(json_labeling.iter_json_array(self.json_path, read_size=read_size)), self.data)
+            with open(self.json_path, "w", encoding="utf-8") as f:
+                f.write("[12345, 6.5e3]")
+            self.assertEqual(list(json_labeling.iter_json_array(self.json_path, read_size=2)), [12345, 6500.0])
+
+    def test_iter_json_array_fallback_rejects_truncated_files(self):
+        with open(self.json_path, encoding="utf-8") as f:
+            text = f.read()
+        with open(self.json_path, "w", encoding="utf-8") as f:
+            f.write(text[:-20])
+        with mock.patch.object(json_labeling, "ijson", None):
+            items = json_labeling.iter_json_array(self.json_path, read_size=16)
+            self.assertEqual(next(items), self.data[0])
+            with self.assertRaises(json.JSONDecodeError):
+                list(items)
+        with open(self.json_path, "w", encoding="utf-8") as f:
+            f.write('{"not": "an array"}')
+        with mock.patch.object(json_labeling, "ijson", None), self.assertRaises(ValueError):
+            list(json_labeling.iter_json_array(self.json_path))
+
+    @unittest.skipIf(json_labeling is None or json_labeling.ijson is None, "ijson is not installed")
+    def test_iter_json_array_with_ijson(self):
+        self.assertEqual(list(json_labeling.iter_json_array(self.json_path)), self.data)
+
+    def test_resume_from_journal_and_merge(self):
+        comments = list(json_labeling.iter_unlabeled_comments(self.json_path, set()))
+        self.assertEqual([(c["product"], c["comment_idx"], c["content"]) for c in comments],
+                         [(LINK, 0, "bom"), (LINK, 2, "ruim"), ("https://shopee.com.br/y-i.1.3", 0, "ótimo, [sic] \"produto\"")])
+        comments[0]["sentiment"] = "<POS>"
+        self.assertEqual(json_labeling.append_label_journal(self.journal_path, comments[:2]), 1)
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write('{"product": "torn')
+
+        labels, _ = json_labeling.load_label_journal(self.journal_path)
+        self.assertEqual(labels, {(LINK, 0): "<POS>"})
+        remaining = list(json_labeling.iter_unlabeled_comments(self.json_path, set(labels)))
+        self.assertEqual([c["content"] for c in remaining], ["ruim", "ótimo, [sic] \"produto\""])
+
+        labels[(LINK, 2)] = "<NEG>"
+        self.assertEqual(json_labeling.merge_labels_streaming(self.json_path, labels), 2)
+        merged = self._read(self.json_path)
+        self.assertEqual([c.get("sentiment") for c in merged[0]["comments"]], ["<POS>", None, "<NEG>"])
+        self.assertEqual(merged[1:], self.data[1:])
+        self.assertEqual(self._read(self.json_path.replace(".json", "_backup.json")), self.data)
+
+    def test_merge_keeps_the_first_backup(self):
+        json_labeling.merge_labels_streaming(self.json_path, {(LINK, 0): "<POS>"})
+        json_labeling.merge_labels_streaming(self.json_path, {(LINK, 2): "<NEG>"})
+        self.assertEqual(self._read(self.json_path.replace(".json", "_backup.json")), self.data)
+        self.assertEqual([c.get("sentiment") for c in self._read(self.json_path)[0]["comments"]], ["<POS>", None, "<NEG>"])
+
+    def test_merge_writes_the_save_json_layout(self):
+        json_labeling.merge_labels_streaming(self.json_path, {(LINK, 0): "<POS>"}, backup=False)
+        with open(self.json_path, encoding="utf-8") as f:
+            text = f.read()
+        self.assertEqual(text, json.dumps(self._read(self.json_path), ensure_ascii=False, indent=2))
+
+
+class _ChatHandler(BaseHTTPRequestHandler):
+    """Chat completions stand-in: labels every comment <POS>, except what the test server is told to do."""
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = body["messages"][-1]["content"]
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            status = server.statuses.pop(0) if server.statuses else 200
+        try:
+            time.sleep(0.05)
+            if status != 200:
+                self._send(status, {"error": {"message": "stand-in error", "type": "error"}})
+                return
+            lines = []
+            for index, text in re.findall(r"^Comment (\d+): (.*)$", prompt, re.MULTILINE):
+                # "drop" comments are left out of the reply while they share a request with others.
+                if "drop" in text and prompt.count("\nComment ") > 1:
+                    continue
+                lines.append(f"{index}: <POS>")
+            self._send(200, {"id": "x", "object": "chat.completion", "created": 0, "model": body["model"],
+                             "choices": [{"index": 0, "finish_reason": "stop",
+                                          "message": {"role": "assistant", "content": "\n".join(lines)}}]})
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@unittest.skipIf(json_labeling is None or openai is None, "openai is not installed")
+class TestAsyncClassifier(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _ChatHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = self.server.in_flight = self.server.max_in_flight = 0
+        self.server.statuses = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.env = mock.patch.dict(os.environ, {"OPENAI_API_KEY": "test"})
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _classify(self, chunks, concurrency=3):
+        classifier = json_labeling.AsyncClassifier(base_url=f"http://127.0.0.1:{self.server.server_port}/v1",
+                                                   concurrency=concurrency, rpm=0, tpm=0, backoff=0.01)
+        done = []
+        asyncio.run(json_labeling.classify_chunks_async(chunks, classifier, on_chunk=done.append, concurrency=concurrency))
+        return done
+
+    @staticmethod
+    def _chunks(*texts_per_chunk):
+        counter = iter(range(1000))
+        return [[{"global_index": next(counter), "content": text} for text in texts] for texts in texts_per_chunk]
+
+    def test_chunks_run_concurrently_and_429_backs_off(self):
+        self.server.statuses = [429, 503]
+        chunks = self._chunks(*[["bom", "ruim"]] * 8)
+        done = self._classify(chunks)
+        self.assertEqual(len(done), 8)
+        self.assertTrue(all(it.get("sentiment") == "<POS>" for chunk in chunks for it in chunk))
+        self.assertEqual(self.server.requests, 10)
+        self.assertEqual(self.server.max_in_flight, 3)
+
+    def test_comments_missing_from_a_reply_are_retried_in_halves(self):
+        chunks = self._chunks(["a", "drop 1", "b", "drop 2"])
+        self._classify(chunks)
+        self.assertEqual([it.get("sentiment") for it in chunks[0]], ["<POS>"] * 4)
+        # The whole chunk, then the two missing comments as two halves of one.
+        self.assertEqual(self.server.requests, 3)
+
+    def test_connection_errors_and_409_are_retried(self):
+        self.server.statuses = [408, 409]
+        chunks = self._chunks(["bom"])
+        self._classify(chunks)
+        self.assertEqual((chunks[0][0].get("sentiment"), self.server.requests), ("<POS>", 3))
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            closed_port = sock.getsockname()[1]  # Nothing listens there once the socket is closed
+        classifier = json_labeling.AsyncClassifier(base_url=f"http://127.0.0.1:{closed_port}/v1", concurrency=1,
+                                                   rpm=0, tpm=0, max_retries=2, backoff=0.01)
+        with self.assertLogs(level="WARNING") as logs:
+            self.assertIsNone(asyncio.run(classifier.request("Comment 0: bom")))
+        self.assertEqual(sum("retrying" in line for line in logs.output), 2)
+
+    def test_client_errors_are_not_retried(self):
+        self.server.statuses = [400]
+        with self.assertRaises(openai.BadRequestError):
+            self._classify(self._chunks(*[["bom"]] * 20), concurrency=1)
+        self.assertEqual(self.server.requests, 1)
+
+
+@unittest.skipIf(json_labeling is None, "json_labeling dependencies are not installed")
+class TestClassifyChunks(unittest.TestCase):
+
+    def test_worker_error_stops_the_producer(self):
+        class Failing:
+            async def classify(self, chunk):
+                raise RuntimeError("boom")
+
+        chunks = ([{"global_index": i, "content": "x"}] for i in range(100))
+        run = json_labeling.classify_chunks_async(chunks, Failing(), concurrency=2)
+        with self.assertRaises(RuntimeError):
+            asyncio.run(asyncio.wait_for(run, timeout=5))
+
+
+@unittest.skipIf(json_labeling is None, "json_labeling dependencies are not installed")
+class TestLabelCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "cache.db")
+        clock = itertools.count(1)
+        self.clock = mock.patch.object(json_labeling.time, "time", lambda: next(clock))
+        self.clock.start()
+
+    def tearDown(self):
+        self.clock.stop()
+        self.tmpdir.cleanup()
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = json_labeling.LabelCache(self.path, max_entries=2)
+        for key in ("a", "b", "c"):
+            cache.put(key, "<POS>")
+        self.assertEqual(cache.get("a"), "<POS>")  # Now more recent than b and c
+        self.assertIsNone(cache.get("missing"))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        cache.close()
+
+        cache = json_labeling.LabelCache(self.path, max_entries=2)
+        self.assertEqual([cache.get(key) for key in ("a", "b", "c")], ["<POS>", None, "<POS>"])
+        cache.close()
+
+    def test_cache_key_normalizes_text_within_a_namespace(self):
+        key = json_labeling.cache_key("Muito  BOM\n", "v1:gpt")
+        self.assertEqual(key, json_labeling.cache_key("muito bom", "v1:gpt"))
+        self.assertNotEqual(key, json_labeling.cache_key("muito bom", "v1:manual"))
+
+    def test_cache_namespace_depends_on_the_base_url(self):
+        def namespace(**options):
+            args = dict(no_cache=False, manual=False, model="m", base_url=None, cache=self.path, cache_size=10)
+            args.update(options)
+            cache_filter = json_labeling.open_cache_filter(SimpleNamespace(**args))
+            cache_filter.close()
+            return cache_filter.namespace
+
+        with mock.patch.dict(os.environ, {"OPENAI_BASE_URL": ""}):
+            default = namespace()
+            self.assertEqual(default, namespace(base_url="https://API.openai.com/v1/"))
+            self.assertNotEqual(default, namespace(base_url="http://localhost:8000/v1"))
+            self.assertEqual(namespace(base_url="http://localhost:8000/v1"), namespace(base_url="http://LOCALHOST:8000/v1/"))
+            self.assertEqual(namespace(manual=True), namespace(manual=True, base_url="http://localhost:8000/v1"))
+
+    def test_cache_filter_labels_hits_and_repeats(self):
+        cache = json_labeling.LabelCache(self.path)
+        cache.put(json_labeling.cache_key("bom", "ns"), "<POS>")
+        resolved = []
+        cache_filter = json_labeling.CacheFilter(cache, "ns", resolved=resolved.extend, batch_size=10)
+        items = [{"global_index": i, "content": text} for i, text in enumerate(["bom", "ruim", "Ruim", "ok", "ruim "])]
+
+        to_classify = list(cache_filter.filter(items))
+        self.assertEqual([it["content"] for it in to_classify], ["ruim", "ok"])
+        self.assertEqual(cache_filter.repeats, 2)
+        to_classify[0]["sentiment"] = "<NEG>"
+        cache_filter.done(to_classify)  # "ok" got no label: nothing is cached for it
+
+        self.assertEqual(sorted((it["global_index"], it["sentiment"]) for it in resolved),
+                         [(0, "<POS>"), (2, "<NEG>"), (4, "<NEG>")])
+        self.assertEqual(cache.get(json_labeling.cache_key("RUIM", "ns")), "<NEG>")
+        self.assertIsNone(cache.get(json_labeling.cache_key("ok", "ns")))
+        cache_filter.close()
+
+
+@unittest.skipIf(json_labeling is None or json_labeling.np is None, "numpy is not installed")
+class TestLocalBackend(unittest.TestCase):
+
+    def setUp(self):
+        texts = ["produto muito bom", "adorei muito bom", "chegou rápido e bom",
+                 "produto ruim", "quebrou muito ruim", "péssimo e ruim"]
+        labels = ["<POS>"] * 3 + ["<NEG>"] * 3
+        self.model = json_labeling.NaiveBayes(n_features=1 << 10).fit(texts, labels)
+
+    def test_fit_predict(self):
+        labels, confidences = self.model.predict(["bom bom", "ruim", "xyz"])
+        self.assertEqual(labels[:2], ["<POS>", "<NEG>"])
+        self.assertGreater(min(confidences[:2]), 0.8)
+        self.assertAlmostEqual(confidences[2], 0.5, places=2)  # Unseen words carry almost no evidence
+
+    def test_hashed_features_match_per_token_fnv1a(self):
+        def fnv1a(token):
+            h = 2166136261
+            for byte in token.encode("utf-8"):
+                h = ((h ^ byte) * 16777619) & 0xFFFFFFFF
+            return h
+
+        texts = ["Muito  BOM produto", "", "ótimo", "a b a b"]
+        expected = []
+        for i, text in enumerate(texts):
+            words = json_labeling.normalize_text(text).split()
+            expected += [(i, fnv1a(t) & 1023) for t in words + [f"{a} {b}" for a, b in zip(words, words[1:])]]
+        rows, cols = json_labeling.hashed_features(texts, 1 << 10)
+        self.assertEqual(sorted(zip(rows.tolist(), cols.tolist())), sorted(expected))
+
+    def test_hashed_features_throughput(self):
+        texts = [" ".join(f"palavra{(i * 7 + j) % 5000}" for j in range(30)) for i in range(10000)]
+        start = time.perf_counter()
+        rows, _ = json_labeling.hashed_features(texts, 1 << 18)
+        elapsed = time.perf_counter() - start
+        self.assertEqual(len(rows), 10000 * 59)
+        self.assertLess(elapsed, 3.0, f"{len(rows) / elapsed:.0f} n-grams/s")  # About 2M n-grams/s on a laptop
+
+    def test_open_local_filter_trains_on_the_given_labels(self):
+        args = SimpleNamespace(backend="local", file="not-read.json", train=[], min_train_labels=4, local_threshold=0.8, manual=False)
+        labeled = [("muito bom", "<POS>"), ("bom demais", "<POS>"), ("muito ruim", "<NEG>"), ("ruim demais", "<NEG>")]
+        local_filter = json_labeling.open_local_filter(args, iter(labeled))
+        self.assertEqual(local_filter.model.predict(["bom"])[0], ["<POS>"])
+        self.assertIsNone(json_labeling.open_local_filter(args, iter(labeled[:3])))
+
+    def test_local_filter_escalates_below_threshold(self):
+        resolved = []
+        local_filter = json_labeling.LocalFilter(self.model, threshold=0.8, resolved=resolved.extend, batch_size=2)
+        items = [{"global_index": i, "content": text} for i, text in enumerate(["muito bom", "xyz", "ruim", "abc"])]
+        escalated = list(local_filter.filter(items))
+        self.assertEqual([it["content"] for it in escalated], ["xyz", "abc"])
+        self.assertTrue(all("sentiment" not in it for it in escalated))
+        self.assertEqual([(it["content"], it["sentiment"]) for it in resolved], [("muito bom", "<POS>"), ("ruim", "<NEG>")])
+        self.assertEqual((local_filter.labeled, local_filter.escalated), (2, 2))
+
+
+@unittest.skipIf(json_labeling is None, "json_labeling dependencies are not installed")
+class TestCheckpointer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.json_path = os.path.join(self.tmpdir.name, "out.json")
+        self.journal_path = self.json_path + ".labels.jsonl"
+        self.data = [_product(LINK, *[f"comment {i}" for i in range(6)])]
+        json_labeling.save_json(self.json_path, self.data)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _stored_labels(self):
+        with open(self.json_path, encoding="utf-8") as f:
+            return [c.get("sentiment") for c in json.load(f)[0]["comments"]]
+
+    def _label(self, items, sentiment="<POS>"):
+        for it in items:
+            it["sentiment"] = sentiment
+        return items
+
+    def test_only_classifier_chunks_trigger_a_merge(self):
+        flattened = json_labeling.flatten_comments(self.data)
+        checkpoint = json_labeling.Checkpointer(self.json_path, self.journal_path, self.data, flattened, every=2)
+        for it in flattened[:3]:
+            checkpoint.journal(self._label([it]))  # e.g. cache hits
+        self.assertEqual(self._stored_labels(), [None] * 6)
+        checkpoint(self._label(flattened[3:4]))
+        self.assertEqual(self._stored_labels(), [None] * 6)
+        checkpoint(self._label(flattened[4:5]))
+        self.assertEqual(self._stored_labels(), ["<POS>"] * 5 + [None])
+
+        checkpoint.journal(self._label(flattened[5:], "<NEG>"))  # Resolved after the last chunk
+        checkpoint.merge()
+        self.assertEqual(self._stored_labels(), ["<POS>"] * 5 + ["<NEG>"])
+
+    def test_flatten_comments_applies_journaled_labels(self):
+        flattened = json_labeling.flatten_comments(self.data)
+        checkpoint = json_labeling.Checkpointer(self.json_path, self.journal_path, self.data, flattened, every=0)
+        checkpoint(self._label(flattened[:2]))
+        checkpoint.journal(self._label(flattened[4:5], "<NEG>"))
+
+        # A rerun after a crash, before anything was merged
+        data = [_product(LINK, *[f"comment {i}" for i in range(6)])]
+        _, journaled = json_labeling.load_label_journal(self.journal_path)
+        remaining = json_labeling.flatten_comments(data, journaled)
+        self.assertEqual([it["comment_idx"] for it in remaining], [2, 3, 5])
+        self.assertEqual([c.get("sentiment") for c in data[0]["comments"]], ["<POS>", "<POS>", None, None, "<NEG>", None])
+
+
+if __name__ == "__main__":
+    unittest.main()
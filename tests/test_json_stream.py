@@ -0,0 +1,60 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from src.json_stream import iter_json_array, write_array_item
+
+
+class TestIterJsonArray(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "out.json")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _write(self, text):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_reads_in_small_chunks(self):
+        items = [{"text": "a, ] [ \"b\"" * i, "n": i} for i in range(20)]
+        self._write(json.dumps(items, indent=2))
+        self.assertEqual(list(iter_json_array(self.path, read_size=7)), items)
+        self._write("[12345, 6.5e3]")
+        for read_size in (1, 2, 3):
+            self.assertEqual(list(iter_json_array(self.path, read_size=read_size)), [12345, 6500.0])
+
+    def test_empty_files_and_arrays_hold_no_items(self):
+        for text in ("", "  \n", "[]", " [ \n ] "):
+            self._write(text)
+            self.assertEqual(list(iter_json_array(self.path, read_size=1)), [])
+
+    def test_malformed_arrays_are_rejected(self):
+        for text in ("[1,, 2]", "[1 2]", "[1,", "[1, 2", '{"a": 1}'):
+            self._write(text)
+            with self.assertRaises(ValueError, msg=text):
+                list(iter_json_array(self.path, read_size=2))
+
+    def test_large_item_with_small_reads(self):
+        items = [{"content": "x" * 200000}, 1]
+        self._write(json.dumps(items))
+        self.assertEqual(list(iter_json_array(self.path, read_size=64)), items)
+
+
+class TestWriteArrayItem(unittest.TestCase):
+
+    def test_matches_json_dump_with_indent(self):
+        items = [{"name": "ção", "comments": [{"n": 1}]}, [1, 2]]
+        f = io.StringIO()
+        written = 0
+        for item in items:
+            written = write_array_item(f, item, written)
+        f.write("\n]")
+        self.assertEqual(f.getvalue(), json.dumps(items, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    unittest.main()
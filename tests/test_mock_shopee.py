@@ -0,0 +1,90 @@
+import json
+import unittest
+import urllib.request
+from urllib.parse import urljoin
+from benchmarks.mock_shopee import MockShopeeServer
+from src.review_api import iter_review_pages
+
+try:
+    from src.offline_parser import parse_review_page, _first, _text
+    from src.xpaths import _SEARCH_XPATHS, _PRODUCT_XPATHS
+    from lxml import html as lxml_html
+except ImportError:
+    parse_review_page = None
+
+
+def _search_results(page_html, base_url):
+    """Links and names of a search page, read with the scraper's XPaths."""
+    containers = lxml_html.fromstring(page_html).xpath(_SEARCH_XPATHS["container"])
+    items = containers[0].xpath(_SEARCH_XPATHS["item"]) if containers else []
+    return [{"link": urljoin(base_url, _first(li, _SEARCH_XPATHS["link"]).get("href")),
+             "name": _text(_first(li, _SEARCH_XPATHS["name"]))} for li in items]
+
+
+def _product_fields(page_html):
+    """The product page fields the scraper reads, with its XPaths."""
+    doc = lxml_html.fromstring(page_html)
+    main = _first(doc, _PRODUCT_XPATHS["main"])
+    return {
+        "name": _text(_first(main, _PRODUCT_XPATHS["name"])),
+        "shop_name": _text(_first(doc, _PRODUCT_XPATHS["shop_name"])),
+        "description": next(filter(None, (_text(_first(doc, x)) for x in _PRODUCT_XPATHS["description"])), None),
+        "category": next(filter(None, (_text(_first(doc, x)) for x in _PRODUCT_XPATHS["category"])), None),
+        "rating_filters": [_text(f) or "" for f in doc.xpath(_PRODUCT_XPATHS["rating_filters"])],
+    }
+
+
+class TestMockShopee(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.mock = MockShopeeServer(products=70, reviews_per_product=500, lazy=False).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.mock.stop()
+
+    def _get(self, path):
+        with urllib.request.urlopen(f"{self.mock.url}{path}") as response:
+            return response.read().decode("utf-8")
+
+    @staticmethod
+    def _fetch(url):
+        with urllib.request.urlopen(url) as response:
+            return json.load(response)
+
+    def test_ratings_api_pages_and_filters(self):
+        product = self.mock.catalog.product(3)
+        pages = list(iter_review_pages(self._fetch, self.mock.url, product["shopid"], product["itemid"], page_size=200))
+        self.assertEqual([offset for offset, _ in pages], [0, 200, 400])
+        self.assertEqual(sum(len(page) for _, page in pages), 500)
+
+        summary = self.mock.catalog.summary(3)
+        two_star = [r for _, page in iter_review_pages(self._fetch, self.mock.url, product["shopid"], product["itemid"], star=2) for r in page]
+        self.assertEqual(len(two_star), summary["stars"][1])
+        self.assertTrue(all(r["rating"] == 2 for r in two_star))
+        media = [r for _, page in iter_review_pages(self._fetch, self.mock.url, product["shopid"], product["itemid"], media=True) for r in page]
+        self.assertEqual(len(media), summary["media"])
+
+    @unittest.skipIf(parse_review_page is None, "lxml is not installed")
+    def test_pages_match_the_xpaths(self):
+        results = _search_results(self._get("/search?keyword=mouse"), self.mock.url)
+        self.assertEqual(len(results), 60)
+        self.assertEqual(len(_search_results(self._get("/search?keyword=mouse&page=1"), self.mock.url)), 10)
+        self.assertEqual(_search_results(self._get("/search?keyword=mouse&page=2"), self.mock.url), [])
+
+        page = self._get(results[0]["link"][len(self.mock.url):])
+        product = _product_fields(page)
+        self.assertEqual(product["name"], results[0]["name"])
+        self.assertTrue(product["description"] and product["category"] and product["shop_name"])
+        self.assertEqual(product["rating_filters"][0], "Tudo")
+        self.assertEqual(len(product["rating_filters"]), 8)
+
+        reviews = parse_review_page(page, self.mock.url, 10)
+        expected = self.mock.catalog.reviews(0, 0, 6)
+        self.assertEqual([r["author"] for r in reviews], [r["author_username"] for r in expected])
+        self.assertEqual([r["rating"] for r in reviews], [r["rating_star"] for r in expected])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,21 @@
+import unittest
+from src.network_capture import NetworkCapture
+
+
+class TestNetworkCapture(unittest.TestCase):
+
+    def test_ratings_pages_keep_their_filter(self):
+        capture = NetworkCapture()
+        capture.drain = lambda driver: None
+        url = "https://shopee.com.br/api/v2/item/get_ratings?itemid=2&shopid=1&limit=6&offset=6&type={}&filter={}"
+        capture._decode("ratings", url.format(0, 0), {"data": {"ratings": [{"rating_star": 5}]}})
+        capture._decode("ratings", url.format(2, 0), {"data": {"ratings": [{"rating_star": 2}]}})
+        capture._decode("ratings", url.format(0, 3), {"data": {"ratings": [{"rating_star": 4, "images": ["a"]}]}})
+        pages = capture.take_ratings(None, "https://shopee.com.br/x-i.1.2")
+        self.assertEqual([page[:3] for page in pages], [(0, 0, 6), (2, 0, 6), (0, 3, 6)])
+        self.assertEqual([page[3][0]["rating"] for page in pages], [5, 2, 4])
+        self.assertEqual(capture.take_ratings(None, "https://shopee.com.br/x-i.1.2"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from src.output_store import OutputJournal, SpilledComments
+
+
+class TestOutputJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.out_file = os.path.join(self.tmpdir.name, "out.json")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _journal_lines(self):
+        with open(f"{self.out_file}.journal", encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def test_record_appends_only_new_comments(self):
+        journal = OutputJournal(self.out_file)
+        product = {"link": "https://shopee.com.br/x-i.1.2?sp=1", "name": "x", "comments": [{"content": "a"}]}
+        journal.record([product])
+        product["comments"].append({"content": "b"})
+        journal.record([product])
+        journal.record([product])
+
+        records = self._journal_lines()
+        self.assertEqual([r["op"] for r in records], ["meta", "comments", "comments"])
+        self.assertEqual(records[2], {"op": "comments", "key": "1.2", "start": 1, "items": [{"content": "b"}]})
+
+    def test_concurrent_records_and_appends(self):
+        journal = OutputJournal(self.out_file)
+        products = [{"link": f"https://shopee.com.br/x-i.1.{i}", "comments": []} for i in range(4)]
+        spilled = {"link": "https://shopee.com.br/x-i.2.0", "comments": []}
+        comments = journal.spill_comments(spilled)
+
+        def grow(product):
+            for n in range(100):
+                product["comments"].append({"n": n})
+                product["sold"] = n
+                journal.record([product])
+
+        def spill():
+            for n in range(100):
+                comments.extend([{"n": n}])
+                journal.record([spilled])
+
+        threads = [threading.Thread(target=grow, args=(p,)) for p in products] + [threading.Thread(target=spill)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        journal.close()
+
+        loaded = OutputJournal(self.out_file).load()
+        for i in range(4):
+            self.assertEqual(loaded[f"1.{i}"]["comments"], [{"n": n} for n in range(100)])
+            self.assertEqual(loaded[f"1.{i}"]["sold"], 99)
+        self.assertEqual(loaded["2.0"]["comments"], [{"n": n} for n in range(100)])
+
+    def test_replay_and_compaction(self):
+        journal = OutputJournal(self.out_file)
+        product = {"link": "https://shopee.com.br/x-i.1.2", "comments": []}
+        journal.record([product])
+        product["comments"].append({"content": "a"})
+        product["last_review_page"] = 3
+        journal.record([product])
+        journal.sync()
+
+        reloaded = OutputJournal(self.out_file).load()
+        self.assertEqual(reloaded["1.2"]["comments"], [{"content": "a"}])
+        self.assertEqual(reloaded["1.2"]["last_review_page"], 3)
+
+        journal.close()
+        self.assertFalse(os.path.exists(f"{self.out_file}.journal"))
+        with open(self.out_file, encoding="utf-8") as f:
+            self.assertEqual(json.load(f), [reloaded["1.2"]])
+
+    def test_torn_last_line_is_ignored(self):
+        journal = OutputJournal(self.out_file)
+        journal.record([{"link": "https://shopee.com.br/x-i.1.2", "comments": [{"content": "a"}]}])
+        journal.close()
+        with open(f"{self.out_file}.journal", "a", encoding="utf-8") as f:
+            f.write('{"op": "comments", "key": "1.2", "sta')
+
+        products = OutputJournal(self.out_file).load()
+        self.assertEqual(products["1.2"]["comments"], [{"content": "a"}])
+
+    def test_spilled_comments_are_journaled_as_they_are_added(self):
+        journal = OutputJournal(self.out_file)
+        product = {"link": "https://shopee.com.br/x-i.1.2", "name": "x", "comments": [{"content": "a"}]}
+        added = []
+        comments = journal.spill_comments(product, on_extend=added.extend)
+        self.assertIsInstance(product["comments"], SpilledComments)
+
+        collector = comments.buffer()
+        collector.extend([{"content": "b"}, {"content": "c"}])
+        nested = comments.buffer()
+        nested.extend([{"content": "d"}])
+        collector += nested
+        product["comments"].extend(collector)  # Already journaled, must not be written twice
+        product["last_review_page"] = 1
+        journal.record([product])
+
+        self.assertEqual((len(collector), len(product["comments"]), list(product["comments"])), (3, 4, []))
+        self.assertEqual(len(added), 3)
+        journal.close()
+        with open(self.out_file, encoding="utf-8") as f:
+            stored = json.load(f)
+        self.assertEqual([c["content"] for c in stored[0]["comments"]], ["a", "b", "c", "d"])
+        self.assertEqual(stored[0]["last_review_page"], 1)
+
+    def test_load_without_comments_keeps_counts(self):
+        journal = OutputJournal(self.out_file)
+        journal.record([{"link": "https://shopee.com.br/x-i.1.2", "comments": [{"content": "a"}]},
+                        {"link": "https://shopee.com.br/y-i.1.3", "comments": []}])
+        journal.close()
+        journal = OutputJournal(self.out_file)
+        journal.record([{"link": "https://shopee.com.br/x-i.1.2", "comments": [{"content": "a"}, {"content": "b"}]}])
+        journal.sync()
+
+        products = OutputJournal(self.out_file).load(keep_comments=False)
+        self.assertEqual(len(products["1.2"]["comments"]), 2)
+        self.assertEqual(list(products["1.2"]["comments"]), [])
+        self.assertEqual(products["1.3"]["comments"], [])
+
+    def test_streaming_compaction_matches_json_dump(self):
+        journal = OutputJournal(self.out_file)
+        journal.record([{"link": f"https://shopee.com.br/x-i.1.{i}", "name": "ção", "comments": [{"n": i}]} for i in range(3)])
+        journal.close()
+        journal = OutputJournal(self.out_file)
+        journal.record([{"link": "https://shopee.com.br/x-i.1.1", "name": "ção", "comments": [{"n": 1}, {"n": 9}]},
+                        {"link": "https://shopee.com.br/x-i.1.5", "comments": []}])
+        journal.close()
+
+        with open(self.out_file, encoding="utf-8") as f:
+            text = f.read()
+        data = json.loads(text)
+        self.assertEqual(text, json.dumps(data, ensure_ascii=False, indent=2))
+        self.assertEqual([p["link"][-3:] for p in data], ["1.0", "1.1", "1.2", "1.5"])
+        self.assertEqual(data[1]["comments"], [{"n": 1}, {"n": 9}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import threading
+import unittest
+from src.refresh_planner import RefreshPlanner
+
+LINK = "https://shopee.com.br/x-i.1.2"
+
+
+class TestRefreshPlanner(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.planner = RefreshPlanner(os.path.join(self.tmpdir.name, "refresh.db"),
+                                      initial_interval=100, min_interval=10, max_interval=1000)
+
+    def tearDown(self):
+        self.planner.close()
+        self.tmpdir.cleanup()
+
+    def test_change_detection_compares_only_probed_counters(self):
+        self.planner.add([LINK], now=0)
+        self.assertTrue(self.planner.has_changed(LINK, {"sold": 10}))
+        self.planner.record(LINK, changed=True, counters={"sold": 10, "Ratings": 4, "detailed_rating": {"all": 4}}, now=0)
+        self.assertFalse(self.planner.has_changed("https://shopee.com.br/product/1/2?sp=1", {"sold": 10, "Ratings": 4}))
+        self.assertTrue(self.planner.has_changed(LINK, {"sold": 10, "Ratings": 5}))
+
+    def test_intervals_adapt_to_changes(self):
+        self.planner.add([LINK, "https://shopee.com.br/y-i.1.3"], now=0)
+        self.planner.record(LINK, changed=False, now=0)  # next in 200
+        self.planner.record("https://shopee.com.br/y-i.1.3", changed=True, counters={"sold": 1}, now=0)  # next in 50
+        self.assertEqual(self.planner.due(now=60), ["https://shopee.com.br/y-i.1.3"])
+        self.assertEqual(self.planner.due(now=250), ["https://shopee.com.br/y-i.1.3", LINK])
+        for _ in range(10):
+            self.planner.record(LINK, changed=False, now=0)
+        self.assertEqual(self.planner.due(now=999), ["https://shopee.com.br/y-i.1.3"])
+        self.assertEqual(self.planner.counters("https://shopee.com.br/y-i.1.3"), {"sold": 1})
+
+    def test_usable_from_worker_threads(self):
+        links = [f"https://shopee.com.br/x-i.1.{i}" for i in range(20)]
+        self.planner.add(links, now=0)
+        threads = [threading.Thread(target=self.planner.record, args=(link, True), kwargs={"counters": {"sold": 1}, "now": 0})
+                   for link in links]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.planner.due(now=49), [])
+        self.assertEqual(len(self.planner.due(now=50)), 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
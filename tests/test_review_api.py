@@ -0,0 +1,77 @@
+import json
+import threading
+import unittest
+import urllib.request
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse, parse_qs
+from src.review_api import iter_review_pages
+
+
+class _RatingsHandler(BaseHTTPRequestHandler):
+    """Serves /api/v2/item/get_ratings with the same JSON shape as Shopee."""
+    total = 7
+
+    def do_GET(self):
+        query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        self.server.requests.append(query)
+        offset, limit, star = int(query["offset"]), int(query["limit"]), int(query["type"])
+        ratings = [{
+            "author_username": f"user{i}",
+            "author_shopid": 1000 + i,
+            "rating_star": star or 5,
+            "ctime": 1700000000 + i,
+            "comment": f"review {i}\nline two",
+            "like_count": i,
+            "ItemRatingReply": {"comment": "thanks"} if i == 0 else None,
+            "images": ["abc"] if query["filter"] == "3" else [],
+            "videos": [],
+        } for i in range(offset, min(offset + limit, self.total))]
+        body = json.dumps({"error": 0, "data": {"ratings": ratings}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestReviewApi(unittest.TestCase):
+
+    def setUp(self):
+        self.server = HTTPServer(("127.0.0.1", 0), _RatingsHandler)
+        self.server.requests = []
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @staticmethod
+    def _fetch(url):
+        with urllib.request.urlopen(url) as response:
+            return json.load(response)
+
+    def test_pages_by_offset_until_short_page(self):
+        pages = list(iter_review_pages(self._fetch, self.base_url, "1", "2", page_size=3))
+        self.assertEqual([offset for offset, _ in pages], [0, 3, 6])
+        reviews = [r for _, page in pages for r in page]
+        self.assertEqual(len(reviews), 7)
+        self.assertEqual(reviews[0]["content"], "review 0 line two")
+        self.assertEqual(reviews[0]["seller_respond"], "thanks")
+        self.assertEqual(reviews[0]["author_profile_url"], f"{self.base_url}/shop/1000")
+
+    def test_star_and_media_filters_are_sent(self):
+        pages = list(iter_review_pages(self._fetch, self.base_url, "1", "2", offset=5, page_size=10, star=2, media=True))
+        self.assertEqual(self.server.requests[0]["type"], "2")
+        self.assertEqual(self.server.requests[0]["filter"], "3")
+        self.assertEqual(self.server.requests[0]["offset"], "5")
+        reviews = pages[0][1]
+        self.assertEqual([r["rating"] for r in reviews], [2, 2])
+        self.assertTrue(reviews[0]["images"][0].endswith("/file/abc"))
+
+
+if __name__ == '__main__':
+    unittest.main()
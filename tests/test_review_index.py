@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+from src.review_index import ReviewIndex, filter_new_reviews
+
+LINK = "https://shopee.com.br/x-i.1.2"
+
+
+def _review(n, day):
+    return {"author": f"user{n}", "time": f"2024-05-{day:02d} 10:00 | Variação: Azul", "content": f"review {n}"}
+
+
+class TestReviewIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.index = ReviewIndex(os.path.join(self.tmpdir.name, "index.db"))
+
+    def tearDown(self):
+        self.index.close()
+        self.tmpdir.cleanup()
+
+    def _scraper(self, since=None, output_data=None):
+        return SimpleNamespace(review_index=self.index, since=since, current_product_link=LINK,
+                               output_data=output_data or {}, _known_reviews={})
+
+    def test_stops_at_first_known_review(self):
+        self.index.add("https://shopee.com.br/product/1/2", [_review(2, 20), _review(1, 10)])
+        new, stop = filter_new_reviews(self._scraper(), [_review(4, 28), _review(3, 25), _review(2, 20), _review(1, 10)])
+        self.assertEqual([r["author"] for r in new], ["user4", "user3"])
+        self.assertTrue(stop)
+
+    def test_existing_comments_count_as_known_and_since_stops(self):
+        scraper = self._scraper(since=datetime(2024, 5, 22), output_data={LINK: {"comments": [_review(3, 25)]}})
+        new, stop = filter_new_reviews(scraper, [_review(4, 28), _review(5, 23), _review(6, 21)])
+        self.assertEqual([r["author"] for r in new], ["user4", "user5"])
+        self.assertTrue(stop)
+        new, stop = filter_new_reviews(scraper, [_review(3, 25)])
+        self.assertEqual((new, stop), ([], True))
+
+    def test_out_of_order_pages_do_not_stop(self):
+        self.index.add(LINK, [_review(2, 20)])
+        new, stop = filter_new_reviews(self._scraper(), [_review(3, 25), _review(2, 20), _review(4, 28)])
+        self.assertEqual([r["author"] for r in new], ["user3", "user4"])
+        self.assertFalse(stop)
+        new, stop = filter_new_reviews(self._scraper(since=datetime(2024, 5, 22)), [_review(5, 10), _review(6, 27)])
+        self.assertEqual(([r["author"] for r in new], stop), (["user6"], False))
+
+
+if __name__ == "__main__":
+    unittest.main()
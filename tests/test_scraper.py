@@ -1,9 +1,17 @@
+import os
+import tempfile
 import unittest
-from src.retriv import ShopeeScraper
+from unittest import mock
+from urllib.parse import urlparse, parse_qs
+from src.scraper import ShopeeScraper
+from src.refresh_planner import RefreshPlanner
+from src.product_page_parser import _extract_detailed_rating, _collect_api_reviews, SCRAPE_FAILED_KEY
+from src.utils import _convert_shortened_number, _parse_product_ids, _canonical_product_key
 
 class TestShopeeScraper(unittest.TestCase):
 
     def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
         self.scraper = ShopeeScraper(
             search_term='test',
             max_products=5,
@@ -11,30 +19,76 @@ class TestShopeeScraper(unittest.TestCase):
             review_limit=10,
             all_star_types=False,
             star_limit_per_type=5,
-            chrome_user_data_dir=None
+            chrome_user_data_dir=os.path.join(self.tmp.name, "profile"),
+            output_file=os.path.join(self.tmp.name, "out.json"),
+            site_url="http://127.0.0.1:8000/",
         )
 
+    def tearDown(self):
+        self.tmp.cleanup()
+
     def test_initialization(self):
         self.assertEqual(self.scraper.search_term, 'test')
         self.assertEqual(self.scraper.max_products, 5)
         self.assertFalse(self.scraper.index_only)
         self.assertEqual(self.scraper.review_limit, 10)
+        self.assertEqual(self.scraper.site_url, "http://127.0.0.1:8000")
+
+    def test_convert_shortened_number(self):
+        self.assertEqual(_convert_shortened_number('1,2k'), 1200)
+        self.assertEqual(_convert_shortened_number('15k'), 15000)
+        self.assertEqual(_convert_shortened_number('1,2mil'), 1200)
+        self.assertEqual(_convert_shortened_number('100'), 100)
+        self.assertEqual(_convert_shortened_number('invalid'), 0)
+
+    def test_product_ids(self):
+        self.assertEqual(_parse_product_ids("https://shopee.com.br/Mouse-i.123.456?sp_atk=x"), ("123", "456"))
+        self.assertEqual(_canonical_product_key("https://shopee.com.br/product/123/456"), "123.456")
+        self.assertEqual(_canonical_product_key("not a product"), "not a product")
+
+    def test_extract_detailed_rating(self):
+        detailed, total = _extract_detailed_rating(["Tudo", "5 Estrelas (1,2mil)", "1 Estrela (30)", "Com Mídia (7)"])
+        self.assertEqual(detailed, {"5_star": 1200, "1_star": 30, "media": 7})
+        self.assertEqual(total, 1230)
+    def test_failed_refresh_keeps_the_stored_counters(self):
+        link = "https://shopee.com.br/x-i.1.2"
+        planner = RefreshPlanner(os.path.join(self.tmp.name, "refresh.db"))
+        planner.add([link], now=0)
+        planner.record(link, changed=True, counters={"sold": 5}, now=0)
+        self.scraper.refresh_planner = planner
+
+        def scrape(scraper, product):
+            product.update({"sold": 9, SCRAPE_FAILED_KEY: True}) # Reviews threw after the basic info was read
+            return product
+
+        with mock.patch("src.scraper.probe_product_counters", return_value={"sold": 9}), \
+                mock.patch("src.scraper._scrape_loaded_product", side_effect=scrape):
+            self.scraper._process_refresh()
+        self.assertEqual(planner.counters(link), {"sold": 5})
+        self.assertTrue(planner.has_changed(link, {"sold": 9}))
+        planner.close()
 
-    def test_parse_star_text(self):
-        self.assertEqual(self.scraper._parse_star_text('1,2k'), 1200)
-        self.assertEqual(self.scraper._parse_star_text('15k'), 15000)
-        self.assertEqual(self.scraper._parse_star_text('100'), 100)
-        self.assertEqual(self.scraper._parse_star_text('invalid'), 0)
+    def test_resume_skips_the_filters_collected_before_the_saved_one(self):
+        requests = []
 
-    def test_safe_get(self):
-        # This test would require a live environment to run properly
-        # Here we can only check if the method exists
-        self.assertTrue(hasattr(self.scraper, '_safe_get'))
+        def fetch(url):
+            query = {k: v[0] for k, v in parse_qs(urlparse(url).query).items()}
+            requests.append((query["type"], int(query["offset"])))
+            offset = int(query["offset"])
+            ratings = [{"author_username": f"{query['type']}-{i}", "rating_star": int(query["type"]), "ctime": i,
+                        "comment": "ok"} for i in range(offset, min(offset + int(query["limit"]), 4))]
+            return {"error": 0, "data": {"ratings": ratings}}
 
-    def test_retrieve_products(self):
-        # This test would require a live environment to run properly
-        # Here we can only check if the method exists
-        self.assertTrue(hasattr(self.scraper, '_retrieve_products'))
+        self.scraper.review_fetcher = fetch
+        self.scraper.all_star_types = True
+        self.scraper.continue_scrape = True
+        self.scraper.last_review_filter, self.scraper.last_review_offset = "3_star", 2
+        rating = {f"{star}_star": 4 for star in range(1, 6)}
+        reviews = _collect_api_reviews(self.scraper, {"link": "https://shopee.com.br/x-i.1.2"}, rating, 20)
+        self.assertEqual(sorted({star for star, _ in requests}), ["1", "2", "3"])
+        self.assertEqual([offset for star, offset in requests if star == "3"][0], 2)
+        self.assertEqual([offset for star, offset in requests if star == "2"][0], 0)
+        self.assertEqual(len(reviews), 2 + 4 + 4)
 
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import pickle
+import tempfile
+import unittest
+from multiprocessing import Process
+from src.session_store import SessionStore
+
+
+def _save_many(path, prefix, count):
+    store = SessionStore(path, None)
+    for i in range(count):
+        store.save([{"name": f"{prefix}{i}", "value": "v", "domain": ".shopee.com.br"}])
+
+
+class TestSessionStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "cookies.json")
+        self.legacy_path = os.path.join(self.tmpdir.name, "cookies.dat")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_save_merges_with_other_writers_and_drops_expired(self):
+        first = SessionStore(self.path, self.legacy_path)
+        second = SessionStore(self.path, self.legacy_path)
+        first.save([{"name": "SPC_EC", "value": "a", "domain": ".shopee.com.br", "expires": 2000}], now=1000)
+        second.save([{"name": "csrftoken", "value": "b", "domain": ".shopee.com.br", "expires": -1, "session": True},
+                     {"name": "old", "value": "c", "domain": ".shopee.com.br", "expiry": 500}], now=1000)
+        second.save([{"name": "SPC_EC", "value": "new", "domain": ".shopee.com.br", "expires": 3000}], now=1000)
+
+        cookies = {c["name"]: c for c in SessionStore(self.path).load(now=1000)}
+        self.assertEqual(set(cookies), {"SPC_EC", "csrftoken"})
+        self.assertEqual(cookies["SPC_EC"]["value"], "new")
+        self.assertNotIn("expires", cookies["csrftoken"])
+        self.assertEqual(SessionStore(self.path).load(now=3500)[0]["name"], "csrftoken")
+
+    def test_concurrent_processes_keep_each_others_cookies(self):
+        writers = [Process(target=_save_many, args=(self.path, prefix, 20)) for prefix in "abcd"]
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join()
+        names = {c["name"] for c in SessionStore(self.path, None).load()}
+        self.assertEqual(names, {f"{prefix}{i}" for prefix in "abcd" for i in range(20)})
+
+    def test_migrates_legacy_pickle(self):
+        with open(self.legacy_path, 'wb') as f:
+            pickle.dump([{"name": "SPC_U", "value": "1", "domain": ".shopee.com.br", "path": "/", "expiry": 5000}], f)
+        cookies = SessionStore(self.path, self.legacy_path).load(now=1000)
+        self.assertEqual(cookies, [{"name": "SPC_U", "value": "1", "domain": ".shopee.com.br", "path": "/", "expires": 5000}])
+
+
+if __name__ == "__main__":
+    unittest.main()